@@ -0,0 +1,114 @@
+import time
+import reconcile
+
+TTL = 300
+
+class RunningConfig:
+    def __init__(self, ttl=TTL, clock=time.monotonic):
+        """ Parsed view of a router's running telemetry configuration, in the format of reconcile.running()
+            It is read once, then kept up to date from the Sets the monitor sends, and read again after ttl seconds or when invalidated
+
+            :param ttl: Seconds after which the router is read again, to pick up changes made by others
+            :type ttl: float, optional
+            :param clock: Returns the current time in seconds
+            :type clock: function, optional
+        """
+        self.ttl = ttl
+        self._clock = clock
+        self._tree = None
+        self._read = None
+        self.version = 0
+
+    def invalidate(self):
+        """ Forgets the cached configuration, the next read() gets it from the router
+        """
+
+        self._tree = None
+
+    def read(self, router_config):
+        """ Returns the running configuration, read from the router only if it is not cached or has expired
+
+            :param router_config: The connection to the router
+            :type router_config: MDT
+            :rtype: dict
+        """
+
+        if self._tree == None or self._clock() - self._read >= self.ttl:
+            self._tree = reconcile.running(router_config.get_config())
+            self._read = self._clock()
+            self.version += 1
+        return self._tree
+
+    def subscriptions(self):
+        """ Names of the cached subscriptions, None if nothing is cached
+
+            :rtype: set
+        """
+
+        return set(self._tree["subscriptions"]) if self._tree != None else None
+
+    def apply(self, router_config, update=None, delete=None, replace=None):
+        """ Applies changes to the router with MDT.apply() and to the cached configuration, in the order the router does
+            The cache is dropped if the router may not have applied them
+
+            :return: The gNMI Response
+            :rtype: dict
+        """
+
+        arguments = (update, delete, replace) if replace else (update, delete)
+        if not update and not delete and not replace:
+            return router_config.apply(*arguments)
+        try:
+            response = router_config.apply(*arguments)
+        except Exception:
+            self.invalidate()
+            raise
+        if not isinstance(response, dict) or self._tree == None:
+            self.invalidate()
+            return response
+
+        for item in delete or []:
+            self._delete(item)
+        self._replace(replace or {})
+        self._merge(update or {})
+        self.version += 1
+        return response
+
+    def _merge(self, update):
+        tree = self._tree
+        for name, destinations in update.get("destination-groups", {}).items():
+            for destination in destinations:
+                tree["destination-groups"].setdefault(name, {})[(destination[0], destination[1])] = destination
+        for name, sensor_paths in update.get("sensor-groups", {}).items():
+            tree["sensor-groups"].setdefault(name, {}).update(dict.fromkeys(sensor_paths))
+        for name, profiles in update.get("subscriptions", {}).items():
+            subscription = tree["subscriptions"].setdefault(name, {"sensor-profiles": {}, "destination-profiles": {}})
+            subscription["sensor-profiles"].update(profiles["sensor-profiles"])
+            subscription["destination-profiles"].update(dict.fromkeys(profiles["destination-profiles"]))
+
+    def _replace(self, replace):
+        tree = self._tree
+        for name, destinations in replace.get("destination-groups", {}).items():
+            tree["destination-groups"][name] = {(destination[0], destination[1]): destination for destination in destinations}
+        for name, sensor_paths in replace.get("sensor-groups", {}).items():
+            tree["sensor-groups"][name] = dict.fromkeys(sensor_paths)
+        for name, profiles in replace.get("subscriptions", {}).items():
+            tree["subscriptions"][name] = {"sensor-profiles": dict(profiles["sensor-profiles"]), "destination-profiles": dict.fromkeys(profiles["destination-profiles"])}
+
+    def _delete(self, item):
+        tree = self._tree
+        kind, keys = item[0], item[1:]
+        if kind == "destination-group":
+            tree["destination-groups"].pop(keys[0], None)
+        elif kind == "destination":
+            tree["destination-groups"].get(keys[0], {}).pop((keys[1], keys[2]), None)
+        elif kind == "sensor-group":
+            tree["sensor-groups"].pop(keys[0], None)
+        elif kind == "sensor-path":
+            tree["sensor-groups"].get(keys[0], {}).pop(keys[1], None)
+        elif kind == "subscription":
+            tree["subscriptions"].pop(keys[0], None)
+        elif kind == "sensor-profile":
+            tree["subscriptions"].get(keys[0], {}).get("sensor-profiles", {}).pop(keys[1], None)
+        elif kind == "destination-profile":
+            tree["subscriptions"].get(keys[0], {}).get("destination-profiles", {}).pop(keys[1], None)
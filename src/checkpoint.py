@@ -0,0 +1,74 @@
+import os
+import json
+import hashlib
+import threading
+
+def digest(config):
+    """ Fingerprints what a router's telemetry configuration is built from
+
+        :param config: The single-router config, from monitor.routers()
+        :type config: dict
+        :return: Hex SHA-256 of the router, sensor groups and collectors
+        :rtype: str
+    """
+
+    relevant = {key: config.get(key) for key in ("router", "sensor-groups", "collectors")}
+    return hashlib.sha256(json.dumps(relevant, sort_keys=True).encode("utf-8")).hexdigest()
+
+class Checkpoint:
+    def __init__(self, path):
+        """ State of every monitored router, persisted to a JSON file so that a restarted monitor can resume without tearing down telemetry
+            Each router's entry holds the digest of its config, its active collector and the names of the objects the monitor owns on it
+
+            :param path: File to keep the state in, in a writable directory
+            :type path: str
+            :raises PermissionError: If the directory is not writable
+        """
+        directory = os.path.dirname(os.path.abspath(path))
+        if not os.access(directory, os.W_OK):
+            raise PermissionError("Checkpoint directory is not writable: " + directory)
+        self.path = path
+        self._lock = threading.Lock()
+        try:
+            with open(path, "r") as checkpoint_file:
+                self._routers = json.load(checkpoint_file).get("routers", {})
+        except FileNotFoundError:
+            self._routers = {}
+
+    def get(self, name):
+        """ Returns the last saved entry of a router, None if there is none
+
+            :rtype: dict
+        """
+
+        with self._lock:
+            return self._routers.get(name)
+
+    def save(self, name, entry):
+        """ Saves the entry of a router. The file is replaced atomically, it is never left half written
+
+            :param name: Name of the router
+            :type name: str
+            :param entry: The router's state, with its "config" digest, active "collector" and owned "objects"
+            :type entry: dict
+        """
+
+        with self._lock:
+            self._routers[name] = entry
+            self._write()
+
+    def remove(self, name):
+        """ Forgets a router, e.g. once its telemetry configuration has been removed
+        """
+
+        with self._lock:
+            if self._routers.pop(name, None) != None:
+                self._write()
+
+    def _write(self):
+        temporary = self.path + ".tmp"
+        with open(temporary, "w") as checkpoint_file:
+            json.dump({"routers": self._routers}, checkpoint_file, indent=4)
+            checkpoint_file.flush()
+            os.fsync(checkpoint_file.fileno())
+        os.replace(temporary, self.path)
@@ -0,0 +1,121 @@
+import time
+
+HOLD_DOWN = 30
+MIN_UP = 60
+HALF_LIFE = 900
+PENALTY = 1000
+SUPPRESS = 2000
+REUSE = 750
+
+class Damping:
+    def __init__(self, names, hold_down=HOLD_DOWN, min_up=MIN_UP, half_life=HALF_LIFE, penalty=PENALTY, suppress=SUPPRESS, reuse=REUSE, clock=time.monotonic):
+        """ Chooses the collector to stream to with hysteresis, so that a flapping collector does not churn the router's subscriptions
+            Failing over away from a collector that went down is immediate. Failing back to a higher priority one waits until it has been
+            up for min_up seconds and the last switch is hold_down seconds old. Every time a collector goes down it is penalized as in BGP
+            route flap dampening: the penalty halves every half_life seconds, above suppress the collector is not chosen unless no other
+            one is up, until the penalty decays below reuse
+
+            :param names: Names of the collectors, in priority order
+            :type names: list
+            :param hold_down: Minimum seconds between a switch and a fail-back
+            :type hold_down: float, optional
+            :param min_up: Seconds a higher priority collector must stay up before failing back to it
+            :type min_up: float, optional
+            :param half_life: Seconds for a flap penalty to halve
+            :type half_life: float, optional
+            :param penalty: Penalty added every time a collector goes down
+            :type penalty: float, optional
+            :param suppress: Penalty above which a collector is suppressed
+            :type suppress: float, optional
+            :param reuse: Penalty below which a suppressed collector is used again
+            :type reuse: float, optional
+            :param clock: Returns the current time in seconds
+            :type clock: function, optional
+        """
+        self.names = names
+        self.hold_down = hold_down
+        self.min_up = min_up
+        self.half_life = half_life
+        self.penalty = penalty
+        self.suppress = suppress
+        self.reuse = reuse
+        self._clock = clock
+
+        self.active = -1
+        self._switched = None
+        self._up = [None] * len(names)
+        self._up_since = [None] * len(names)
+        self._penalties = [0.0] * len(names)
+        self._updated = [clock()] * len(names)
+        self._suppressed = [False] * len(names)
+
+    def _decay(self, index, now):
+        self._penalties[index] *= 0.5 ** ((now - self._updated[index]) / self.half_life)
+        self._updated[index] = now
+        if self._suppressed[index] and self._penalties[index] < self.reuse:
+            self._suppressed[index] = False
+
+    def _observe(self, index, up, now):
+        self._decay(index, now)
+        if up == None:
+            self._up[index] = None
+            return
+        if up and not self._up[index]:
+            self._up_since[index] = now
+        elif not up and self._up[index]:
+            self._penalties[index] += self.penalty
+            if self._penalties[index] > self.suppress:
+                self._suppressed[index] = True
+        self._up[index] = up
+
+    def penalties(self):
+        """ Returns the current flap penalty of every collector
+
+            :rtype: list
+        """
+
+        now = self._clock()
+        for index in range(len(self.names)):
+            self._decay(index, now)
+        return list(self._penalties)
+
+    def suppressed(self, index):
+        """ Whether a collector is currently suppressed for flapping
+
+            :rtype: bool
+        """
+
+        self._decay(index, self._clock())
+        return self._suppressed[index]
+
+    def select(self, up):
+        """ Records the observed collectors and returns the one to stream to
+
+            :param up: For every collector in priority order, whether its subscription is active, None when it has no subscription
+            :type up: list
+            :return: Index of the chosen collector, -1 if none is up
+            :rtype: int
+        """
+
+        now = self._clock()
+        for index, state in enumerate(up):
+            self._observe(index, state, now)
+
+        candidates = [index for index, state in enumerate(up) if state]
+        stable = [index for index in candidates if not self._suppressed[index]]
+
+        if self.active == -1 or not up[self.active]:
+            # The current collector is down, fail over at once, to a flapping one only if there is nothing else
+            chosen = (stable or candidates or [-1])[0]
+        else:
+            chosen = self.active
+            if self._switched == None or now - self._switched >= self.hold_down:
+                for index in stable:
+                    if index < self.active and now - self._up_since[index] >= self.min_up:
+                        chosen = index
+                        break
+
+        if chosen != self.active:
+            self._switched = now
+            self.active = chosen
+        return chosen
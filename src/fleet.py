@@ -0,0 +1,114 @@
+import heapq
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+class Fleet:
+    def __init__(self, max_workers=8, retry=10):
+        """ Schedules independent periodic steps, one per router, on a bounded pool of worker threads
+            A step that is slow or blocked only holds its own worker, the other routers keep their schedule
+
+            :param max_workers: Maximum number of steps running at the same time
+            :type max_workers: int, optional
+            :param retry: Seconds until the next cycle of a router whose step raised
+            :type retry: float, optional
+        """
+        self._retry = retry
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+        self._condition = threading.Condition()
+        self._queue = []
+        self._due = {}
+        self._steps = {}
+        self._running = set()
+        self._woken = set()
+        self._stopped = False
+        self._sequence = 0
+
+    def add(self, name, step, delay=0):
+        """ Registers a router step
+
+            :param name: Unique name of the router
+            :type name: str
+            :param step: Runs one cycle and returns the number of seconds until the next one
+            :type step: function
+            :param delay: Seconds until the first cycle
+            :type delay: float, optional
+        """
+
+        with self._condition:
+            self._steps[name] = step
+            self._schedule(name, delay)
+
+    def remove(self, name):
+        """ Stops scheduling a router. A cycle already running is allowed to finish
+        """
+
+        with self._condition:
+            self._steps.pop(name, None)
+            self._due.pop(name, None)
+            self._woken.discard(name)
+
+    def wake(self, name=None):
+        """ Runs a router's next cycle now, or every router's if no name is given
+        """
+
+        with self._condition:
+            for router in [name] if name != None else list(self._steps):
+                if router in self._running:
+                    # Checked again as soon as the running cycle ends
+                    self._woken.add(router)
+                elif router in self._steps:
+                    self._schedule(router, 0)
+            self._condition.notify()
+
+    def run(self):
+        """ Dispatches due steps until stop() is called, then waits for the running ones
+        """
+
+        with self._condition:
+            while not self._stopped:
+                now = time.monotonic()
+                while self._queue and self._queue[0][0] <= now:
+                    due, sequence, name = heapq.heappop(self._queue)
+                    # Entries superseded by a later schedule, or of removed routers, are skipped
+                    if self._steps.get(name) == None or name in self._running or self._due.get(name) != sequence:
+                        continue
+                    self._running.add(name)
+                    self._executor.submit(self._step, name, self._steps[name])
+
+                timeout = self._queue[0][0] - now if self._queue else None
+                self._condition.wait(timeout)
+
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+    def stop(self):
+        """ Makes run() return once the running steps are done, steps dispatched but not started yet are dropped
+        """
+
+        with self._condition:
+            self._stopped = True
+            self._condition.notify()
+
+    def _schedule(self, name, delay):
+        self._sequence += 1
+        self._due[name] = self._sequence
+        heapq.heappush(self._queue, (time.monotonic() + delay, self._sequence, name))
+        self._condition.notify()
+
+    def _step(self, name, step):
+        threading.current_thread().name = name
+        # A step that raises is retried later, it must not drop the router from the schedule
+        delay = self._retry
+        try:
+            delay = step()
+        except Exception:
+            logger.exception('Cycle of ' + name + ' failed, retrying in ' + str(self._retry) + 's')
+        finally:
+            with self._condition:
+                self._running.discard(name)
+                if name in self._steps:
+                    self._schedule(name, 0 if name in self._woken else delay)
+                self._woken.discard(name)
@@ -0,0 +1,333 @@
+import asyncio
+import json
+import grpc
+from grpc import FutureTimeoutError
+from pygnmi.spec.gnmi_pb2_grpc import gNMIStub
+from pygnmi.spec.gnmi_pb2 import CapabilityRequest, GetRequest, SetRequest, Update, TypedValue, Encoding, UpdateResult
+from pygnmi.path_generator import gnmi_path_generator, gnmi_path_degenerator
+from gnmi_config import CFG_PATH, OPER_PATH, destination_group_entry, sensor_group_entry, subscription_entry, subscription_profiles, set_changes, set_replacements, object_path, parse_subscription_states
+
+def _value(typed_value):
+    """ Decodes a gNMI TypedValue the way pygnmi does
+
+        :param typed_value: The value of an Update
+        :type typed_value: TypedValue
+        :return: The decoded value, JSON is parsed
+    """
+
+    kind = typed_value.WhichOneof("value")
+    if kind in ("json_ietf_val", "json_val"):
+        return json.loads(getattr(typed_value, kind))
+    return getattr(typed_value, kind) if kind != None else None
+
+def _notifications(response):
+    """ Converts a GetResponse into the dict returned by pygnmi's gNMIclient.get()
+
+        :param response: The GetResponse
+        :type response: GetResponse
+        :return: The gNMI Notification
+        :rtype: dict
+    """
+
+    notifications = []
+    for notification in response.notification:
+        entry = {
+            "timestamp": notification.timestamp,
+            "prefix": gnmi_path_degenerator(notification.prefix) if notification.HasField("prefix") else None,
+            "alias": notification.alias or None,
+            "atomic": notification.atomic
+        }
+        if notification.update:
+            entry["update"] = [{
+                "path": gnmi_path_degenerator(update.path) if update.HasField("path") else None,
+                "val": _value(update.val) if update.HasField("val") else None
+            } for update in notification.update]
+        notifications.append(entry)
+
+    return {"notification": notifications} if notifications else {}
+
+def _results(response):
+    """ Converts a SetResponse into the dict returned by pygnmi's gNMIclient.set()
+
+        :param response: The SetResponse
+        :type response: SetResponse
+        :return: The gNMI Response
+        :rtype: dict
+    """
+
+    result = {
+        "timestamp": response.timestamp,
+        "prefix": gnmi_path_degenerator(response.prefix) if response.HasField("prefix") else None
+    }
+    if response.response:
+        result["response"] = [{
+            "path": gnmi_path_degenerator(entry.path) if entry.HasField("path") else None,
+            "op": UpdateResult.Operation.Name(entry.op)
+        } for entry in response.response]
+
+    return result
+
+class AsyncMDT:
+    def __init__(self, host, port, user, password, path_cert=None, timeout=None):
+        """ Constructor Method. The channel is opened by connect(), or by entering the async context manager
+            Every method is a coroutine with the same arguments and return value as its MDT counterpart, so any number
+            of requests to any number of routers can be outstanding on a single event loop. gRPC errors are raised as grpc.aio.AioRpcError
+
+            :param host: The ip address for the device
+            :type host: str
+            :param port: The port for the device
+            :type port: int
+            :param user: Username for device login
+            :type user: str
+            :param password: Password for device login
+            :type password: str
+            :param path_cert: Path to certificate for a secure TLS connection
+            :type path_cert: str, optional
+            :param timeout: Deadline of every RPC in seconds, RPCs wait for the router indefinitely without one
+            :type timeout: float, optional
+        """
+        self.timeout = timeout
+        self._target = host + ":" + str(port)
+        self._metadata = [("username", user), ("password", password)]
+        self._path_cert = path_cert
+        self._channel = None
+        self._stub = None
+
+    async def __aenter__(self):
+        return await self.connect()
+
+    async def __aexit__(self, type, value, traceback):
+        await self.close()
+
+    async def connect(self, timeout=5):
+        """ Opens the gRPC channel and waits for it to become ready
+
+            :param timeout: Seconds to wait for the channel
+            :type timeout: float, optional
+            :return: The connected client
+            :rtype: AsyncMDT
+        """
+
+        if self._path_cert == None:
+            self._channel = grpc.aio.insecure_channel(self._target)
+        else:
+            with open(self._path_cert, "rb") as cert_file:
+                credentials = grpc.ssl_channel_credentials(cert_file.read())
+            self._channel = grpc.aio.secure_channel(self._target, credentials, options=[("grpc.ssl_target_name_override", "ems.cisco.com")])
+        self._stub = gNMIStub(self._channel)
+
+        if not await self.is_connected(timeout):
+            await self.close()
+            raise FutureTimeoutError()
+        return self
+
+    async def close(self):
+        """ Closes the underlying gRPC channel
+        """
+
+        if self._channel != None:
+            await self._channel.close()
+            self._channel = None
+
+    async def is_connected(self, timeout=1):
+        """ Checks whether the underlying gRPC channel is still usable without issuing an RPC
+
+            :param timeout: Seconds to wait for the channel to become ready
+            :type timeout: float, optional
+            :return: Whether or not the channel is ready
+            :rtype: bool
+        """
+
+        if self._channel == None:
+            return False
+        try:
+            await asyncio.wait_for(self._channel.channel_ready(), timeout)
+        except asyncio.TimeoutError:
+            return False
+        return True
+
+    async def _get(self, paths):
+        request = GetRequest(path=[gnmi_path_generator(path) for path in paths], encoding=Encoding.JSON_IETF)
+        return _notifications(await self._stub.Get(request, metadata=self._metadata, timeout=self.timeout))
+
+    async def _set(self, update=None, delete=None, replace=None):
+        request = SetRequest(
+            update=[Update(path=gnmi_path_generator(path), val=TypedValue(json_ietf_val=json.dumps(tree).encode("utf-8"))) for path, tree in update or []],
+            replace=[Update(path=gnmi_path_generator(path), val=TypedValue(json_ietf_val=json.dumps(tree).encode("utf-8"))) for path, tree in replace or []],
+            delete=[gnmi_path_generator(path) for path in delete or []]
+        )
+        return _results(await self._stub.Set(request, metadata=self._metadata, timeout=self.timeout))
+
+    async def get_capabilities(self):
+        """ Gets the capabilities of the target device
+
+            :return: The gNMI Response
+            :type: dict
+        """
+
+        response = await self._stub.Capabilities(CapabilityRequest(), metadata=self._metadata, timeout=self.timeout)
+        return {
+            "supported_models": [{"name": model.name, "organization": model.organization, "version": model.version} for model in response.supported_models],
+            "supported_encodings": [Encoding.Name(encoding).lower() for encoding in response.supported_encodings],
+            "gnmi_version": response.gNMI_version
+        }
+
+    async def get_config(self):
+        """ Gets the current telemetry configuration in JSON format
+
+            :return: The gNMI Notification
+            :rtype: dict
+        """
+
+        return await self._get([CFG_PATH])
+
+    async def apply(self, update=None, delete=None, replace=None):
+        """ Applies a set of telemetry changes in a single gNMI Set, see MDT.apply()
+
+            :return: The gNMI Response, None if there was nothing to change
+            :rtype: dict
+        """
+
+        tree, paths = set_changes(update, delete)
+        replaced = set_replacements(replace)
+        if not tree and not paths and not replaced:
+            return None
+
+        return await self._set(update=[(CFG_PATH, tree)] if tree else None, delete=paths, replace=replaced)
+
+    ########## Destination Groups ##########
+
+    async def create_destination(self, destination_group, ip, port, encoding, protocol, tls, tls_hostname=None):
+        """ Creates a destination group or adds a destination to it, see MDT.create_destination()
+
+            :return: The gNMI Response
+            :rtype: dict
+        """
+
+        tree = {"destination-groups": {"destination-group": [destination_group_entry(destination_group, [(ip, port, encoding, protocol, tls, tls_hostname)])]}}
+        return await self._set(update=[(CFG_PATH, tree)])
+
+    async def read_destination_group(self, destination_group):
+        """ Reads the configuration of a specific destination group
+
+            :return: The gNMI Notification
+            :rtype: dict
+        """
+
+        return await self._get([object_path(("destination-group", destination_group))])
+
+    async def read_all_destination_groups(self):
+        """ Reads the configuration of all destination groups
+
+            :return: The gNMI Notification
+            :rtype: dict
+        """
+
+        return await self._get([CFG_PATH + '/destination-groups'])
+
+    async def delete_destination_group(self, destination_group):
+        """ Deletes the configuration of a specific destination group
+
+            :return: The gNMI Response
+            :rtype: dict
+        """
+
+        return await self._set(delete=[object_path(("destination-group", destination_group))])
+
+    ########## Sensor Groups ##########
+
+    async def create_sensor_path(self, sensor_group, sensor_path):
+        """ Creates a sensor group or adds a sensor path to it, see MDT.create_sensor_path()
+
+            :return: The gNMI Response
+            :rtype: dict
+        """
+
+        tree = {"sensor-groups": {"sensor-group": [sensor_group_entry(sensor_group, [sensor_path])]}}
+        return await self._set(update=[(CFG_PATH, tree)])
+
+    async def read_sensor_group(self, sensor_group):
+        """ Reads the configuration of a specific sensor group
+
+            :return: The gNMI Notification
+            :rtype: dict
+        """
+
+        return await self._get([object_path(("sensor-group", sensor_group))])
+
+    async def read_all_sensor_groups(self):
+        """ Reads the configuration of all sensor groups
+
+            :return: The gNMI Notification
+            :rtype: dict
+        """
+
+        return await self._get([CFG_PATH + '/sensor-groups'])
+
+    async def delete_sensor_group(self, sensor_group):
+        """ Deletes the configuration of a specific sensor group
+
+            :return: The gNMI Response
+            :rtype: dict
+        """
+
+        return await self._set(delete=[object_path(("sensor-group", sensor_group))])
+
+    ########## Subscriptions ##########
+
+    async def create_subscription(self, subscription, sensor_group, destination_group, interval=None):
+        """ Creates or modifies a subscription, with one or several sensor and destination profiles, see MDT.create_subscription()
+
+            :return: The gNMI Response
+            :rtype: dict
+        """
+
+        tree = {"subscriptions": {"subscription": [subscription_entry(subscription, *subscription_profiles(sensor_group, destination_group, interval))]}}
+        return await self._set(update=[(CFG_PATH, tree)])
+
+    async def read_subscription(self, subscription):
+        """ Read the configuration of a specified subscription
+
+            :return: The gNMI Notification
+            :rtype: dict
+        """
+
+        return await self._get([object_path(("subscription", subscription))])
+
+    async def read_all_subscriptions(self):
+        """ Reads the configuration of all subscriptions
+
+            :return: The gNMI Notification
+            :rtype: dict
+        """
+
+        return await self._get([CFG_PATH + '/subscriptions'])
+
+    async def delete_subscription(self, subscription):
+        """ Deletes the specified subscription
+
+            :return: The gNMI Response
+            :rtype: dict
+        """
+
+        return await self._set(delete=[object_path(("subscription", subscription))])
+
+    async def check_connection(self, subscription):
+        """ Checks telemetric connection to a host on the network
+
+            :return: Whether or not the subscription is active
+            :rtype: bool
+        """
+
+        request = OPER_PATH + '/subscriptions/subscription[subscription-id={}]/subscription'.format('"' + subscription + '"')
+        response = await self._get([request])
+        return response["notification"][0]["update"][0]["val"]["state"] == "active"
+
+    async def read_subscription_states(self):
+        """ Reads the configuration and oper state of every subscription in a single gNMI Get, see MDT.read_subscription_states()
+
+            :return: Map of configured subscription name to its oper state
+            :rtype: dict
+        """
+
+        return parse_subscription_states(await self._get([CFG_PATH + '/subscriptions', OPER_PATH + '/subscriptions']))
@@ -1,7 +1,370 @@
-from pygnmi.client import gNMIclient
+import re
+import time
+import functools
+import contextlib
+import collections
+import threading
+import json
+import grpc
+from pygnmi.client import gNMIclient, StreamSubscriber
+from pygnmi.spec.gnmi_pb2_grpc import gNMIStub
+from grpc import FutureTimeoutError
+import metrics
+import tracing
+
+CFG_PATH = "Cisco-IOS-XR-telemetry-model-driven-cfg:telemetry-model-driven"
+OPER_PATH = "Cisco-IOS-XR-telemetry-model-driven-oper:telemetry-model-driven"
+
+def destination_group_entry(destination_group, destinations):
+    """ Builds the configuration of a destination group
+
+        :param destination_group: Name of the destination group
+        :type destination_group: str
+        :param destinations: Tuples of (ip, port, encoding, protocol, tls, tls_hostname)
+        :type destinations: list
+        :return: The destination-group list entry
+        :rtype: dict
+    """
+
+    ipv4_destinations = []
+    for ip, port, encoding, protocol, tls, tls_hostname in destinations:
+        protocol_dict = {"protocol": protocol}
+
+        if not tls:
+            protocol_dict["no-tls"] = None
+        elif tls_hostname != None:
+            protocol_dict["tls-hostname"] = tls_hostname
+
+        ipv4_destinations.append({
+            "ipv4-address": ip,
+            "destination-port": port,
+            "encoding": encoding,
+            "protocol": protocol_dict
+        })
+
+    return {
+        "destination-id": destination_group,
+        "ipv4-destinations": {
+            "ipv4-destination": ipv4_destinations
+        }
+    }
+
+def sensor_group_entry(sensor_group, sensor_paths):
+    """ Builds the configuration of a sensor group
+
+        :param sensor_group: The name of the sensor group
+        :type sensor_group: str
+        :param sensor_paths: The names of the sensor paths
+        :type sensor_paths: list
+        :return: The sensor-group list entry
+        :rtype: dict
+    """
+
+    return {
+        "sensor-group-identifier": sensor_group,
+        "sensor-paths": {
+            "sensor-path": [{"telemetry-sensor-path": sensor_path} for sensor_path in sensor_paths]
+        }
+    }
+
+def subscription_entry(subscription, sensor_profiles, destination_profiles):
+    """ Builds the configuration of a subscription
+
+        :param subscription: Name of subscription
+        :type subscription: str
+        :param sensor_profiles: Map of sensor group name to its sample interval in milliseconds
+        :type sensor_profiles: dict
+        :param destination_profiles: Names of destination groups
+        :type destination_profiles: list
+        :return: The subscription list entry
+        :rtype: dict
+    """
+
+    entry = {"subscription-identifier": subscription}
+    if sensor_profiles:
+        entry["sensor-profiles"] = {
+            "sensor-profile": [{"sensorgroupid": sensor_group, "sample-interval": interval} for sensor_group, interval in sensor_profiles.items()]
+        }
+    if destination_profiles:
+        entry["destination-profiles"] = {
+            "destination-profile": [{"destination-id": destination_group} for destination_group in destination_profiles]
+        }
+    return entry
+
+def subscription_profiles(sensor_group, destination_group, interval=None):
+    """ Normalizes the profiles given to create_subscription()
+
+        :return: The sensor profiles and destination profiles arguments of subscription_entry()
+        :rtype: tuple
+    """
+
+    sensor_profiles = {sensor_group: interval} if isinstance(sensor_group, str) else dict(sensor_group)
+    destination_profiles = [destination_group] if isinstance(destination_group, str) else list(destination_group)
+    return sensor_profiles, destination_profiles
+
+def set_changes(update=None, delete=None):
+    """ Builds the content of a Set applying a set of telemetry changes
+
+        :param update: Objects to create or merge, in the format of MDT.apply()
+        :type update: dict, optional
+        :param delete: Objects to delete, in the format of MDT.apply()
+        :type delete: list, optional
+        :return: The tree to merge under CFG_PATH and the paths to delete
+        :rtype: tuple
+    """
+
+    tree = {}
+    if update and update.get("destination-groups"):
+        tree["destination-groups"] = {"destination-group": [destination_group_entry(name, destinations) for name, destinations in update["destination-groups"].items()]}
+    if update and update.get("sensor-groups"):
+        tree["sensor-groups"] = {"sensor-group": [sensor_group_entry(name, sensor_paths) for name, sensor_paths in update["sensor-groups"].items()]}
+    if update and update.get("subscriptions"):
+        tree["subscriptions"] = {"subscription": [subscription_entry(name, profiles["sensor-profiles"], profiles["destination-profiles"]) for name, profiles in update["subscriptions"].items()]}
+
+    return tree, [object_path(item) for item in delete or []]
+
+def set_replacements(replace=None):
+    """ Builds the replace operations of a Set, each object replaced as a whole at its own path
+
+        :param replace: Objects to replace, in the format of the update argument of MDT.apply()
+        :type replace: dict, optional
+        :return: Tuples of the path and the list entry replacing the object
+        :rtype: list
+    """
+
+    replaced = []
+    for name, destinations in (replace or {}).get("destination-groups", {}).items():
+        replaced.append((object_path(("destination-group", name)), destination_group_entry(name, destinations)))
+    for name, sensor_paths in (replace or {}).get("sensor-groups", {}).items():
+        replaced.append((object_path(("sensor-group", name)), sensor_group_entry(name, sensor_paths)))
+    for name, profiles in (replace or {}).get("subscriptions", {}).items():
+        replaced.append((object_path(("subscription", name)), subscription_entry(name, profiles["sensor-profiles"], profiles["destination-profiles"])))
+    return replaced
+
+def object_path(item):
+    """ Builds the path of a telemetry object, to read or delete it
+
+        :param item: Tuple of the object kind followed by its keys, e.g. ("sensor-path", sensor_group, sensor_path)
+        :type item: tuple
+        :return: The gNMI path
+        :rtype: str
+    """
+
+    quote = lambda key: '"' + str(key) + '"'
+    kind, keys = item[0], item[1:]
+
+    if kind == "destination-group":
+        return CFG_PATH + '/destination-groups/destination-group[destination-id={}]'.format(quote(keys[0]))
+    if kind == "destination":
+        return CFG_PATH + '/destination-groups/destination-group[destination-id={}]/ipv4-destinations/ipv4-destination[ipv4-address={}][destination-port={}]'.format(quote(keys[0]), quote(keys[1]), keys[2])
+    if kind == "sensor-group":
+        return CFG_PATH + '/sensor-groups/sensor-group[sensor-group-identifier={}]'.format(quote(keys[0]))
+    if kind == "sensor-path":
+        return CFG_PATH + '/sensor-groups/sensor-group[sensor-group-identifier={}]/sensor-paths/sensor-path[telemetry-sensor-path={}]'.format(quote(keys[0]), quote(keys[1]))
+    if kind == "subscription":
+        return CFG_PATH + '/subscriptions/subscription[subscription-identifier={}]'.format(quote(keys[0]))
+    if kind == "sensor-profile":
+        return CFG_PATH + '/subscriptions/subscription[subscription-identifier={}]/sensor-profiles/sensor-profile[sensorgroupid={}]'.format(quote(keys[0]), quote(keys[1]))
+    if kind == "destination-profile":
+        return CFG_PATH + '/subscriptions/subscription[subscription-identifier={}]/destination-profiles/destination-profile[destination-id={}]'.format(quote(keys[0]), quote(keys[1]))
+    raise ValueError("Unknown telemetry object: " + kind)
+
+def parse_subscription_states(response):
+    """ Parses the configuration and oper state of every subscription, read in a single gNMI Get
+
+        :param response: The gNMI Notification of CFG_PATH/subscriptions and OPER_PATH/subscriptions
+        :type response: dict
+        :return: Map of configured subscription name to its oper state, in the format of MDT.read_subscription_states()
+        :rtype: dict
+    """
+
+    # Config entries are keyed by subscription-identifier, oper entries by subscription-id
+    configured = []
+    states = {}
+    for notification in (response or {}).get("notification", []):
+        for update in notification.get("update") or []:
+            path = update.get("path") or ""
+            val = strip_modules(update.get("val"))
+            if not isinstance(val, dict):
+                continue
+            entries = val["subscription"] if isinstance(val.get("subscription"), list) else [val]
+
+            for entry in entries:
+                if "subscription-identifier" in entry or "[subscription-identifier=" in path:
+                    name = entry.get("subscription-identifier") or re.search(r'\[subscription-identifier=([^\]]+)\]', path).group(1)
+                    configured.append(name.strip('"'))
+                elif "subscription-id" in entry or "[subscription-id=" in path:
+                    name = entry.get("subscription-id") or re.search(r'\[subscription-id=([^\]]+)\]', path).group(1)
+                    if isinstance(entry.get("subscription"), dict) and "state" in entry["subscription"]:
+                        states[name.strip('"')] = entry["subscription"]["state"]
+
+    return {name: states.get(name, "unknown") for name in configured}
+
+def strip_modules(data):
+    """ Removes the YANG module prefixes that JSON IETF may add to member names
+
+        :param data: A decoded JSON IETF value
+        :return: The same value with unqualified member names
+    """
+
+    if isinstance(data, dict):
+        return {key.split(":")[-1]: strip_modules(value) for key, value in data.items()}
+    if isinstance(data, list):
+        return [strip_modules(value) for value in data]
+    return data
+
+def _rpc(method):
+    """ Records the duration and gRPC errors of an MDT method in metrics, labelled with the router and method name, and traces it as a span
+        pygnmi returns the error of a failed Set instead of raising it, so returned errors are counted too
+        Every method also takes a timeout keyword, the deadline of each of its RPCs in seconds, by default the one the MDT was built with
+    """
+
+    @functools.wraps(method)
+    def wrapper(self, *args, timeout=None, **kwargs):
+        start = time.perf_counter()
+        if timeout == None:
+            timeout = self.timeouts.get(method.__name__, self.timeout)
+        with tracing.span("MDT." + method.__name__, router=self.name) as span, self._deadline.limit(timeout):
+            try:
+                response = method(self, *args, **kwargs)
+            except Exception as err:
+                metrics.RPC_ERRORS.inc(router=self.name, method=method.__name__, code=metrics.code(err))
+                span.fail(metrics.code(err))
+                raise
+            finally:
+                metrics.RPC_DURATION.observe(time.perf_counter() - start, router=self.name, method=method.__name__)
+
+            for result in response if isinstance(response, list) else [response]:
+                if isinstance(result, grpc.RpcError):
+                    metrics.RPC_ERRORS.inc(router=self.name, method=method.__name__, code=metrics.code(result))
+                    span.fail(metrics.code(result))
+            return response
+
+    return wrapper
+
+class _CallDetails(collections.namedtuple("_CallDetails", ("method", "timeout", "metadata", "credentials", "wait_for_ready", "compression")), grpc.ClientCallDetails):
+    pass
+
+class _Deadline(grpc.UnaryUnaryClientInterceptor):
+    def __init__(self):
+        """ Gives the unary RPCs of a channel the deadline in effect in the calling thread, since pygnmi never passes one
+            The deadline is the shortest of the timeouts of the calls under way and what remains of the budget
+        """
+        self._local = threading.local()
+
+    @contextlib.contextmanager
+    def limit(self, timeout=None, budget=None):
+        """ Limits the RPCs issued in the block to timeout seconds each, and all of them together to budget seconds
+
+            :param timeout: Seconds each RPC may take
+            :type timeout: float, optional
+            :param budget: Seconds all RPCs may take together
+            :type budget: float, optional
+        """
+
+        previous = (getattr(self._local, "timeout", None), getattr(self._local, "end", None))
+        if timeout != None and previous[0] != None:
+            timeout = min(timeout, previous[0])
+        end = time.monotonic() + budget if budget != None else None
+        if end != None and previous[1] != None:
+            end = min(end, previous[1])
+        self._local.timeout = timeout if timeout != None else previous[0]
+        self._local.end = end if end != None else previous[1]
+        try:
+            yield
+        finally:
+            self._local.timeout, self._local.end = previous
+
+    def timeout(self):
+        """ Returns the deadline of an RPC issued now in seconds, None if there is none
+        """
+
+        timeout = getattr(self._local, "timeout", None)
+        end = getattr(self._local, "end", None)
+        if end != None:
+            timeout = max(end - time.monotonic(), 0) if timeout == None else max(min(timeout, end - time.monotonic()), 0)
+        return timeout
+
+    def intercept_unary_unary(self, continuation, client_call_details, request):
+        timeout = self.timeout()
+        if timeout != None and (client_call_details.timeout == None or timeout < client_call_details.timeout):
+            client_call_details = _CallDetails(client_call_details.method, timeout, client_call_details.metadata, client_call_details.credentials,
+                                               client_call_details.wait_for_ready, client_call_details.compression)
+        return continuation(client_call_details, request)
+
+class _Cancellable(grpc.StreamStreamClientInterceptor):
+    def __init__(self):
+        """ Keeps the streaming calls made through a channel so that they can be cancelled
+            pygnmi's subscribers only half-close their Subscribe, which the router is free to keep serving
+        """
+        self._lock = threading.Lock()
+        self._calls = []
+        self._cancelled = False
+
+    def cancel(self):
+        """ Cancels the calls made so far, and any made from now on
+        """
+
+        with self._lock:
+            self._cancelled = True
+            calls = list(self._calls)
+        for call in calls:
+            call.cancel()
+
+    def intercept_stream_stream(self, continuation, client_call_details, request_iterator):
+        call = continuation(client_call_details, request_iterator)
+        with self._lock:
+            self._calls.append(call)
+            cancelled = self._cancelled
+        if cancelled:
+            call.cancel()
+        return call
+
+class _TracedClient:
+    RPCS = {"capabilities": "gNMI.Capabilities", "get": "gNMI.Get", "set": "gNMI.Set", "subscribe2": "gNMI.Subscribe"}
+
+    def __init__(self, client, name):
+        """ Wraps a pygnmi gNMIclient so that, while tracing is enabled, every RPC is a span with its paths, payload and response sizes and outcome
+
+            :param client: The connected client
+            :type client: gNMIclient
+            :param name: Name of the router
+            :type name: str
+        """
+        self._client = client
+        self._name = name
+
+    def __getattr__(self, attr):
+        method = getattr(self._client, attr)
+        if attr not in self.RPCS or not tracing.enabled():
+            return method
+
+        def traced(*args, **kwargs):
+            paths = list(kwargs.get("path") or [])
+            payload = []
+            for operation in ("delete", "replace", "update"):
+                for entry in kwargs.get(operation) or []:
+                    paths.append(entry[0] if isinstance(entry, tuple) else entry)
+                    payload.append(entry[1] if isinstance(entry, tuple) else None)
+            if "subscribe" in kwargs:
+                paths += [entry["path"] for entry in kwargs["subscribe"].get("subscription", [])]
+
+            with tracing.span(self.RPCS[attr], router=self._name, paths=paths, payload_bytes=len(json.dumps(payload))) as span:
+                try:
+                    response = method(*args, **kwargs)
+                except Exception as err:
+                    span.fail(metrics.code(err))
+                    raise
+                if isinstance(response, grpc.RpcError):
+                    span.fail(metrics.code(response))
+                elif isinstance(response, dict):
+                    span.set(response_bytes=len(json.dumps(response, default=str)))
+                return response
+
+        return traced
 
 class MDT:
-    def __init__(self, host, port, user, password, path_cert=None):
+    def __init__(self, host, port, user, password, path_cert=None, name=None, timeout=None, timeouts=None, connect_timeout=None):
         """ Constructor Method
 
             :param host: The ip address for the device
@@ -14,19 +377,66 @@ class MDT:
             :type password: str
             :param path_cert: Path to certificate for a secure TLS connection
             :type password: str, optional
+            :param name: Name of the router in metrics, host:port by default
+            :type name: str, optional
+            :param timeout: Deadline of every RPC in seconds, RPCs wait for the router indefinitely without one
+            :type timeout: float, optional
+            :param timeouts: Deadlines overriding timeout for some methods, by method name, e.g. {"apply": 30}
+            :type timeouts: dict, optional
+            :param connect_timeout: Seconds to wait for the channel, pygnmi's default when not given
+            :type connect_timeout: float, optional
         """
+        self.name = name if name != None else host + ":" + str(port)
+        self.timeout = timeout
+        self.timeouts = timeouts or {}
+        self._deadline = _Deadline()
         if path_cert == None:
-            self._client = gNMIclient(target=(host, port), username=user, password=password, insecure=True)
+            client = gNMIclient(target=(host, port), username=user, password=password, insecure=True)
         else:
-            self._client = gNMIclient(target=(host, port), username=user, password=password, path_cert=path_cert, override="ems.cisco.com")
-        self._client.connect()
+            client = gNMIclient(target=(host, port), username=user, password=password, path_cert=path_cert, override="ems.cisco.com")
+        self._client = _TracedClient(client, self.name)
+        self._client.connect(timeout=connect_timeout)
+        # pygnmi has no way to pass a deadline or an interceptor, its stub is rebuilt on an intercepted channel
+        client._gNMIclient__stub = gNMIStub(grpc.intercept_channel(client._gNMIclient__channel, self._deadline))
 
     def __enter__(self):
         return self
 
     def __exit__(self, type, value, traceback):
+        self.close()
+
+    def close(self):
+        """ Closes the underlying gRPC channel
+        """
+
         self._client.close()
 
+    def budget(self, seconds):
+        """ Limits the time all the RPCs issued in a with block may take together, each one's deadline is cut to what remains
+
+            :param seconds: The budget, None for no limit
+            :type seconds: float
+            :return: The context manager
+        """
+
+        return self._deadline.limit(budget=seconds)
+
+    def is_connected(self, timeout=1):
+        """ Checks whether the underlying gRPC channel is still usable without issuing an RPC
+
+            :param timeout: Seconds to wait for the channel to become ready
+            :type timeout: float, optional
+            :return: Whether or not the channel is ready
+            :rtype: bool
+        """
+
+        try:
+            self._client.wait_for_connect(timeout)
+        except FutureTimeoutError:
+            return False
+        return True
+
+    @_rpc
     def get_capabilities(self):
         """ Gets the capabilities of the target device
 
@@ -36,6 +446,7 @@ class MDT:
 
         return self._client.capabilities()
 
+    @_rpc
     def get_config(self):
         """ Gets the current telemetry configuration in JSON format
 
@@ -43,10 +454,35 @@ class MDT:
             :rtype: dict
         """
 
-        return self._client.get(path=['Cisco-IOS-XR-telemetry-model-driven-cfg:telemetry-model-driven'], encoding='json_ietf')
+        return self._client.get(path=[CFG_PATH], encoding='json_ietf')
+
+    @_rpc
+    def apply(self, update=None, delete=None, replace=None):
+        """ Applies a set of telemetry changes in a single gNMI Set, which the router commits as one transaction
+            The router applies the deletes first, then the replaces, then the updates
+
+            :param update: Objects to create or merge, as {"destination-groups": {name: [(ip, port, encoding, protocol, tls, tls_hostname)]},
+                           "sensor-groups": {name: [sensor_path]}, "subscriptions": {name: {"sensor-profiles": {sensor_group: interval}, "destination-profiles": [name]}}}
+            :type update: dict, optional
+            :param delete: Objects to delete, as tuples of their kind and keys, e.g. ("subscription", name) or ("sensor-path", sensor_group, sensor_path)
+            :type delete: list, optional
+            :param replace: Objects to replace as a whole, in the format of update. Whatever they contain that is not given is removed
+            :type replace: dict, optional
+            :return: The gNMI Response, None if there was nothing to change
+            :rtype: dict
+        """
+
+        tree, paths = set_changes(update, delete)
+        replaced = set_replacements(replace)
+
+        if not tree and not paths and not replaced:
+            return None
+
+        return self._client.set(update=[(CFG_PATH, tree)] if tree else None, replace=replaced or None, delete=paths or None, encoding='json_ietf')
 
     ########## Destination Groups ##########
 
+    @_rpc
     def create_destination(self, destination_group, ip, port, encoding, protocol, tls, tls_hostname=None):
         """ Creates a new destination group, or adds a new destination to an existing group (if name matches the name of the existing group)
             Can also be used to modify attributes of a destination if name and ip match the name and ip of an exisiting group
@@ -69,33 +505,14 @@ class MDT:
             :rtype: dict
         """
 
-        protocol_dict = {"protocol": protocol}
-
-        if not tls:
-            protocol_dict["no-tls"] = None
-        elif tls_hostname != None:
-            protocol_dict["tls-hostname"] = tls_hostname
-
         request = [
             (
-            "Cisco-IOS-XR-telemetry-model-driven-cfg:telemetry-model-driven",
+            CFG_PATH,
             
             {
                 "destination-groups": {
                     "destination-group": [
-                        {
-                            "destination-id": destination_group,
-                            "ipv4-destinations": {
-                                "ipv4-destination": [
-                                    {
-                                        "ipv4-address": ip,
-                                        "destination-port": port,
-                                        "encoding": encoding,
-                                        "protocol": protocol_dict
-                                    }
-                                ]
-                            }
-                        }
+                        destination_group_entry(destination_group, [(ip, port, encoding, protocol, tls, tls_hostname)])
                     ]
                 }
             }
@@ -105,6 +522,7 @@ class MDT:
         response = self._client.set(update=request, encoding='json_ietf')
         return response
 
+    @_rpc
     def read_destination_group(self, destination_group):
         """ Reads the configuration of a specific destination group
         
@@ -117,6 +535,7 @@ class MDT:
         request = 'Cisco-IOS-XR-telemetry-model-driven-cfg:telemetry-model-driven/destination-groups/destination-group[destination-id={}]'.format('"' + destination_group + '"')
         return self._client.get(path=[request], encoding='json_ietf')
 
+    @_rpc
     def read_all_destination_groups(self):
         """ Reads the configuration of all destination groups
 
@@ -128,6 +547,7 @@ class MDT:
         response = self._client.get(path=[request], encoding='json_ietf')
         return response
     
+    @_rpc
     def delete_destination_group(self, destination_group):
         """ Deletes the configuration of a specific destination group
         
@@ -143,6 +563,7 @@ class MDT:
 
     ########## Sensor Groups ##########
 
+    @_rpc
     def create_sensor_path(self, sensor_group, sensor_path):
         """ Creates a new sensor group with the sensor path, or adds the sensor path to an existing group (if name of group matches an existing group)
         
@@ -156,21 +577,12 @@ class MDT:
 
         request = [
             (
-            "Cisco-IOS-XR-telemetry-model-driven-cfg:telemetry-model-driven",
+            CFG_PATH,
 
             {
                 "sensor-groups": {
                     "sensor-group": [
-                        {
-                            "sensor-group-identifier": sensor_group,
-                            "sensor-paths": {
-                                "sensor-path": [
-                                    {
-                                        "telemetry-sensor-path": sensor_path
-                                    }
-                                ]
-                            }
-                        }
+                        sensor_group_entry(sensor_group, [sensor_path])
                     ]
                 }
             }
@@ -180,6 +592,7 @@ class MDT:
         response = self._client.set(update=request, encoding='json_ietf')
         return response
 
+    @_rpc
     def read_sensor_group(self, sensor_group):
         """ Reads the configuration of a specific sensor group
         
@@ -192,6 +605,7 @@ class MDT:
         request = 'Cisco-IOS-XR-telemetry-model-driven-cfg:telemetry-model-driven/sensor-groups/sensor-group[sensor-group-identifier={}]'.format('"' + sensor_group + '"')
         return self._client.get(path=[request], encoding='json_ietf')
 
+    @_rpc
     def read_all_sensor_groups(self):
         """ Reads the configuration of all sensor groups
         
@@ -202,6 +616,7 @@ class MDT:
         request = 'Cisco-IOS-XR-telemetry-model-driven-cfg:telemetry-model-driven/sensor-groups'
         return self._client.get(path=[request], encoding='json_ietf')
 
+    @_rpc
     def delete_sensor_group(self, sensor_group):
         """ Deletes the configuration of a specific sensor group
         
@@ -217,46 +632,31 @@ class MDT:
 
     ########## Subscriptions ##########
 
-    def create_subscription(self, subscription, sensor_group, destination_group, interval):
+    @_rpc
+    def create_subscription(self, subscription, sensor_group, destination_group, interval=None):
         """ Creates or modifies an existing subscription. To modify a subscription, enter a name of an already existing subscription
+            Every sensor profile and destination profile is sent in a single Set
         
             :param subscription: Name of subscription
             :type subscription: str
-            :param sensor_group: Name of sensor group
-            :type sensor_group: str
-            :param destination_group: Name of destination group
-            :type destination_group: str
-            :param interval: The interval to stream data in milliseconds
-            :type interval: int
+            :param sensor_group: Name of sensor group, or a list of (sensor group, interval) sensor profiles
+            :type sensor_group: str or list
+            :param destination_group: Name of destination group, or a list of them
+            :type destination_group: str or list
+            :param interval: The interval to stream data in milliseconds, when a single sensor group is given
+            :type interval: int, optional
             :return: The gNMI Response
             :rtype: dict
         """
 
         request = [
             (
-            "Cisco-IOS-XR-telemetry-model-driven-cfg:telemetry-model-driven",
+            CFG_PATH,
             
             {
                 "subscriptions": {
                     "subscription": [
-                        {
-                            "subscription-identifier": subscription,
-                            "sensor-profiles": {
-                                "sensor-profile": [
-                                    {
-                                        "sensorgroupid": sensor_group,
-                                        "sample-interval": interval
-                                    }
-                                ]
-                            },
-                            "destination-profiles": {
-                                "destination-profile": [
-                                    {
-                                        "destination-id": destination_group
-                                    }
-                                ]
-                            }
-                        }
+                        subscription_entry(subscription, *subscription_profiles(sensor_group, destination_group, interval))
                     ]
                 }
             }
@@ -266,6 +666,7 @@ class MDT:
         response = self._client.set(update=request, encoding='json_ietf')
         return response
 
+    @_rpc
     def read_subscription(self, subscription):
         """ Read the configuration of a specified subscription
         
@@ -279,6 +680,7 @@ class MDT:
         response = self._client.get(path=[request], encoding='json_ietf')
         return response
 
+    @_rpc
     def read_all_subscriptions(self):
         """ Reads the configuration of all subscriptions
         
@@ -290,6 +692,7 @@ class MDT:
         response = self._client.get(path=[request], encoding='json_ietf')
         return response
 
+    @_rpc
     def delete_subscription(self, subscription):
         """ Deletes the specified subscription
         
@@ -303,6 +706,7 @@ class MDT:
         response = self._client.set(delete=[request], encoding='json_ietf')
         return response
 
+    @_rpc
     def check_connection(self, subscription):
         """ Checks telemetric connection to a host on the network
         
@@ -314,4 +718,137 @@ class MDT:
 
         request = 'Cisco-IOS-XR-telemetry-model-driven-oper:telemetry-model-driven/subscriptions/subscription[subscription-id={}]/subscription'.format('"' + subscription + '"')
         response = self._client.get(path=[request], encoding='json_ietf')
-        return response["notification"][0]["update"][0]["val"]["state"] == "active"
\ No newline at end of file
+        return response["notification"][0]["update"][0]["val"]["state"] == "active"
+
+    @_rpc
+    def read_subscription_states(self):
+        """ Reads the configuration and oper state of every subscription in a single gNMI Get
+
+            :return: Map of configured subscription name to its oper state ("active", "not active", ...),
+                     "unknown" when the router has not reported a state yet. Subscriptions that are not configured are absent
+            :rtype: dict
+        """
+
+        return parse_subscription_states(self._client.get(path=[CFG_PATH + '/subscriptions', OPER_PATH + '/subscriptions'], encoding='json_ietf'))
+
+    @_rpc
+    def subscribe_connections(self, mode="on_change", interval=30):
+        """ Opens a gNMI Subscribe on the oper state of every telemetry subscription
+
+            :param mode: Subscription mode, either "on_change" or "sample"
+            :type mode: str, optional
+            :param interval: Seconds between heartbeats (on_change) or samples (sample)
+            :type interval: float, optional
+            :return: The stream of gNMI Notifications, its cancel() cancels the Subscribe RPC
+            :rtype: pygnmi.client.StreamSubscriber
+        """
+
+        entry = {
+            "path": OPER_PATH + "/subscriptions/subscription/subscription/state",
+            "mode": mode
+        }
+        if mode == "sample":
+            entry["sample_interval"] = int(interval * 1e9)
+        else:
+            entry["heartbeat_interval"] = int(interval * 1e9)
+
+        # Subscribed the way subscribe2 does, on a channel that keeps hold of the call so that it can be cancelled
+        calls = _Cancellable()
+        with tracing.span("gNMI.Subscribe", router=self.name, paths=[entry["path"]]):
+            request = self._client._build_subscriptionrequest({"subscription": [entry], "mode": "stream", "encoding": "json_ietf"})
+            subscriber = StreamSubscriber(grpc.intercept_channel(self._client._gNMIclient__channel, calls), request, self._client._gNMIclient__metadata)
+        subscriber.cancel = calls.cancel
+        return subscriber
+
+class Session:
+    def __init__(self, host, port, user, password, path_cert=None, retries=5, backoff=1, max_backoff=60, name=None, timeout=None, timeouts=None):
+        """ Long-lived gNMI session that keeps one MDT connection open and reconnects only when its channel breaks
+
+            :param host: The ip address for the device
+            :type host: str
+            :param port: The port for the device
+            :type port: int
+            :param user: Username for device login
+            :type user: str
+            :param password: Password for device login
+            :type password: str
+            :param path_cert: Path to certificate for a secure TLS connection
+            :type path_cert: str, optional
+            :param retries: Number of connection attempts before giving up
+            :type retries: int, optional
+            :param backoff: Initial delay between connection attempts in seconds, doubled after every failure
+            :type backoff: float, optional
+            :param max_backoff: Upper bound on the delay between connection attempts in seconds
+            :type max_backoff: float, optional
+            :param name: Name of the router in metrics, host:port by default
+            :type name: str, optional
+            :param timeout: Deadline of every RPC in seconds, see MDT
+            :type timeout: float, optional
+            :param timeouts: Deadlines of some MDT methods, see MDT
+            :type timeouts: dict, optional
+        """
+        self._args = (host, port, user, password)
+        self.timeout = timeout
+        self.timeouts = timeouts
+        self.connect_timeout = None
+        self.name = name if name != None else host + ":" + str(port)
+        self._path_cert = path_cert
+        self._retries = retries
+        self._backoff = backoff
+        self._max_backoff = max_backoff
+        self._mdt = None
+        self._generation = 0
+        self.connects = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, type, value, traceback):
+        self.reset()
+
+    def client(self):
+        """ Returns the open MDT connection, reconnecting with exponential backoff if the channel is broken
+
+            :return: A connected MDT instance
+            :rtype: MDT
+        """
+
+        if self._mdt != None:
+            if self._mdt.is_connected():
+                # Deadlines changed since the connection was opened apply from now on
+                self._mdt.timeout, self._mdt.timeouts = self.timeout, self.timeouts or {}
+                return self._mdt
+            self.reset()
+
+        # A reset while connecting cancels the connection, pygnmi cannot be interrupted so its result is dropped
+        generation = self._generation
+        delay = self._backoff
+        for attempt in range(self._retries):
+            try:
+                mdt = MDT(*self._args, path_cert=self._path_cert, name=self.name, timeout=self.timeout, timeouts=self.timeouts, connect_timeout=self.connect_timeout)
+                if self._generation != generation:
+                    mdt.close()
+                    raise ConnectionAbortedError("Session was reset while connecting to " + self.name)
+                self._mdt = mdt
+                if self.connects > 0:
+                    metrics.RECONNECTS.inc(router=self.name)
+                self.connects += 1
+                return self._mdt
+            except FutureTimeoutError as err:
+                metrics.RPC_ERRORS.inc(router=self.name, method="connect", code=metrics.code(err))
+                if attempt == self._retries - 1:
+                    raise
+                time.sleep(delay)
+                delay = min(delay * 2, self._max_backoff)
+                if self._generation != generation:
+                    raise ConnectionAbortedError("Session was reset while connecting to " + self.name)
+
+    def reset(self):
+        """ Closes the current connection so that the next call to client() reconnects
+        """
+
+        # Another thread may reset at the same time to cancel the RPCs or the connection in progress
+        self._generation += 1
+        mdt, self._mdt = self._mdt, None
+        if mdt != None:
+            mdt.close()
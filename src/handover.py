@@ -0,0 +1,78 @@
+import time
+
+OVERLAP = 30
+
+class MakeBeforeBreak:
+    def __init__(self, overlap=OVERLAP, clock=time.monotonic):
+        """ Keeps the subscription of the collector failed back from until its replacement has been streaming for an overlap window,
+            so that no sample is lost while the higher priority subscription warms up
+
+            :param overlap: Seconds the new collector must be active before the old subscription is removed
+            :type overlap: float, optional
+            :param clock: Returns the current time in seconds
+            :type clock: function, optional
+        """
+        self.overlap = overlap
+        self._clock = clock
+        self.active = -1
+        self.retained = None
+        self._since = None
+
+    def retain(self, active, up):
+        """ Records the chosen collector and returns the lowest priority one whose subscription must stay
+
+            :param active: Index of the chosen collector, -1 if none is up
+            :type active: int
+            :param up: For every collector in priority order, whether its subscription is active, None when it has no subscription
+            :type up: list
+            :return: active, or the index of the collector failed back from while the overlap lasts
+            :rtype: int
+        """
+
+        now = self._clock()
+        if active != self.active:
+            if active != -1 and self.active > active and up[self.active]:
+                # Failing back, the old collector keeps streaming until the new one is confirmed
+                self.retained = self.active
+                self._since = now
+            elif self.retained != None and active >= self.retained:
+                self.retained = None
+            self.active = active
+
+        if self.retained != None and (active == -1 or not up[self.retained] or now - self._since >= self.overlap):
+            self.retained = None
+        return self.retained if self.retained != None else active
+
+class WarmStandby:
+    def __init__(self):
+        """ Keeps a subscription with every sensor profile for each backup collector, without a destination profile, so that failing over
+            only adds the destination profile of the backup in one small Set instead of creating its subscription
+            Tracks the destination profiles of the subscriptions, since oper states cannot tell a standby subscription from a down one
+        """
+        self.armed = None
+
+    def learn(self, running):
+        """ Records the destination profiles of the running configuration
+
+            :param running: The running tree, from reconcile.running() or the desired tree once it has been applied
+            :type running: dict
+        """
+
+        self.armed = {name: dict(subscription["destination-profiles"]) for name, subscription in running.get("subscriptions", {}).items() if subscription["destination-profiles"]}
+
+    def assumed(self, states, desired_tree):
+        """ Builds the running subscriptions from their oper states and the destination profiles last applied
+
+            :param states: Map of configured subscription name to its oper state
+            :type states: dict
+            :param desired_tree: The desired tree
+            :type desired_tree: dict
+            :return: The running tree, with only the subscriptions section
+            :rtype: dict
+        """
+
+        subscriptions = desired_tree.get("subscriptions", {})
+        return {"subscriptions": {name: {
+            "sensor-profiles": subscriptions[name]["sensor-profiles"] if name in subscriptions else {},
+            "destination-profiles": self.armed.get(name, {})
+        } for name in states}}
@@ -0,0 +1,205 @@
+import threading
+import grpc
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+REGISTRY = []
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(labels, extra=None):
+    pairs = list(labels) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    return "{" + ",".join(name + '="' + _escape(value) + '"' for name, value in pairs) + "}"
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Metric:
+    def __init__(self, name, documentation, kind, labels=()):
+        """ A metric family, with one sample set per combination of label values
+
+            :param name: Name of the family, without the _total suffix of counters
+            :type name: str
+            :param documentation: HELP text
+            :type documentation: str
+            :param kind: OpenMetrics type, "counter", "gauge" or "histogram"
+            :type kind: str
+            :param labels: Names of the labels every sample carries
+            :type labels: tuple, optional
+        """
+        self.name = name
+        self.documentation = documentation
+        self.kind = kind
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+        self._values = {}
+        REGISTRY.append(self)
+
+    def _key(self, labels):
+        if set(labels) != set(self.labels):
+            raise ValueError(self.name + " takes the labels " + ", ".join(self.labels))
+        return tuple((name, labels[name]) for name in self.labels)
+
+    def remove(self, **labels):
+        """ Drops the samples of one combination of label values, e.g. a router that is no longer monitored
+        """
+
+        with self._lock:
+            for key in [key for key in self._values if all(dict(key).get(name) == value for name, value in labels.items())]:
+                del self._values[key]
+
+    def render(self):
+        """ Renders the family in the OpenMetrics text format
+
+            :rtype: str
+        """
+
+        lines = ["# TYPE " + self.name + " " + self.kind, "# HELP " + self.name + " " + _escape(self.documentation)]
+        with self._lock:
+            for key, value in sorted(self._values.items(), key=lambda item: str(item[0])):
+                lines += self._samples(key, value)
+        return "\n".join(lines) + "\n"
+
+class Counter(Metric):
+    def __init__(self, name, documentation, labels=()):
+        super().__init__(name, documentation, "counter", labels)
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def _samples(self, key, value):
+        return [self.name + "_total" + _labels(key) + " " + _number(value)]
+
+class Gauge(Metric):
+    def __init__(self, name, documentation, labels=()):
+        super().__init__(name, documentation, "gauge", labels)
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def value(self, **labels):
+        with self._lock:
+            return self._values.get(self._key(labels))
+
+    def _samples(self, key, value):
+        return [self.name + _labels(key) + " " + _number(value)]
+
+class Histogram(Metric):
+    def __init__(self, name, documentation, labels=(), buckets=DURATION_BUCKETS):
+        super().__init__(name, documentation, "histogram", labels)
+        self.buckets = tuple(buckets) + (float("inf"),)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._values.get(key, ([0] * len(self.buckets), 0))
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[index] += 1
+                    break
+            self._values[key] = (counts, total + value)
+
+    def count(self, **labels):
+        with self._lock:
+            counts, total = self._values.get(self._key(labels), ([0], 0))
+            return sum(counts)
+
+    def _samples(self, key, value):
+        counts, total = value
+        samples = []
+        cumulative = 0
+        for bound, count in zip(self.buckets, counts):
+            cumulative += count
+            samples.append(self.name + "_bucket" + _labels(key, ("le", _number(float(bound)))) + " " + str(cumulative))
+        samples.append(self.name + "_sum" + _labels(key) + " " + _number(float(total)))
+        samples.append(self.name + "_count" + _labels(key) + " " + str(cumulative))
+        return samples
+
+def render():
+    """ Renders every registered metric in the OpenMetrics text format
+
+        :rtype: str
+    """
+
+    return "".join(metric.render() for metric in REGISTRY) + "# EOF\n"
+
+def remove(**labels):
+    """ Drops the samples of every registered metric carrying these label values, e.g. remove(router=name) once a router is no longer monitored
+    """
+
+    for metric in REGISTRY:
+        if set(labels) <= set(metric.labels):
+            metric.remove(**labels)
+
+def code(err):
+    """ Returns the gRPC status code name of an error raised or returned by pygnmi
+
+        :param err: The error
+        :type err: Exception
+        :rtype: str
+    """
+
+    if isinstance(err, grpc.FutureTimeoutError):
+        return "UNAVAILABLE"
+    # pygnmi wraps the RpcError of a failed Get in a plain Exception
+    for candidate in (err, err.args[0] if err.args else None, err.__context__):
+        if isinstance(candidate, grpc.RpcError) and hasattr(candidate, "code"):
+            return candidate.code().name
+    return "UNKNOWN"
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def serve(port, address="127.0.0.1"):
+    """ Serves /metrics over HTTP from a background thread
+
+        :param port: Port to listen on, 0 for any free port
+        :type port: int
+        :param address: Address to listen on
+        :type address: str, optional
+        :return: The running server, its port is server.server_address[1]
+        :rtype: ThreadingHTTPServer
+    """
+
+    server = ThreadingHTTPServer((address, port), _Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+########## Monitor metrics ##########
+
+RPC_DURATION = Histogram("xr_monitor_rpc_duration_seconds", "Duration of MDT methods, each one or a few gNMI RPCs", ("router", "method"))
+RPC_ERRORS = Counter("xr_monitor_rpc_errors", "gNMI errors by MDT method and gRPC status code", ("router", "method", "code"))
+RECONNECTS = Counter("xr_monitor_reconnects", "gNMI channels opened to the router after the first one", ("router",))
+CYCLE_DURATION = Histogram("xr_monitor_cycle_duration_seconds", "Duration of a monitor cycle, connecting, probing and check()", ("router",))
+ACTIVE_COLLECTOR = Gauge("xr_monitor_active_collector", "Index of the collector currently streamed to, -1 when none is active", ("router",))
+FAILOVERS = Counter("xr_monitor_failovers", "Changes of the collector streamed to", ("router",))
+PROBE_SUCCESS = Gauge("xr_monitor_probe_last_success_timestamp_seconds", "Unix time of the last successful probe of a collector, subtract from time() for the time since", ("router", "collector"))
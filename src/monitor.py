@@ -1,4 +1,16 @@
-from gnmi_config import MDT
+from gnmi_config import Session
+from stream import StateStream
+from fleet import Fleet
+from watch import Watcher
+import schedule
+import damping
+import handover
+import cache
+import checkpoint
+import reconcile
+import probe
+import metrics
+import tracing
 import yaml
 import os
 import sys
@@ -6,6 +18,8 @@ import json
 import logging
 import logging.handlers
 import signal
+import threading
+import time
 from cerberus import Validator
 from grpc import FutureTimeoutError
 
@@ -22,9 +36,22 @@ logger.setLevel(logging.DEBUG)
 logger.addHandler(stream_handler)
 
 logging.getLogger('pygnmi').setLevel(logging.CRITICAL)
+logging.getLogger('fleet').addHandler(stream_handler)
 
 #################################################
 
+# Seconds the telemetry configuration of every router has to be cleaned up after SIGTERM
+SHUTDOWN_DEADLINE = 10
+
+# Seconds to wait for a router's channel while shutting down, pygnmi waits twice this long
+SHUTDOWN_CONNECT_TIMEOUT = 1
+
+# Seconds each gNMI call to a router may take
+RPC_TIMEOUT = 10
+
+# Signals handled by main()
+SIGNALS = {signal.SIGTERM, signal.SIGHUP, signal.SIGUSR1}
+
 def validate_config(config, schema):
     """
         Validates the config.yaml file against the mandated schema
@@ -36,133 +63,509 @@ def validate_config(config, schema):
         for error in v.errors.items():
             logger.debug(str(error))
         raise RuntimeError("config.yaml formatted improperly")
+
+    sensor_groups = {sensor_group["sensor-group-id"] for sensor_group in config["sensor-groups"]}
+    for collector in config["collectors"]:
+        for entry in collector["subscription"].get("sensor-groups", []):
+            if entry["sensor-group-id"] not in sensor_groups:
+                logger.error('Subscription ' + collector["subscription"]["subscription-id"] + ' streams an unknown sensor group: ' + entry["sensor-group-id"])
+                raise RuntimeError("config.yaml formatted improperly")
     logger.info('config.yaml read successfully')
 
     return True
 
-def setup(config):
+def routers(config):
     """
-        Creates a destination group for each collector in config.yaml
-        Creates all sensor groups defined in config.yaml
+        Splits config.yaml into one single-router config per router
+        Every router in a fleet shares the sensor groups, collectors and monitor settings defined at the top level
     """
 
-    try:
-        router = config["router"]
+    if "router" in config:
+        return [config]
 
-        if router["tls"]:
-            path_cert = "/config/ems.pem"
-        else:
-            path_cert = None
-    
-        with MDT(router["ip"], router["port"], router["username"], router["password"], path_cert=path_cert) as router_config:
+    configs = []
+    for router in config["routers"]:
+        single = {key: value for key, value in config.items() if key != "routers"}
+        single["router"] = router
+        configs.append(single)
 
-            for collector in config["collectors"]:
-                dg = collector["destination-group"]
-                tls_hostname = dg["tls-hostname"] if "tls-hostname" in dg else None
-                router_config.create_destination(dg["destination-id"], dg["ip"], dg["port"], dg["encoding"], dg["protocol"], dg["tls"], tls_hostname)
+    names = [router_name(single) for single in configs]
+    if len(set(names)) != len(names):
+        logger.error('config.yaml lists the same router more than once')
+        raise RuntimeError("config.yaml lists the same router more than once")
 
-                logger.info('Created Destination Group: ' + dg["destination-id"])
+    return configs
 
-            for sensor_group in config["sensor-groups"]:
-                for sensor_path in sensor_group["sensor-paths"]:
-                    router_config.create_sensor_path(sensor_group["sensor-group-id"], sensor_path)
+def router_name(config):
+    """
+        Returns the name used for the router in the logs, its IP address and port unless it is named in config.yaml
+    """
 
-                logger.info('Created Sensor Group: ' + sensor_group["sensor-group-id"])
+    router = config["router"]
+    return router.get("name", router["ip"] + ":" + str(router["port"]))
 
-    except FutureTimeoutError as err:
-        logger.error('Failed to connect to host')
-        logger.debug('Check grpc configuration on host or username/password in config.yaml')
-        raise err
-    except Exception as err:
-        logger.error('Possibly failed to find ems.pem')
-        logger.debug('Check to see if ems.pem is in config directory mounted in container')
-        raise err
+def open_session(config):
+    """
+        Creates a long-lived gNMI session to the router in config.yaml
+        A failed connection is retried on the next cycle rather than inside it, so an unreachable router never holds up a worker
+    """
 
-    logger.info('Setup Successful')
+    router = config["router"]
+
+    if router["tls"]:
+        path_cert = os.path.join("/config", router.get("certificate", "ems.pem"))
+    else:
+        path_cert = None
+
+    return Session(router["ip"], router["port"], router["username"], router["password"], path_cert=path_cert, retries=1, name=router_name(config))
 
-def clean(config):
+def connect(session):
     """
-        Removes all associated Destination Groups, Sensor Groups, and Subscriptions
+        Returns the open connection of the session, reconnecting only if the channel has broken
     """
 
     try:
-        router = config["router"]
-
-        if router["tls"]:
-            path_cert = "/config/ems.pem"
-        else:
-            path_cert = None
-
-        with MDT(router["ip"], router["port"], router["username"], router["password"], path_cert=path_cert) as router_config:
-            for sensor_group in config["sensor-groups"]:
-                router_config.delete_sensor_group(sensor_group["sensor-group-id"])
-                logger.info("Removed Sensor Group: " + sensor_group["sensor-group-id"])
-            
-            for collector in config["collectors"]:
-                if router_config.read_subscription(collector["subscription"]["subscription-id"]) != None:
-                    router_config.delete_subscription(collector["subscription"]["subscription-id"])
-                    logger.info("Removed Subscription: " + collector["subscription"]["subscription-id"])
-                router_config.delete_destination_group(collector["destination-group"]["destination-id"])
-                logger.info("Removed Destination Group: " + collector["destination-group"]["destination-id"])
-
+        return session.client()
     except FutureTimeoutError as err:
         logger.error('Failed to connect to host')
         logger.debug('Check grpc configuration on host or username/password in config.yaml')
         raise err
+    except ConnectionAbortedError as err:
+        # Aborted on purpose, nothing to look into
+        raise err
     except Exception as err:
         logger.error('Possibly failed to find ems.pem')
         logger.debug('Check to see if ems.pem is in config directory mounted in container')
         raise err
 
-def check(config):
+def log_changes(update, delete, replace=None):
     """
-        Checks connectivity to collectors in config.yaml and updates router telemetry configuration to highest priority
-        
-        :return: The index of the current active collector in the priority list
-        :rtype: int 
+        Logs the telemetry objects created, replaced or removed by a reconciliation
     """
 
-    try:
-        router = config["router"]
+    names = {"destination-groups": "Destination Group", "sensor-groups": "Sensor Group", "subscriptions": "Subscription"}
+    for section, objects in update.items():
+        for name in objects:
+            if section == "subscriptions" and not objects[name]["sensor-profiles"]:
+                # Only the destination of an existing subscription changed, e.g. a warm standby taking over
+                for destination in objects[name]["destination-profiles"]:
+                    logger.info('Added destination-profile ' + destination + ' to ' + name)
+            else:
+                logger.info('Created ' + names[section] + ': ' + name)
+    for section, objects in (replace or {}).items():
+        for name in objects:
+            logger.info('Replaced ' + names[section] + ': ' + name)
+
+    kinds = {"destination-group": "Destination Group", "sensor-group": "Sensor Group", "subscription": "Subscription"}
+    for item in delete:
+        if item[0] in kinds:
+            logger.info('Removed ' + kinds[item[0]] + ': ' + item[1])
+        else:
+            logger.info('Removed ' + item[0] + ' ' + ' '.join(str(key) for key in item[2:]) + ' from ' + item[1])
+
+def read_running(router_config, running_config=None):
+    """
+        Reads the running telemetry configuration, from the cache when one is given
+    """
+
+    if running_config != None:
+        return running_config.read(router_config)
+    return reconcile.running(router_config.get_config())
 
-        if router["tls"]:
-            path_cert = "/config/ems.pem"
+def apply_changes(router_config, update, delete, running_config=None, replace=None):
+    """
+        Applies telemetry changes in one Set, keeping the cache up to date when one is given
+    """
+
+    if running_config != None:
+        return running_config.apply(router_config, update, delete, replace)
+    if replace:
+        return router_config.apply(update, delete, replace)
+    return router_config.apply(update, delete)
+
+def setup(config, router_config, standby=None, running_config=None):
+    """
+        Creates a destination group for each collector in config.yaml
+        Creates all sensor groups defined in config.yaml
+        With a warm standby, also creates the subscription of every collector, leaving the destination profiles already configured
+        Only what differs from the running configuration is changed
+    """
+
+    running = read_running(router_config, running_config)
+    desired = reconcile.desired(config)
+    if standby != None:
+        desired = reconcile.desired(config, [], config["collectors"])
+        for name, subscription in running["subscriptions"].items():
+            if name in desired["subscriptions"]:
+                desired["subscriptions"][name]["destination-profiles"] = dict(subscription["destination-profiles"])
+    update, delete = reconcile.diff(desired, running, reconcile.managed(config))
+
+    applied = True
+    if update or delete:
+        applied = isinstance(apply_changes(router_config, update, delete, running_config), dict)
+        log_changes(update, delete)
+    else:
+        logger.info('Telemetry configuration already up to date')
+
+    if standby != None:
+        # pygnmi returns a failed Set instead of raising it, the destination profiles are then read from the router again
+        if applied:
+            standby.learn(desired)
         else:
-            path_cert = None
+            standby.armed = None
 
-        with MDT(router["ip"], router["port"], router["username"], router["password"], path_cert=path_cert) as router_config:
+    logger.info('Setup Successful')
 
-            for collector in config["collectors"]:
-                # If the collector does not yet have a subscription, create it
-                if router_config.read_subscription(collector["subscription"]["subscription-id"]) == None:
-                    for sensor_group in config["sensor-groups"]:
-                        router_config.create_subscription(collector["subscription"]["subscription-id"], sensor_group["sensor-group-id"], collector["destination-group"]["destination-id"], collector["subscription"]["interval"])
+def clean(config, router_config, running_config=None, keep=None):
+    """
+        Removes all associated Destination Groups, Sensor Groups, and Subscriptions, all deleted in a single Set
+        With keep, the subscription of that collector is detached instead: it is left streaming with its destination group and sensor groups
+    """
 
-                # Check the state of the subscription, if it is active, delete all subsequent subscriptions
-                if router_config.check_connection(collector["subscription"]["subscription-id"]):
-                    logger.info('Currently Streaming to: ' + collector["subscription"]["subscription-id"])
-                    index = config["collectors"].index(collector)
-                    for backup in config["collectors"][index + 1:]:
-                        if router_config.read_subscription(backup["subscription"]["subscription-id"]) != None:
-                            router_config.delete_subscription(backup["subscription"]["subscription-id"])
-                    return index
+    running = read_running(router_config, running_config)
+    owned = reconcile.managed(config)
+    if keep != None and keep != -1:
+        collector = config["collectors"][keep]
+        owned["subscriptions"].discard(collector["subscription"]["subscription-id"])
+        owned["destination-groups"].discard(collector["destination-group"]["destination-id"])
+        owned["sensor-groups"] -= set(reconcile.profiles(config, collector))
+    empty = {"destination-groups": {}, "sensor-groups": {}, "subscriptions": {}}
+    update, delete = reconcile.diff(empty, running, owned)
+
+    if delete:
+        apply_changes(router_config, None, delete, running_config)
+        log_changes(update, delete)
+
+def remove_orphans(config, router_config, owned, running_config=None):
+    """
+        Removes the objects the monitor owned under a previous config.yaml that the current one no longer has
+    """
 
-    except FutureTimeoutError as err:
-        logger.error('Failed to connect to host')
-        logger.debug('Check grpc configuration on host or username/password in config.yaml')
-        raise err
-    except Exception as err:
-        logger.error('Possibly failed to find ems.pem')
-        logger.debug('Check to see if ems.pem is in config directory mounted in container')
-        raise err
-        
-    logger.warning('NO ACTIVE COLLECTORS')
-    return -1
+    running = read_running(router_config, running_config)
+    managed = reconcile.managed(config)
+    kinds = {"subscriptions": "subscription", "sensor-groups": "sensor-group", "destination-groups": "destination-group"}
+    delete = [(kinds[section], name) for section in ("subscriptions", "sensor-groups", "destination-groups")
+              for name in owned.get(section, []) if name in running[section] and name not in managed[section]]
 
-def main(config_path, schema_path):
-    DELAY = 10
+    if delete:
+        apply_changes(router_config, None, delete, running_config)
+        log_changes({}, delete)
 
-    signal.sigtimedwait([signal.SIGTERM], 1)
+def check(config, router_config, states=None, reachable=None, dampening=None, overlap=None, standby=None, running_config=None):
+    """
+        Checks connectivity to collectors in config.yaml and updates router telemetry configuration to highest priority
+        The state of every subscription is read in one request, unless states already streamed from the router are given
+        A collector the prober could not reach is not considered active, even if the router has not noticed yet. A probe that timed out says nothing
+        With dampening, flapping collectors are held down instead of being switched to and from on every change
+        With an overlap, the collector failed back from keeps its subscription until the new one has streamed for the overlap window
+        With a warm standby, the subscriptions of other collectors are kept without their destination profile, which is all a switch changes
+        With a cached running configuration, subscriptions are reconciled against it, it is read again when the states show others changed them
+        Subscriptions are created up to the active collector and removed after it in one request, so a switch is a single transaction
+        A subscription whose profiles both change and go is replaced as a whole within that request
+        
+        :return: The index of the current active collector in the priority list
+        :rtype: int 
+    """
+
+    if states == None:
+        states = router_config.read_subscription_states()
+    if running_config != None:
+        owned = reconcile.managed(config)["subscriptions"]
+        if running_config.subscriptions() != None and running_config.subscriptions() & owned != set(states) & owned:
+            logger.info('Subscriptions changed on the router, reading its configuration again')
+            running_config.invalidate()
+    if standby != None and standby.armed == None:
+        standby.learn(read_running(router_config, running_config))
+
+    up = []
+    for collector in config["collectors"]:
+        state = states.get(collector["subscription"]["subscription-id"])
+        if standby != None and collector["subscription"]["subscription-id"] not in standby.armed:
+            # A standby subscription is never active, it says nothing about its collector
+            state = None
+        if state == "active" and reachable != None and reachable.get(collector["destination-group"]["destination-id"]) == False:
+            logger.warning('Collector unreachable from the monitor: ' + collector["destination-group"]["destination-id"])
+            state = "not active"
+        up.append(state == "active" if state != None else None)
+
+    if dampening != None:
+        active = dampening.select(up)
+        for index, state in enumerate(up):
+            if state and dampening.suppressed(index):
+                logger.warning('Collector suppressed for flapping: ' + config["collectors"][index]["destination-group"]["destination-id"])
+            elif state and index < active:
+                logger.info('Holding on to ' + config["collectors"][active]["destination-group"]["destination-id"] + ' until ' + config["collectors"][index]["destination-group"]["destination-id"] + ' is stable')
+    else:
+        active = up.index(True) if True in up else -1
+
+    kept = active
+    if overlap != None:
+        kept = overlap.retain(active, up)
+        if kept != active:
+            logger.info('Keeping ' + config["collectors"][kept]["subscription"]["subscription-id"] + ' streaming until ' + config["collectors"][active]["subscription"]["subscription-id"] + ' is confirmed')
+
+    # Every collector up to the active one keeps a subscription so that higher priorities are still probed
+    collectors = config["collectors"][:kept + 1] if kept != -1 else config["collectors"]
+    if standby != None:
+        desired = {"subscriptions": reconcile.desired(config, collectors, config["collectors"][len(collectors):])["subscriptions"]}
+        running = standby.assumed(states, desired)
+    else:
+        desired = {"subscriptions": reconcile.desired(config, collectors)["subscriptions"]}
+        running = reconcile.assumed(states, desired)
+    if running_config != None:
+        running = {"subscriptions": running_config.read(router_config)["subscriptions"]}
+    update, delete = reconcile.diff(desired, running, reconcile.managed(config))
+    update, delete, replace = reconcile.replacements(desired, update, delete)
+
+    applied = True
+    if update or delete or replace:
+        applied = isinstance(apply_changes(router_config, update, delete, running_config, replace), dict)
+        log_changes(update, delete, replace)
+    if standby != None:
+        # pygnmi returns a failed Set instead of raising it, the destination profiles are then read from the router again
+        if applied:
+            standby.learn(desired)
+        else:
+            standby.armed = None
+
+    if active == -1:
+        logger.warning('NO ACTIVE COLLECTORS')
+    else:
+        logger.info('Currently Streaming to: ' + config["collectors"][active]["subscription"]["subscription-id"])
+
+    return active
+
+class RouterMonitor:
+    def __init__(self, config, wake, state=None):
+        """ Keeps the telemetry of one router pointed at its highest priority active collector
+
+            :param config: The single-router config, from routers()
+            :type config: dict
+            :param wake: Called with no arguments to request an immediate check, when streamed states change
+            :type wake: function
+            :param state: Checkpoint to resume from and save to. With one, stopping leaves the telemetry configuration in place
+            :type state: checkpoint.Checkpoint, optional
+        """
+        self.config = config
+        self.state = state
+        self.saved = None
+        self.name = router_name(config)
+        self.session = open_session(config)
+        self.ready = False
+        self.resumed = False
+        self.collector = -1
+        self.checked = None
+        self.stream = None
+        self.pending = None
+        self.orphans = None
+        self._wake = wake
+        self._lock = threading.Lock()
+        self.configure(config)
+
+    def configure(self, config):
+        """ Builds everything that depends on the monitor settings and collectors of config.yaml, all but the session
+        """
+
+        settings = config.get("monitor", {})
+        self.session.timeout = settings.get("deadline", {}).get("rpc", RPC_TIMEOUT)
+        self.session.timeouts = settings.get("deadline", {}).get("methods")
+        self.budget = settings.get("deadline", {}).get("cycle")
+        pacing = settings.get("schedule", {})
+        self.schedule = schedule.Schedule(pacing.get("interval", schedule.INTERVAL),
+                                          pacing.get("degraded-interval", schedule.DEGRADED_INTERVAL),
+                                          pacing.get("max-backoff", schedule.MAX_BACKOFF),
+                                          pacing.get("jitter", schedule.JITTER))
+        self.dampening = None
+        if "damping" in settings:
+            dampening = settings["damping"]
+            self.dampening = damping.Damping([collector["destination-group"]["destination-id"] for collector in config["collectors"]],
+                                             dampening.get("hold-down", damping.HOLD_DOWN),
+                                             dampening.get("min-up", damping.MIN_UP),
+                                             dampening.get("half-life", damping.HALF_LIFE),
+                                             dampening.get("penalty", damping.PENALTY),
+                                             dampening.get("suppress", damping.SUPPRESS),
+                                             dampening.get("reuse", damping.REUSE))
+        self.overlap = None
+        if "make-before-break" in settings:
+            self.overlap = handover.MakeBeforeBreak(settings["make-before-break"].get("overlap", handover.OVERLAP))
+        self.standby = handover.WarmStandby() if settings.get("warm-standby", False) else None
+        self.running_config = cache.RunningConfig(settings["cache"].get("ttl", cache.TTL)) if "cache" in settings else None
+        if self.stream != None:
+            self.stream.close()
+            self.stream = None
+        if settings.get("streaming", False):
+            subscriptions = [collector["subscription"]["subscription-id"] for collector in config["collectors"]]
+            self.stream = StateStream(subscriptions, self._wake, settings.get("heartbeat", 30))
+
+    def reload(self, config):
+        """ Hands a changed config.yaml to the monitor, it is applied at the start of the next step
+            Only the telemetry objects that differ are changed, streaming is not interrupted
+
+            :param config: The new single-router config, for the same router though maybe with new connection settings
+            :type config: dict
+        """
+
+        with self._lock:
+            self.pending = config
+
+    def _reload(self):
+        with self._lock:
+            config, self.pending = self.pending, None
+
+        previous = self.config
+        self.config = config
+        if config["router"] != previous["router"]:
+            # The same router with a new address, credentials or certificate only needs a new session, its telemetry keeps streaming
+            logger.info('Router connection changed in config.yaml, reconnecting')
+            if self.stream != None:
+                self.stream.close()
+            self.session.reset()
+            self.session = open_session(config)
+        self.configure(config)
+        self.saved = None
+        if self.ready:
+            # What the previous config owned and this one drops is removed, then setup() pushes what was added or changed
+            self.orphans = {section: sorted(names) for section, names in reconcile.managed(previous).items()}
+            self.ready = False
+        logger.info('Reloaded config.yaml')
+
+    def step(self):
+        """ Runs one check of the router, setting it up first if that has not succeeded yet
+            Failures are logged and retried with backoff, they never reach the other routers
+
+            :return: Seconds until the next check
+            :rtype: float
+        """
+
+        start = time.perf_counter()
+        checked = False
+        unknown = False
+        try:
+            if self.pending != None:
+                self._reload()
+            router_config = connect(self.session)
+            if not self.ready:
+                if not self.resumed:
+                    self.resume()
+                    self.resumed = True
+                if self.orphans != None:
+                    remove_orphans(self.config, router_config, self.orphans, self.running_config)
+                    self.orphans = None
+                setup(self.config, router_config, self.standby, self.running_config)
+                self.ready = True
+            if self.stream != None and not self.stream.alive:
+                if self.stream.start(router_config):
+                    logger.info('Streaming subscription states (' + self.stream.mode + ')')
+                else:
+                    logger.warning('Router did not answer state subscription, polling instead')
+                    self.stream = None
+            reachable = None
+            if "probe" in self.config.get("monitor", {}):
+                settings = self.config["monitor"]["probe"]
+                reachable = probe.collectors([collector["destination-group"] for collector in self.config["collectors"]], settings.get("timeout", 1), settings.get("health-check", False))
+                for collector, success in reachable.items():
+                    if success:
+                        metrics.PROBE_SUCCESS.set(time.time(), router=self.name, collector=collector)
+            with router_config.budget(self.budget):
+                self.collector = check(self.config, router_config, self.stream.states if self.stream != None and self.stream.alive else None, reachable, self.dampening, self.overlap, self.standby, self.running_config)
+
+            if self.checked != None and self.collector != self.checked:
+                metrics.FAILOVERS.inc(router=self.name)
+            self.checked = self.collector
+            metrics.ACTIVE_COLLECTOR.set(self.collector, router=self.name)
+            checked = True
+        except Exception as err:
+            if self.ready and metrics.code(err) == "DEADLINE_EXCEEDED":
+                # A router too busy to answer in time is not down: its collectors are unknown, the configuration stays and checks keep their pace
+                logger.warning('Check timed out, collector states unknown, keeping the current configuration')
+                unknown = True
+            else:
+                # The channel may have broken mid-cycle, drop it so the next cycle reconnects, the stream goes with it
+                logger.error('Check failed: ' + str(err))
+                if self.stream != None:
+                    self.stream.close()
+                self.session.reset()
+                self.collector = -1
+        finally:
+            metrics.CYCLE_DURATION.observe(time.perf_counter() - start, router=self.name)
+
+        if checked and self.state != None and self.saved != self.collector:
+            # Losing the checkpoint says nothing about the router, it is saved again on the next step
+            try:
+                self.save()
+            except OSError as err:
+                logger.error('Checkpoint could not be saved: ' + str(err))
+
+        return self.schedule.next(self.collector if checked or unknown else None)
+
+    def resume(self):
+        """ Picks up the state saved by a previous run. Objects that run owned and config.yaml no longer has are removed before setup
+        """
+
+        entry = self.state.get(self.name) if self.state != None else None
+        if entry == None:
+            return
+
+        if entry["config"] == checkpoint.digest(self.config):
+            logger.info('Resuming from checkpoint')
+        else:
+            logger.info('config.yaml changed since the checkpoint, updating the telemetry configuration')
+            self.orphans = entry["objects"]
+        self.checked = entry["collector"]
+
+    def save(self):
+        """ Saves the state of the router to the checkpoint
+        """
+
+        owned = {section: sorted(names) for section, names in reconcile.managed(self.config).items()}
+        self.state.save(self.name, {"config": checkpoint.digest(self.config), "collector": self.collector, "objects": owned})
+        self.saved = self.collector
+
+    def stop(self, removed=False):
+        """ Removes the telemetry configuration of the router and closes its session
+            With a checkpoint the configuration is left streaming and the state is saved for the next start instead
+            In detach mode the subscription of the active collector is left streaming and only the rest is removed
+
+            :param removed: Whether the router was removed from config.yaml. Its configuration is then always removed, and its checkpoint entry with it
+            :type removed: bool, optional
+        """
+
+        threading.current_thread().name = self.name
+        if self.stream != None:
+            self.stream.close()
+
+        try:
+            if removed:
+                # Configuration left by a previous run is cleaned up too, even if this run never set the router up
+                if self.ready or (self.state != None and self.state.get(self.name) != None):
+                    clean(self.config, connect(self.session), self.running_config)
+                if self.state != None:
+                    self.state.remove(self.name)
+            elif self.ready and self.state != None:
+                self.save()
+                logger.info('Telemetry configuration left in place, state saved to ' + self.state.path)
+            elif self.ready:
+                detach = self.config.get("monitor", {}).get("shutdown", {}).get("mode", "clean") == "detach"
+                clean(self.config, connect(self.session), self.running_config, self.collector if detach else None)
+                if detach and self.collector != -1:
+                    logger.info('Detached, still streaming to: ' + self.config["collectors"][self.collector]["subscription"]["subscription-id"])
+        except Exception as err:
+            logger.error('Clean failed: ' + str(err))
+        finally:
+            self.session.reset()
+
+    def abort(self):
+        """ Closes the session under a step or stop still in progress, cancelling its RPCs
+        """
+
+        if self.stream != None:
+            self.stream.close()
+        self.session.reset()
+
+def load_config(config_path, schema_path):
+    """
+        Reads config.yaml and validates it against the schema
+    """
 
     try:
         with open(os.path.join(os.path.dirname(__file__), config_path), "r") as config_file:
@@ -180,21 +583,182 @@ def main(config_path, schema_path):
         schema = json.load(schema_file)
 
     validate_config(config, schema)
-    setup(config)
-    
+    return config
+
+def main(config_path, schema_path):
+    # Signals are only ever taken by the main thread, every thread started from here inherits the mask.
+    # Blocked first, so that a signal arriving during startup waits for the loop below instead of killing the process
+    signal.pthread_sigmask(signal.SIG_BLOCK, SIGNALS)
+
+    config = load_config(config_path, schema_path)
+
+    settings = config.get("monitor", {})
+    configs = routers(config)
+
+    if len(configs) > 1:
+        # Worker threads are named after their router
+        stream_handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s [%(threadName)s] %(message)s'))
+
+    if "metrics" in settings:
+        server = metrics.serve(settings["metrics"]["port"], settings["metrics"].get("address", "127.0.0.1"))
+        logger.info('Serving metrics on ' + server.server_address[0] + ':' + str(server.server_address[1]) + '/metrics')
+
+    if "tracing" in settings:
+        if settings["tracing"]["exporter"] == "opentelemetry":
+            try:
+                tracing.add_hook(tracing.OpenTelemetryExporter())
+            except ImportError as err:
+                logger.error('Tracing to OpenTelemetry needs the opentelemetry-api package')
+                raise err
+        else:
+            tracing.add_hook(tracing.JsonExporter())
+        logger.info('Tracing with the ' + settings["tracing"]["exporter"] + ' exporter')
+
+    state = None
+    if "checkpoint" in settings:
+        try:
+            state = checkpoint.Checkpoint(settings["checkpoint"]["path"])
+        except OSError as err:
+            logger.error('The checkpoint directory must be a writable mount, e.g. docker-run-opts "-v /path/to/state/directory/on/router:/state"')
+            raise err
+        logger.info('Checkpointing to ' + state.path)
+
+    # Each router is checked on its own schedule, a slow or unreachable router only holds its own worker
+    fleet = Fleet(settings.get("max-concurrency", 8), settings.get("schedule", {}).get("interval", schedule.INTERVAL))
+    monitors = {}
+    retiring = []
+    # Routers added back to config.yaml while their removal is still running, added once it is done
+    returning = {}
+    lock = threading.Lock()
+
+    def create(router_config):
+        return RouterMonitor(router_config, lambda name=router_name(router_config): fleet.wake(name), state)
+
+    def retire(monitor):
+        # The router's last step stops it, so that it never runs alongside a check of the same router
+        def final():
+            monitor.stop(removed=True)
+            # The series of a router no longer monitored would otherwise be exported forever
+            metrics.remove(router=monitor.name)
+            with lock:
+                retiring.remove(monitor)
+                router_config = returning.pop(monitor.name, None)
+                if router_config != None:
+                    # Replaces this step, the new monitor's first step follows at once
+                    monitors[monitor.name] = create(router_config)
+                    fleet.add(monitor.name, monitors[monitor.name].step)
+                else:
+                    fleet.remove(monitor.name)
+            return 0
+
+        retiring.append(monitor)
+        fleet.add(monitor.name, final)
+        fleet.wake(monitor.name)
+
+    def reload():
+        try:
+            reloaded = load_config(config_path, schema_path)
+            configs = {router_name(router_config): router_config for router_config in routers(reloaded)}
+        except Exception as err:
+            logger.error('config.yaml not reloaded, keeping the running configuration: ' + str(err))
+            return
+
+        for key in ("max-concurrency", "metrics", "tracing", "checkpoint"):
+            if reloaded.get("monitor", {}).get(key) != settings.get(key):
+                logger.warning('Restart to apply the changed monitor setting: ' + key)
+
+        with lock:
+            for name, monitor in list(monitors.items()):
+                if name not in configs:
+                    logger.info('Router removed from config.yaml: ' + name)
+                    del monitors[name]
+                    retire(monitor)
+
+            for name in list(returning):
+                if name not in configs:
+                    del returning[name]
+
+            for name, router_config in configs.items():
+                monitor = monitors.get(name)
+                if monitor == None and any(retired.name == name for retired in retiring):
+                    # Its name still schedules the removal, the new monitor must not replace it nor run alongside it
+                    logger.info('Router added back to config.yaml, set up once its removal is done: ' + name)
+                    returning[name] = router_config
+                elif monitor == None:
+                    logger.info('Router added to config.yaml: ' + name)
+                    monitors[name] = create(router_config)
+                    fleet.add(name, monitors[name].step)
+                elif router_config != (monitor.pending or monitor.config):
+                    monitor.reload(router_config)
+                    fleet.wake(name)
+
+    for router_config in configs:
+        monitor = create(router_config)
+        monitors[monitor.name] = monitor
+        fleet.add(monitor.name, monitor.step, monitor.schedule.first())
+
+    dispatcher = threading.Thread(target=fleet.run, daemon=True)
+    dispatcher.start()
+
+    watcher = None
+    if settings.get("watch", True):
+        watcher = Watcher(os.path.join(os.path.dirname(__file__), config_path), reload)
+        watcher.start()
+        logger.info('Watching config.yaml for changes (' + watcher.mode + ')')
+
+    # SIGHUP reloads config.yaml, SIGUSR1 checks every router now, SIGTERM stops
     while True:
-        collector = check(config)
-        if collector == -1:
-            if signal.sigtimedwait([signal.SIGTERM], DELAY) != None:
-                break
+        received = signal.sigwait(SIGNALS)
+        if received == signal.SIGHUP:
+            logger.info('SIGHUP received, reloading config.yaml')
+            reload()
+        elif received == signal.SIGUSR1:
+            logger.info('SIGUSR1 received, checking every router now')
+            fleet.wake()
         else:
-            if signal.sigtimedwait([signal.SIGTERM], config["collectors"][collector]["subscription"]["interval"]/1000) != None:
-                break
+            break
+
+    # Everything from here, the checks in progress included, must finish within the deadline so that the process exits before appmgr kills it
+    deadline = settings.get("shutdown", {}).get("deadline", SHUTDOWN_DEADLINE)
+    end = time.monotonic() + deadline
+    remaining = lambda: max(end - time.monotonic(), 0)
+
+    if watcher != None:
+        watcher.stop()
+    fleet.stop()
+    # Checks in progress are cut short by cancelling their RPCs, instead of waiting for them to time out
+    with lock:
+        stopping = list(monitors.values()) + retiring
+    for monitor in stopping:
+        monitor.session.connect_timeout = SHUTDOWN_CONNECT_TIMEOUT
+        monitor.abort()
+    dispatcher.join(remaining())
+
+    # Routers are cleaned in parallel, in daemon threads that cannot hold the process past the deadline
+    slots = threading.BoundedSemaphore(settings.get("max-concurrency", 8))
+
+    def stop(monitor):
+        with slots:
+            if remaining() > 0:
+                monitor.stop(monitor in retiring)
+
+    threads = [threading.Thread(target=stop, args=(monitor,), daemon=True) for monitor in stopping]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(remaining())
+
+    late = [monitor for monitor, thread in zip(stopping, threads) if thread.is_alive()]
+    if late:
+        logger.warning('Clean did not finish within ' + str(deadline) + 's, configuration may remain on: ' + ', '.join(sorted(monitor.name for monitor in late)))
+        for monitor in late:
+            monitor.abort()
 
-    clean(config)
     logger.info('Exited Successfully')
 
 if __name__ == "__main__":
     CONFIG_PATH = "../config/config.yaml"
     SCHEMA_PATH = "./schema.json"
-    main(CONFIG_PATH, SCHEMA_PATH)
\ No newline at end of file
+    main(CONFIG_PATH, SCHEMA_PATH)
+    # Workers still blocked on an unreachable router past the shutdown deadline must not keep the process alive
+    os._exit(0)
\ No newline at end of file
@@ -0,0 +1,80 @@
+import socket
+import grpc
+from concurrent.futures import ThreadPoolExecutor
+
+HEALTH_CHECK = "/grpc.health.v1.Health/Check"
+
+# HealthCheckResponse with status = SERVING (field 1, varint 1)
+SERVING = b"\x08\x01"
+
+def tcp(ip, port, timeout=1):
+    """ Checks whether a collector accepts TCP connections
+
+        :param ip: IP address of the collector
+        :type ip: str
+        :param port: Port the collector is listening on
+        :type port: int
+        :param timeout: Seconds to wait for the connection
+        :type timeout: float, optional
+        :return: Whether or not the connection was accepted, None if it timed out
+        :rtype: bool
+    """
+
+    try:
+        with socket.create_connection((ip, port), timeout=timeout):
+            return True
+    except socket.timeout:
+        return None
+    except OSError:
+        return False
+
+def health(ip, port, timeout=1):
+    """ Asks a collector for its overall status with the standard gRPC health checking protocol
+        The messages are encoded by hand so that grpcio-health-checking is not needed
+
+        :param ip: IP address of the collector
+        :type ip: str
+        :param port: Port the collector is listening on
+        :type port: int
+        :param timeout: Seconds to wait for the answer
+        :type timeout: float, optional
+        :return: Whether or not the collector is SERVING, None if it did not answer in time
+        :rtype: bool
+    """
+
+    with grpc.insecure_channel(ip + ":" + str(port)) as channel:
+        check = channel.unary_unary(HEALTH_CHECK)
+        try:
+            # An empty HealthCheckRequest asks for the status of the whole server
+            return check(b"", timeout=timeout) == SERVING
+        except grpc.RpcError as err:
+            return None if err.code() == grpc.StatusCode.DEADLINE_EXCEEDED else False
+
+def collectors(destination_groups, timeout=1, health_check=False):
+    """ Probes every collector in parallel
+
+        :param destination_groups: Destination groups in the format of config.yaml
+        :type destination_groups: list
+        :param timeout: Seconds to wait for each collector
+        :type timeout: float, optional
+        :param health_check: Also require a SERVING gRPC health check from collectors that use gRPC without TLS
+        :type health_check: bool, optional
+        :return: Map of destination group name to whether its collector is reachable, None for those that timed out, which may just be slow
+        :rtype: dict
+    """
+
+    def reachable(dg):
+        connected = tcp(dg["ip"], dg["port"], timeout)
+        if not connected:
+            return connected
+        # The collector's certificate is signed by the router's dial-out CA, which the container does not have
+        if health_check and dg["protocol"] == "grpc" and not dg["tls"]:
+            return health(dg["ip"], dg["port"], timeout)
+        return True
+
+    if not destination_groups:
+        return {}
+
+    with ThreadPoolExecutor(max_workers=len(destination_groups)) as executor:
+        results = executor.map(reachable, destination_groups)
+        return {dg["destination-id"]: result for dg, result in zip(destination_groups, results)}
@@ -0,0 +1,225 @@
+from gnmi_config import strip_modules
+
+def desired(config, collectors=None, standby=None):
+    """ Builds the telemetry configuration that config.yaml asks for
+
+        :param config: The validated config.yaml
+        :type config: dict
+        :param collectors: Collectors that should currently have a subscription. The subscriptions section is left out when not given
+        :type collectors: list, optional
+        :param standby: Collectors whose subscription is pre-created with its sensor profiles but no destination profile
+        :type standby: list, optional
+        :return: The desired tree, indexed by object name
+        :rtype: dict
+    """
+
+    tree = {"destination-groups": {}, "sensor-groups": {}}
+
+    for collector in config["collectors"]:
+        dg = collector["destination-group"]
+        destination = (dg["ip"], dg["port"], dg["encoding"], dg["protocol"], dg["tls"], dg.get("tls-hostname") if dg["tls"] else None)
+        tree["destination-groups"].setdefault(dg["destination-id"], {})[(dg["ip"], dg["port"])] = destination
+
+    for sensor_group in config["sensor-groups"]:
+        tree["sensor-groups"].setdefault(sensor_group["sensor-group-id"], {}).update(dict.fromkeys(sensor_group["sensor-paths"]))
+
+    if collectors != None:
+        tree["subscriptions"] = {}
+        for collector in collectors:
+            tree["subscriptions"][collector["subscription"]["subscription-id"]] = {
+                "sensor-profiles": profiles(config, collector),
+                "destination-profiles": dict.fromkeys([collector["destination-group"]["destination-id"]])
+            }
+        for collector in standby or []:
+            tree["subscriptions"][collector["subscription"]["subscription-id"]] = {
+                "sensor-profiles": profiles(config, collector),
+                "destination-profiles": {}
+            }
+
+    return tree
+
+def profiles(config, collector):
+    """ Builds the sensor profiles of a collector's subscription
+        A collector streams the sensor groups its subscription lists, or every sensor group. The sample interval of each is the one set
+        for it in the subscription, else the one of the sensor group, else the interval of the subscription
+
+        :param config: The validated config.yaml
+        :type config: dict
+        :param collector: The collector, as in config.yaml
+        :type collector: dict
+        :return: Map of sensor group name to its sample interval in milliseconds
+        :rtype: dict
+    """
+
+    subscription = collector["subscription"]
+    overrides = {entry["sensor-group-id"]: entry.get("interval") for entry in subscription.get("sensor-groups", [])}
+
+    sensor_profiles = {}
+    for sensor_group in config["sensor-groups"]:
+        name = sensor_group["sensor-group-id"]
+        if "sensor-groups" in subscription and name not in overrides:
+            continue
+        interval = overrides.get(name)
+        sensor_profiles[name] = interval if interval != None else sensor_group.get("interval", subscription["interval"])
+    return sensor_profiles
+
+def managed(config):
+    """ Names of every object the monitor owns on the router. Only these are ever deleted
+
+        :param config: The validated config.yaml
+        :type config: dict
+        :return: Set of names for each section
+        :rtype: dict
+    """
+
+    return {
+        "destination-groups": {collector["destination-group"]["destination-id"] for collector in config["collectors"]},
+        "sensor-groups": {sensor_group["sensor-group-id"] for sensor_group in config["sensor-groups"]},
+        "subscriptions": {collector["subscription"]["subscription-id"] for collector in config["collectors"]}
+    }
+
+def running(response):
+    """ Parses the running telemetry configuration returned by MDT.get_config()
+
+        :param response: The gNMI Notification
+        :type response: dict
+        :return: The running tree, in the format of desired()
+        :rtype: dict
+    """
+
+    tree = {"destination-groups": {}, "sensor-groups": {}, "subscriptions": {}}
+
+    for notification in (response or {}).get("notification", []):
+        for update in notification.get("update") or []:
+            val = strip_modules(update.get("val"))
+            if not isinstance(val, dict):
+                continue
+            if isinstance(val.get("telemetry-model-driven"), dict):
+                val = val["telemetry-model-driven"]
+
+            for dg in val.get("destination-groups", {}).get("destination-group", []):
+                destinations = tree["destination-groups"].setdefault(dg["destination-id"], {})
+                for destination in dg.get("ipv4-destinations", {}).get("ipv4-destination", []):
+                    protocol = destination.get("protocol", {})
+                    tls = "no-tls" not in protocol
+                    destinations[(destination["ipv4-address"], destination["destination-port"])] = (
+                        destination["ipv4-address"],
+                        destination["destination-port"],
+                        destination.get("encoding"),
+                        protocol.get("protocol"),
+                        tls,
+                        protocol.get("tls-hostname") if tls else None
+                    )
+
+            for sensor_group in val.get("sensor-groups", {}).get("sensor-group", []):
+                paths = tree["sensor-groups"].setdefault(sensor_group["sensor-group-identifier"], {})
+                for sensor_path in sensor_group.get("sensor-paths", {}).get("sensor-path", []):
+                    paths[sensor_path["telemetry-sensor-path"]] = None
+
+            for subscription in val.get("subscriptions", {}).get("subscription", []):
+                tree["subscriptions"][subscription["subscription-identifier"]] = {
+                    "sensor-profiles": {profile["sensorgroupid"]: profile.get("sample-interval") for profile in subscription.get("sensor-profiles", {}).get("sensor-profile", [])},
+                    "destination-profiles": dict.fromkeys(profile["destination-id"] for profile in subscription.get("destination-profiles", {}).get("destination-profile", []))
+                }
+
+    return tree
+
+def assumed(states, desired_tree):
+    """ Builds the running subscriptions from their oper states alone
+        Existing subscriptions are assumed to match the desired tree, so only their existence is reconciled
+
+        :param states: Map of configured subscription name to its oper state
+        :type states: dict
+        :param desired_tree: The desired tree
+        :type desired_tree: dict
+        :return: The running tree, with only the subscriptions section
+        :rtype: dict
+    """
+
+    subscriptions = desired_tree.get("subscriptions", {})
+    return {"subscriptions": {name: subscriptions.get(name, {"sensor-profiles": {}, "destination-profiles": {}}) for name in states}}
+
+def diff(desired_tree, running_tree, owned):
+    """ Computes the minimal changes that turn the running tree into the desired tree
+        Only sections present in the desired tree are reconciled
+
+        :param desired_tree: The desired tree
+        :type desired_tree: dict
+        :param running_tree: The running tree
+        :type running_tree: dict
+        :param owned: Names of the objects that may be deleted, from managed()
+        :type owned: dict
+        :return: The update and delete arguments of MDT.apply()
+        :rtype: tuple
+    """
+
+    update = {}
+    delete = []
+
+    for name, want in desired_tree.get("destination-groups", {}).items():
+        have = running_tree.get("destination-groups", {}).get(name, {})
+        changed = [destination for key, destination in want.items() if have.get(key) != destination]
+        if changed:
+            update.setdefault("destination-groups", {})[name] = changed
+        delete += [("destination", name, ip, port) for ip, port in have if (ip, port) not in want]
+
+    for name, want in desired_tree.get("sensor-groups", {}).items():
+        have = running_tree.get("sensor-groups", {}).get(name, {})
+        missing = [sensor_path for sensor_path in want if sensor_path not in have]
+        if missing:
+            update.setdefault("sensor-groups", {})[name] = missing
+        delete += [("sensor-path", name, sensor_path) for sensor_path in have if sensor_path not in want]
+
+    for name, want in desired_tree.get("subscriptions", {}).items():
+        have = running_tree.get("subscriptions", {}).get(name)
+        if have == None:
+            update.setdefault("subscriptions", {})[name] = {"sensor-profiles": dict(want["sensor-profiles"]), "destination-profiles": list(want["destination-profiles"])}
+            continue
+
+        profiles = {sensor_group: interval for sensor_group, interval in want["sensor-profiles"].items() if have["sensor-profiles"].get(sensor_group) != interval}
+        destinations = [destination for destination in want["destination-profiles"] if destination not in have["destination-profiles"]]
+        if profiles or destinations:
+            update.setdefault("subscriptions", {})[name] = {"sensor-profiles": profiles, "destination-profiles": destinations}
+        delete += [("sensor-profile", name, sensor_group) for sensor_group in have["sensor-profiles"] if sensor_group not in want["sensor-profiles"]]
+        delete += [("destination-profile", name, destination) for destination in have["destination-profiles"] if destination not in want["destination-profiles"]]
+
+    # Whole objects are removed last so that subscriptions go before the groups they reference
+    kinds = {"subscriptions": "subscription", "sensor-groups": "sensor-group", "destination-groups": "destination-group"}
+    for section in ("subscriptions", "sensor-groups", "destination-groups"):
+        if section not in desired_tree:
+            continue
+        for name in running_tree.get(section, {}):
+            if name not in desired_tree[section] and name in owned.get(section, ()):
+                delete.append((kinds[section], name))
+
+    return update, delete
+
+def replacements(desired_tree, update, delete):
+    """ Folds the changes to subscriptions that both gain and lose profiles into a replace of each whole subscription
+        The router then holds exactly the desired subscription after one operation on one path, instead of several on its profiles
+
+        :param desired_tree: The desired tree the changes were computed from
+        :type desired_tree: dict
+        :param update: The update argument of MDT.apply(), from diff()
+        :type update: dict
+        :param delete: The delete argument of MDT.apply(), from diff()
+        :type delete: list
+        :return: The update, delete and replace arguments of MDT.apply()
+        :rtype: tuple
+    """
+
+    profiles = ("sensor-profile", "destination-profile")
+    changed = {item[1] for item in delete if item[0] in profiles} & set(update.get("subscriptions", {}))
+    if not changed:
+        return update, delete, {}
+
+    update = dict(update)
+    update["subscriptions"] = {name: subscription for name, subscription in update["subscriptions"].items() if name not in changed}
+    if not update["subscriptions"]:
+        del update["subscriptions"]
+    delete = [item for item in delete if item[0] not in profiles or item[1] not in changed]
+    replace = {"subscriptions": {name: {
+        "sensor-profiles": dict(desired_tree["subscriptions"][name]["sensor-profiles"]),
+        "destination-profiles": list(desired_tree["subscriptions"][name]["destination-profiles"])
+    } for name in sorted(changed)}}
+    return update, delete, replace
@@ -0,0 +1,56 @@
+import random
+
+INTERVAL = 10
+DEGRADED_INTERVAL = 2
+MAX_BACKOFF = 300
+JITTER = 0.1
+
+class Schedule:
+    def __init__(self, interval=INTERVAL, degraded_interval=DEGRADED_INTERVAL, max_backoff=MAX_BACKOFF, jitter=JITTER):
+        """ Paces the checks of one router, independently of the telemetry sample interval
+            Healthy routers, streaming to their primary collector, are checked every interval. Degraded ones, streaming to a backup
+            or to no collector, every degraded_interval so that the primary's recovery is noticed quickly. An unreachable router is
+            retried with exponential backoff from interval up to max_backoff
+
+            :param interval: Seconds between checks while the primary collector is active
+            :type interval: float, optional
+            :param degraded_interval: Seconds between checks while a backup or no collector is active
+            :type degraded_interval: float, optional
+            :param max_backoff: Maximum seconds between attempts to reach an unreachable router
+            :type max_backoff: float, optional
+            :param jitter: Fraction by which every delay is randomly lengthened or shortened, so that routers do not check in lockstep
+            :type jitter: float, optional
+        """
+        self.interval = interval
+        self.degraded_interval = degraded_interval
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+        self.failures = 0
+
+    def _jittered(self, delay):
+        return delay * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    def first(self):
+        """ Returns the delay before the first check, spreading the routers over a fraction of the interval
+
+            :rtype: float
+        """
+
+        return random.uniform(0, self.interval * self.jitter)
+
+    def next(self, active):
+        """ Returns the delay before the next check
+
+            :param active: Index of the active collector, -1 if there is none, None if the router could not be checked
+            :type active: int
+            :rtype: float
+        """
+
+        if active == None:
+            self.failures += 1
+            return self._jittered(min(self.interval * 2 ** (self.failures - 1), self.max_backoff))
+
+        self.failures = 0
+        if active == 0:
+            return self._jittered(self.interval)
+        return self._jittered(self.degraded_interval)
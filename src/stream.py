@@ -0,0 +1,168 @@
+import re
+import threading
+import time
+
+SUBSCRIPTION_ID = re.compile(r'subscription-id=([^\]]+)\]')
+# Seconds between checks that a Subscribe still waiting for its snapshot has not failed
+POLL = 0.1
+
+class StateStream:
+    def __init__(self, subscriptions, on_change, heartbeat=30):
+        """ Follows the oper state of telemetry subscriptions through a single gNMI Subscribe
+            ON_CHANGE is requested first and SAMPLE is used if the router does not answer it
+
+            :param subscriptions: Names of the subscriptions to follow
+            :type subscriptions: list
+            :param on_change: Called with no arguments whenever the state of a followed subscription changes
+            :type on_change: function
+            :param heartbeat: Seconds between heartbeats (ON_CHANGE) or samples (SAMPLE); the stream is considered broken after two are missed
+            :type heartbeat: float, optional
+        """
+        self._subscriptions = set(subscriptions)
+        self._on_change = on_change
+        self._heartbeat = heartbeat
+        self._lock = threading.Lock()
+        self._states = {}
+        self._subscriber = None
+        self._thread = None
+        self._closed = False
+        self.mode = "on_change"
+
+    @property
+    def alive(self):
+        """ Whether the stream is open and still receiving updates
+            pygnmi reads the RPC in a thread of its own, which ends as soon as the RPC fails, long before two heartbeats are missed
+        """
+
+        subscriber = self._subscriber
+        if subscriber == None or self._thread == None or not self._thread.is_alive():
+            return False
+        receiver = getattr(subscriber, "_subscribe_thread", None)
+        return receiver == None or receiver.is_alive()
+
+    @property
+    def states(self):
+        """ The last streamed state of every followed subscription
+
+            :return: Map of configured subscription name to its oper state, in the format of MDT.read_subscription_states
+            :rtype: dict
+        """
+
+        with self._lock:
+            return dict(self._states)
+
+    def start(self, router_config):
+        """ Opens the stream on a connected MDT and follows it in a background thread
+
+            :param router_config: The connection to subscribe through
+            :type router_config: MDT
+            :return: Whether an initial snapshot was received
+            :rtype: bool
+        """
+
+        self.close()
+        self._closed = False
+
+        for mode in ("on_change", "sample"):
+            subscriber = router_config.subscribe_connections(mode, self._heartbeat)
+            try:
+                snapshot = self._snapshot(subscriber)
+            except TimeoutError:
+                self._cancel(subscriber)
+                continue
+
+            self.mode = mode
+            self._subscriber = subscriber
+            self._apply(snapshot)
+            self._thread = threading.Thread(target=self._follow, daemon=True)
+            self._thread.start()
+            return True
+
+        return False
+
+    def close(self):
+        """ Cancels the Subscribe RPC
+        """
+
+        self._closed = True
+        if self._subscriber != None:
+            self._cancel(self._subscriber)
+            self._subscriber = None
+        with self._lock:
+            self._states = {}
+
+    def _snapshot(self, subscriber):
+        """ Waits for the initial snapshot, giving up as soon as the RPC fails instead of waiting out two heartbeats
+
+            :return: The snapshot
+            :rtype: dict
+            :raises TimeoutError: If the RPC failed or no snapshot came within two heartbeats
+        """
+
+        end = time.monotonic() + self._heartbeat * 2
+        receiver = getattr(subscriber, "_subscribe_thread", None)
+        while not subscriber.peek():
+            remaining = end - time.monotonic()
+            if remaining <= 0 or (receiver != None and not receiver.is_alive()):
+                raise TimeoutError()
+            if receiver != None:
+                receiver.join(min(remaining, POLL))
+            else:
+                time.sleep(min(remaining, POLL))
+        return subscriber.get_update(timeout=max(end - time.monotonic(), POLL))
+
+    def _cancel(self, subscriber):
+        # pygnmi's close only half-closes the RPC, cancelling it is what ends it on the router
+        cancel = getattr(subscriber, "cancel", None)
+        if cancel != None:
+            cancel()
+        subscriber.close()
+
+    def _follow(self):
+        subscriber = self._subscriber
+        while not self._closed:
+            try:
+                update = subscriber.get_update(timeout=self._heartbeat * 2)
+            except TimeoutError:
+                # Missed heartbeats mean the RPC has died along with its channel
+                return
+            if self._apply(update):
+                self._on_change()
+
+    def _apply(self, update):
+        """ Records the states carried by one streamed notification
+
+            :return: Whether any followed subscription changed state
+            :rtype: bool
+        """
+
+        if not update or "update" not in update:
+            return False
+
+        prefix = update["update"].get("prefix") or ""
+        changed = False
+        with self._lock:
+            for entry in update["update"].get("update", []):
+                match = SUBSCRIPTION_ID.search(prefix + "/" + (entry.get("path") or ""))
+                if match == None:
+                    continue
+                subscription = match.group(1).strip('"')
+                if subscription not in self._subscriptions:
+                    continue
+
+                val = entry.get("val")
+                state = val.get("state") if isinstance(val, dict) else val
+                if state == None:
+                    continue
+
+                if self._states.get(subscription) != state:
+                    if subscription in self._states or state == "active":
+                        changed = True
+                    self._states[subscription] = state
+
+            # Deleted subscriptions are no longer configured
+            for entry in update["update"].get("delete", []):
+                match = SUBSCRIPTION_ID.search(prefix + "/" + (entry.get("path") or ""))
+                if match != None and self._states.pop(match.group(1).strip('"'), None) == "active":
+                    changed = True
+        return changed
@@ -0,0 +1,183 @@
+import json
+import os
+import sys
+import time
+import threading
+
+_hooks = []
+_local = threading.local()
+
+class Span:
+    def __init__(self, name, attributes, parent=None):
+        """ One timed operation, e.g. an MDT method or the gNMI RPC it issues
+
+            :param name: Name of the operation
+            :type name: str
+            :param attributes: Details of the operation, e.g. router, path, payload size
+            :type attributes: dict
+            :param parent: The span this operation is part of
+            :type parent: Span, optional
+        """
+        self.name = name
+        self.attributes = attributes
+        self.parent = parent
+        self.trace_id = parent.trace_id if parent != None else os.urandom(16).hex()
+        self.span_id = os.urandom(8).hex()
+        self.start = time.time_ns()
+        self.end = None
+        self.outcome = "ok"
+        self.error = None
+
+    def set(self, **attributes):
+        """ Adds details that are only known once the operation has run, e.g. the response size
+        """
+
+        self.attributes.update(attributes)
+
+    def fail(self, error):
+        """ Marks the operation as failed
+
+            :param error: A short description of the failure, e.g. a gRPC status code
+            :type error: str
+        """
+
+        self.outcome = "error"
+        self.error = error
+
+class _NoopSpan:
+    def set(self, **attributes):
+        pass
+
+    def fail(self, error):
+        pass
+
+NOOP = _NoopSpan()
+
+class _Context:
+    def __init__(self, name, attributes):
+        self._name = name
+        self._attributes = attributes
+
+    def __enter__(self):
+        self._span = Span(self._name, self._attributes, getattr(_local, "span", None))
+        _local.span = self._span
+        for hook in list(_hooks):
+            hook.on_start(self._span)
+        return self._span
+
+    def __exit__(self, type, value, traceback):
+        if value != None and self._span.outcome == "ok":
+            self._span.fail(type.__name__)
+        self._span.end = time.time_ns()
+        _local.span = self._span.parent
+        for hook in list(_hooks):
+            hook.on_end(self._span)
+
+class _NoopContext:
+    def __enter__(self):
+        return NOOP
+
+    def __exit__(self, type, value, traceback):
+        pass
+
+_NOOP_CONTEXT = _NoopContext()
+
+def enabled():
+    """ Whether any hook is registered. Details that are costly to compute should only be gathered when it is
+
+        :rtype: bool
+    """
+
+    return bool(_hooks)
+
+def span(name, **attributes):
+    """ Times an operation in a with block, nested under the span of the enclosing block
+        When no hook is registered this returns a shared no-op context and records nothing
+
+        :param name: Name of the operation
+        :type name: str
+        :return: Context manager yielding the Span
+    """
+
+    if not _hooks:
+        return _NOOP_CONTEXT
+    return _Context(name, attributes)
+
+def add_hook(hook):
+    """ Registers a hook, an object with on_start(span) and on_end(span) methods called around every span
+    """
+
+    _hooks.append(hook)
+
+def remove_hook(hook):
+    """ Unregisters a hook
+    """
+
+    _hooks.remove(hook)
+
+class JsonExporter:
+    def __init__(self, stream=None):
+        """ Writes every finished span as one line of JSON, with the field names of the OpenTelemetry (OTLP) span
+
+            :param stream: File to write to, stdout by default
+            :type stream: file, optional
+        """
+        self._stream = stream if stream != None else sys.stdout
+        self._lock = threading.Lock()
+
+    def on_start(self, span):
+        pass
+
+    def on_end(self, span):
+        record = {
+            "traceId": span.trace_id,
+            "spanId": span.span_id,
+            "parentSpanId": span.parent.span_id if span.parent != None else "",
+            "name": span.name,
+            "startTimeUnixNano": span.start,
+            "endTimeUnixNano": span.end,
+            "attributes": span.attributes,
+            "status": {"code": "STATUS_CODE_OK" if span.outcome == "ok" else "STATUS_CODE_ERROR", "message": span.error or ""}
+        }
+        with self._lock:
+            self._stream.write(json.dumps(record, default=str) + "\n")
+            self._stream.flush()
+
+def _otel_attributes(attributes):
+    # OpenTelemetry only takes primitives and sequences of primitives
+    primitive = (str, bool, int, float)
+    return {key: list(value) if isinstance(value, (list, tuple)) else value for key, value in attributes.items()
+            if isinstance(value, primitive) or (isinstance(value, (list, tuple)) and all(isinstance(item, primitive) for item in value))}
+
+class OpenTelemetryExporter:
+    def __init__(self, tracer=None):
+        """ Re-emits spans through the OpenTelemetry API, so that any configured OpenTelemetry SDK exporter receives them
+            Requires the opentelemetry-api package
+
+            :param tracer: The tracer to create spans with, the global tracer provider's by default
+            :type tracer: opentelemetry.trace.Tracer, optional
+        """
+        from opentelemetry import trace
+
+        self._trace = trace
+        self._tracer = tracer if tracer != None else trace.get_tracer("xr-collector-health-monitor")
+        self._spans = {}
+        self._lock = threading.Lock()
+
+    def on_start(self, span):
+        with self._lock:
+            parent = self._spans.get(span.parent.span_id) if span.parent != None else None
+        context = self._trace.set_span_in_context(parent) if parent != None else None
+        otel_span = self._tracer.start_span(span.name, context=context, attributes=_otel_attributes(span.attributes), start_time=span.start)
+        with self._lock:
+            self._spans[span.span_id] = otel_span
+
+    def on_end(self, span):
+        with self._lock:
+            otel_span = self._spans.pop(span.span_id, None)
+        if otel_span == None:
+            return
+        otel_span.set_attributes(_otel_attributes(span.attributes))
+        if span.outcome != "ok":
+            otel_span.set_status(self._trace.Status(self._trace.StatusCode.ERROR, span.error))
+        otel_span.end(end_time=span.end)
@@ -0,0 +1,107 @@
+import os
+import ctypes
+import ctypes.util
+import hashlib
+import select
+import threading
+
+INTERVAL = 5
+
+# inotify(7) events that can mean the file changed: written in place, replaced by a rename, created or removed
+IN_MODIFY = 0x002
+IN_ATTRIB = 0x004
+IN_CLOSE_WRITE = 0x008
+IN_MOVED_FROM = 0x040
+IN_MOVED_TO = 0x080
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+EVENTS = IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+
+def _inotify(directory):
+    """ Opens an inotify watch on a directory
+
+        :return: The inotify file descriptor, None when inotify is not available
+        :rtype: int
+    """
+
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+    except (OSError, AttributeError):
+        return None
+    if fd < 0:
+        return None
+    if libc.inotify_add_watch(fd, os.fsencode(directory), EVENTS) < 0:
+        os.close(fd)
+        return None
+    return fd
+
+def digest(path):
+    """ Fingerprints the content of a file
+
+        :return: Hex SHA-256 of the content, None if the file cannot be read
+        :rtype: str
+    """
+
+    try:
+        with open(path, "rb") as watched_file:
+            return hashlib.sha256(watched_file.read()).hexdigest()
+    except OSError:
+        return None
+
+class Watcher:
+    def __init__(self, path, callback, interval=INTERVAL):
+        """ Calls back from a background thread whenever the content of a file changes
+            Changes are noticed at once through inotify on the file's directory, which also catches a file replaced by a rename,
+            and otherwise by polling every interval seconds
+
+            :param path: File to watch
+            :type path: str
+            :param callback: Called with no arguments after each change
+            :type callback: function
+            :param interval: Seconds between polls, also the longest a change can go unnoticed with inotify
+            :type interval: float, optional
+        """
+        self.path = path
+        self.interval = interval
+        self._callback = callback
+        self._stopped = threading.Event()
+        self._digest = digest(path)
+        self._fd = _inotify(os.path.dirname(os.path.abspath(path)))
+        self.mode = "inotify" if self._fd != None else "polling"
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        """ Stops watching. The thread ends within one interval, only a call back already under way can still complete
+        """
+
+        self._stopped.set()
+
+    def _wait(self):
+        if self._fd == None:
+            self._stopped.wait(self.interval)
+            return
+        readable, _, _ = select.select([self._fd], [], [], self.interval)
+        if readable:
+            # Editors write in several steps, let them finish before reading
+            self._stopped.wait(0.1)
+            try:
+                while os.read(self._fd, 4096):
+                    pass
+            except BlockingIOError:
+                pass
+
+    def _run(self):
+        try:
+            while not self._stopped.is_set():
+                self._wait()
+                current = digest(self.path)
+                if current != None and current != self._digest and not self._stopped.is_set():
+                    self._digest = current
+                    self._callback()
+        finally:
+            if self._fd != None:
+                os.close(self._fd)
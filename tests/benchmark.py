@@ -0,0 +1,215 @@
+"""
+    Failover benchmark of monitor.check() and MDT against the loopback router simulator
+
+    Every scenario starts from a converged router, then scripts collector transitions. After each one, check() runs
+    back to back (or every --poll seconds) until the router streams to the expected collector with exactly the expected subscriptions.
+    For each transition it reports:
+        detect       seconds until check() first reports a different active collector, 0 if it is unchanged
+        reconfigure  seconds until the router configuration has converged
+        cycles       number of check() calls
+        rpcs/cycle   gNMI RPCs per check()
+        bytes/cycle  serialized gNMI bytes (sent and received) per check()
+
+    Usage: python tests/benchmark.py [--scenario NAME] [--collectors 2 5 10 50] [--latency S] [--dialout-delay S] [--poll S] [--json]
+"""
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '../src'))
+import json
+import time
+import random
+import logging
+import argparse
+from simulator import Simulator
+from gnmi_config import MDT
+import monitor
+
+SENSOR_GROUPS = [{"sensor-group-id": "Benchmark-Sensor-Group", "sensor-paths": ["Cisco-IOS-XR-pfi-im-cmd-oper:interfaces/interface-xr/interface"]}]
+
+def make_config(collectors, port):
+    """ Builds a config.yaml with the given number of collectors, in priority order
+    """
+
+    return {
+        "router": {"ip": "127.0.0.1", "port": port, "username": "cisco", "password": "cisco123", "tls": False},
+        "sensor-groups": SENSOR_GROUPS,
+        "collectors": [{
+            "destination-group": {"ip": "10.0.0." + str(index + 1), "port": 57500, "destination-id": "Collector-" + str(index + 1), "encoding": "self-describing-gpb", "protocol": "grpc", "tls": False},
+            "subscription": {"subscription-id": "Subscription-" + str(index + 1), "interval": 30000}
+        } for index in range(collectors)]
+    }
+
+def primary_down(collectors, seed):
+    """ The primary collector fails
+    """
+
+    return [(0, False, 1)]
+
+def recover_to_primary(collectors, seed):
+    """ The primary collector fails, then comes back
+    """
+
+    return [(0, False, 1), (0, True, 0)]
+
+def all_down(collectors, seed):
+    """ Every collector fails, lowest priority first, then the last backup comes back
+    """
+
+    steps = [(index, False, 0) for index in reversed(range(1, collectors))]
+    return steps + [(0, False, -1), (collectors - 1, True, collectors - 1)]
+
+def flapping(collectors, seed):
+    """ The primary collector goes down and up ten times
+    """
+
+    return [step for _ in range(10) for step in [(0, False, 1), (0, True, 0)]]
+
+def cascade(collectors, seed):
+    """ Collectors fail in a random order until one is left, then all recover in a random order
+    """
+
+    rng = random.Random(seed)
+    order = list(range(collectors))
+    rng.shuffle(order)
+    up = set(range(collectors))
+    steps = []
+    for index in order[:-1]:
+        up.discard(index)
+        steps.append((index, False, min(up)))
+    for index in order[:-1]:
+        up.add(index)
+        steps.append((index, True, min(up)))
+    return steps
+
+SCENARIOS = {
+    "primary-down": primary_down,
+    "recover-to-primary": recover_to_primary,
+    "all-down": all_down,
+    "flapping": flapping,
+    "cascade": cascade
+}
+
+def converged(simulator, config, expected):
+    """ Whether the router streams to the expected collector with exactly the subscriptions check() wants
+    """
+
+    collectors = config["collectors"][:expected + 1] if expected != -1 else config["collectors"]
+    states = simulator.states()
+    if set(states) != {collector["subscription"]["subscription-id"] for collector in collectors}:
+        return False
+    return expected == -1 or states[config["collectors"][expected]["subscription"]["subscription-id"]] == "active"
+
+def run(scenario, collectors, latency=0, dialout_delay=0, poll=0, seed=0, timeout=30):
+    """ Runs one scenario against a fresh simulator
+
+        :return: One result per transition
+        :rtype: list
+    """
+
+    simulator = Simulator(latency=latency, dialout_delay=dialout_delay)
+    config = make_config(collectors, simulator.start())
+    for collector in config["collectors"]:
+        simulator.collector(collector["destination-group"]["ip"], collector["destination-group"]["port"])
+
+    results = []
+    try:
+        with MDT("127.0.0.1", config["router"]["port"], "cisco", "cisco123") as mdt:
+            monitor.setup(config, mdt)
+            deadline = time.monotonic() + timeout
+            while not (monitor.check(config, mdt) == 0 and converged(simulator, config, 0)):
+                if time.monotonic() > deadline:
+                    raise RuntimeError("Router did not converge before the scenario")
+                time.sleep(poll)
+            current = 0
+
+            for index, up, expected in SCENARIOS[scenario](collectors, seed):
+                destination = config["collectors"][index]["destination-group"]
+                simulator.calls.clear()
+                simulator.bytes.clear()
+                start = time.monotonic()
+                simulator.collector(destination["ip"], destination["port"], up)
+
+                detect = None
+                cycles = 0
+                while True:
+                    active = monitor.check(config, mdt)
+                    cycles += 1
+                    now = time.monotonic()
+                    if detect == None and active != current:
+                        detect = now - start
+                    if active == expected and converged(simulator, config, expected):
+                        break
+                    if now - start > timeout:
+                        raise RuntimeError(scenario + " did not converge to collector " + str(expected))
+                    time.sleep(poll)
+
+                current = expected
+                results.append({
+                    "scenario": scenario,
+                    "collectors": collectors,
+                    "transition": destination["destination-id"] + (" up" if up else " down"),
+                    "detect": detect if detect != None else 0.0,
+                    "reconfigure": time.monotonic() - start,
+                    "cycles": cycles,
+                    "rpcs/cycle": sum(simulator.calls.values()) / cycles,
+                    "bytes/cycle": (simulator.bytes["in"] + simulator.bytes["out"]) / cycles
+                })
+    finally:
+        simulator.stop()
+
+    return results
+
+def summarize(results):
+    """ Aggregates the transitions of each scenario and collector count
+    """
+
+    groups = {}
+    for result in results:
+        groups.setdefault((result["scenario"], result["collectors"]), []).append(result)
+
+    rows = []
+    for (scenario, collectors), group in groups.items():
+        rows.append({
+            "scenario": scenario,
+            "collectors": collectors,
+            "transitions": len(group),
+            "detect": sum(result["detect"] for result in group) / len(group),
+            "reconfigure": sum(result["reconfigure"] for result in group) / len(group),
+            "max reconfigure": max(result["reconfigure"] for result in group),
+            "rpcs/cycle": sum(result["rpcs/cycle"] * result["cycles"] for result in group) / sum(result["cycles"] for result in group),
+            "bytes/cycle": sum(result["bytes/cycle"] * result["cycles"] for result in group) / sum(result["cycles"] for result in group)
+        })
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description="Failover benchmark of monitor.check() against the router simulator")
+    parser.add_argument("--scenario", choices=sorted(SCENARIOS), action="append", help="Scenario to run, all by default")
+    parser.add_argument("--collectors", type=int, nargs="+", default=[2, 5, 10, 50])
+    parser.add_argument("--latency", type=float, default=0, help="Seconds added to every RPC")
+    parser.add_argument("--dialout-delay", type=float, default=0, help="Seconds before the router notices a collector is up")
+    parser.add_argument("--poll", type=float, default=0, help="Seconds between check() calls")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true", help="Print every transition as JSON")
+    args = parser.parse_args()
+
+    monitor.logger.setLevel(logging.CRITICAL)
+
+    results = []
+    for scenario in args.scenario or sorted(SCENARIOS):
+        for collectors in args.collectors:
+            if collectors < 2:
+                parser.error("At least 2 collectors are needed")
+            results += run(scenario, collectors, args.latency, args.dialout_delay, args.poll, args.seed)
+
+    if args.json:
+        print(json.dumps(results, indent=4))
+        return
+
+    columns = ["scenario", "collectors", "transitions", "detect", "reconfigure", "max reconfigure", "rpcs/cycle", "bytes/cycle"]
+    print("".join(column.rjust(20) for column in columns))
+    for row in summarize(results):
+        cells = [row[column] for column in columns]
+        print("".join((("%.4f" % cell) if isinstance(cell, float) else str(cell)).rjust(20) for cell in cells))
+
+if __name__ == "__main__":
+    main()
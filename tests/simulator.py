@@ -0,0 +1,377 @@
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '../src'))
+import json
+import time
+import datetime
+import tempfile
+import threading
+import argparse
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+import grpc
+from cryptography import x509
+from cryptography.x509.oid import NameOID
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+from pygnmi.spec.gnmi_pb2_grpc import gNMIServicer, add_gNMIServicer_to_server
+from pygnmi.spec.gnmi_pb2 import (CapabilityResponse, ModelData, Encoding, GetResponse, SetResponse, SubscribeResponse,
+    Notification, Update, UpdateResult, TypedValue, SubscriptionMode)
+from pygnmi.path_generator import gnmi_path_generator
+from gnmi_config import OPER_PATH
+
+# Keys of every list in the telemetry-model-driven configuration
+LIST_KEYS = {
+    "destination-group": ["destination-id"],
+    "ipv4-destination": ["ipv4-address", "destination-port"],
+    "sensor-group": ["sensor-group-identifier"],
+    "sensor-path": ["telemetry-sensor-path"],
+    "subscription": ["subscription-identifier"],
+    "sensor-profile": ["sensorgroupid"],
+    "destination-profile": ["destination-id"]
+}
+
+def _unquote(value):
+    return value[1:-1] if len(value) > 1 and value[0] == value[-1] == '"' else value
+
+def _matches(item, keys):
+    return all(str(item.get(name)) == _unquote(value) for name, value in keys.items())
+
+def _merge(target, source):
+    """ Merges a JSON tree into another, matching list entries by their keys
+    """
+
+    for name, value in source.items():
+        if isinstance(value, list):
+            entries = target.setdefault(name, [])
+            for item in value:
+                keys = {key: str(item[key]) for key in LIST_KEYS.get(name, []) if key in item}
+                existing = next((entry for entry in entries if keys and _matches(entry, keys)), None)
+                if existing == None:
+                    entries.append(json.loads(json.dumps(item)))
+                else:
+                    _merge(existing, item)
+        elif isinstance(value, dict) and isinstance(target.get(name), dict):
+            _merge(target[name], value)
+        else:
+            target[name] = json.loads(json.dumps(value))
+
+def _find(tree, elems):
+    """ Returns the node of a JSON tree at a path, and its parent list or dict, or None if it does not exist
+    """
+
+    parent = None
+    node = tree
+    for elem in elems:
+        if not isinstance(node, dict) or elem.name not in node:
+            return None, None
+        parent, node = node, node[elem.name]
+        if elem.key:
+            parent = node
+            node = next((item for item in node if _matches(item, dict(elem.key))), None)
+            if node == None:
+                return None, None
+    return parent, node
+
+def _place(tree, elems, value):
+    """ Replaces the node of a JSON tree at a path, creating the containers and list entry leading to it
+    """
+
+    node = tree
+    for index, elem in enumerate(elems):
+        last = index == len(elems) - 1
+        if not elem.key:
+            if last:
+                node[elem.name] = json.loads(json.dumps(value))
+                return
+            node = node.setdefault(elem.name, {})
+            continue
+        entries = node.setdefault(elem.name, [])
+        existing = next((item for item in entries if _matches(item, dict(elem.key))), None)
+        if last:
+            entry = json.loads(json.dumps(value))
+            if existing != None:
+                entries[entries.index(existing)] = entry
+            else:
+                entries.append(entry)
+            return
+        if existing == None:
+            existing = {name: _unquote(key) for name, key in elem.key.items()}
+            entries.append(existing)
+        node = existing
+
+class Simulator(gNMIServicer):
+    def __init__(self, username="cisco", password="cisco123", latency=0, dialout_delay=0):
+        """ Loopback gNMI server emulating the telemetry-model-driven configuration and oper trees of an IOS-XR router
+            A subscription becomes active once one of its destinations has been up for dialout_delay seconds
+            RPCs are counted by method in calls, and the bytes of serialized messages received and sent in bytes["in"] and bytes["out"]
+            Subscribes still being served are counted in subscribed. ON_CHANGE subscriptions are refused while on_change is False
+
+            :param username: Username the router accepts
+            :type username: str, optional
+            :param password: Password the router accepts
+            :type password: str, optional
+            :param latency: Seconds added to every RPC
+            :type latency: float, optional
+            :param dialout_delay: Seconds the router takes to notice that a collector is up, like its dial-out retry timer
+            :type dialout_delay: float, optional
+        """
+        self.username = username
+        self.password = password
+        self.latency = latency
+        self.dialout_delay = dialout_delay
+        self.calls = Counter()
+        self.bytes = Counter()
+        self.subscribed = 0
+        self.on_change = True
+        self.certificate = None
+        self._config = {}
+        self._up = set()
+        self._since = {}
+        self._condition = threading.Condition()
+        self._server = None
+
+    ########## Control ##########
+
+    def start(self, port=0, tls=False):
+        """ Starts serving on the loopback interface
+
+            :param port: Port to listen on, any free port by default
+            :type port: int, optional
+            :param tls: Serve with a self-signed certificate for ems.cisco.com, written to self.certificate
+            :type tls: bool, optional
+            :return: The port listened on
+            :rtype: int
+        """
+
+        self._server = grpc.server(ThreadPoolExecutor(max_workers=16))
+        add_gNMIServicer_to_server(self, self._server)
+        if tls:
+            key, cert = self._self_signed()
+            port = self._server.add_secure_port("127.0.0.1:" + str(port), grpc.ssl_server_credentials([(key, cert)]))
+        else:
+            port = self._server.add_insecure_port("127.0.0.1:" + str(port))
+        self._server.start()
+        return port
+
+    def stop(self):
+        """ Stops serving and cancels every open Subscribe
+        """
+
+        if self._server != None:
+            self._server.stop(None)
+            self._server = None
+
+    def collector(self, ip, port, up=True):
+        """ Brings a collector up or down
+        """
+
+        with self._condition:
+            if up:
+                self._up.add((ip, int(port)))
+            else:
+                self._up.discard((ip, int(port)))
+            self._refresh()
+
+    @property
+    def config(self):
+        """ A copy of the running telemetry configuration
+        """
+
+        with self._condition:
+            return json.loads(json.dumps(self._config))
+
+    def states(self):
+        """ The oper state of every configured subscription
+
+            :return: Map of subscription name to "active" or "not active"
+            :rtype: dict
+        """
+
+        now = time.monotonic()
+        with self._condition:
+            names = [entry["subscription-identifier"] for entry in self._config.get("subscriptions", {}).get("subscription", [])]
+            return {name: "active" if name in self._since and now - self._since[name] >= self.dialout_delay else "not active" for name in names}
+
+    def wait_for(self, predicate, timeout=10):
+        """ Waits until predicate(simulator) is true
+
+            :return: Whether it became true before the timeout
+            :rtype: bool
+        """
+
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            while not predicate(self):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                # States also change with time when there is a dial-out delay
+                self._condition.wait(min(remaining, 0.01))
+        return True
+
+    def _refresh(self):
+        """ Records when each subscription started having a reachable destination. Called with the lock held
+        """
+
+        destinations = {}
+        for group in self._config.get("destination-groups", {}).get("destination-group", []):
+            destinations[group["destination-id"]] = {(entry["ipv4-address"], int(entry["destination-port"])) for entry in group.get("ipv4-destinations", {}).get("ipv4-destination", [])}
+
+        now = time.monotonic()
+        reachable = set()
+        for entry in self._config.get("subscriptions", {}).get("subscription", []):
+            for profile in entry.get("destination-profiles", {}).get("destination-profile", []):
+                if destinations.get(profile["destination-id"], set()) & self._up:
+                    reachable.add(entry["subscription-identifier"])
+
+        self._since = {name: self._since.get(name, now) for name in reachable}
+        self._condition.notify_all()
+
+    def _self_signed(self):
+        key = ec.generate_private_key(ec.SECP256R1())
+        name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "ems.cisco.com")])
+        now = datetime.datetime.utcnow()
+        cert = (x509.CertificateBuilder().subject_name(name).issuer_name(name).public_key(key.public_key())
+            .serial_number(x509.random_serial_number()).not_valid_before(now - datetime.timedelta(days=1)).not_valid_after(now + datetime.timedelta(days=1))
+            .add_extension(x509.SubjectAlternativeName([x509.DNSName("ems.cisco.com")]), critical=False)
+            .add_extension(x509.BasicConstraints(ca=True, path_length=None), critical=True)
+            .sign(key, hashes.SHA256()))
+
+        cert_pem = cert.public_bytes(serialization.Encoding.PEM)
+        key_pem = key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption())
+        with tempfile.NamedTemporaryFile(prefix="ems-", suffix=".pem", delete=False) as cert_file:
+            cert_file.write(cert_pem)
+        self.certificate = cert_file.name
+        return key_pem, cert_pem
+
+    ########## gNMI ##########
+
+    def _enter(self, name, request, context):
+        self.calls[name] += 1
+        self.bytes["in"] += request.ByteSize()
+        metadata = dict(context.invocation_metadata())
+        if metadata.get("username") != self.username or metadata.get("password") != self.password:
+            context.abort(grpc.StatusCode.UNAUTHENTICATED, "Authentication failed")
+        if self.latency:
+            time.sleep(self.latency)
+
+    def _reply(self, response):
+        self.bytes["out"] += response.ByteSize()
+        return response
+
+    def _oper(self):
+        return {"subscriptions": {"subscription": [{"subscription-id": name, "subscription": {"state": state}} for name, state in self.states().items()]}}
+
+    def Capabilities(self, request, context):
+        self._enter("Capabilities", request, context)
+        models = [ModelData(name="Cisco-IOS-XR-telemetry-model-driven-cfg", organization="Cisco Systems, Inc."), ModelData(name="Cisco-IOS-XR-telemetry-model-driven-oper", organization="Cisco Systems, Inc.")]
+        return self._reply(CapabilityResponse(supported_models=models, supported_encodings=[Encoding.JSON, Encoding.JSON_IETF], gNMI_version="0.7.0"))
+
+    def Get(self, request, context):
+        self._enter("Get", request, context)
+        notifications = []
+        for path in request.path:
+            if path.origin.endswith("-oper"):
+                tree = {"telemetry-model-driven": self._oper()}
+            else:
+                tree = {"telemetry-model-driven": self.config}
+            parent, node = _find(tree, path.elem)
+            update = [Update(path=path, val=TypedValue(json_ietf_val=json.dumps(node).encode("utf-8")))] if node != None else []
+            notifications.append(Notification(timestamp=time.time_ns(), update=update))
+        return self._reply(GetResponse(notification=notifications))
+
+    def Set(self, request, context):
+        self._enter("Set", request, context)
+        results = []
+        with self._condition:
+            tree = {"telemetry-model-driven": self._config}
+            # gNMI applies deletes, then replaces, then updates
+            for path in request.delete:
+                parent, node = _find(tree, path.elem)
+                if node != None:
+                    if isinstance(parent, list):
+                        parent.remove(node)
+                    else:
+                        del parent[path.elem[-1].name]
+                results.append(UpdateResult(path=path, op=UpdateResult.DELETE))
+            for operation, updates in ((UpdateResult.REPLACE, request.replace), (UpdateResult.UPDATE, request.update)):
+                for update in updates:
+                    names = [path_elem.name for path_elem in update.path.elem]
+                    value = json.loads(update.val.json_ietf_val or update.val.json_val)
+                    if names[:1] != ["telemetry-model-driven"] or (operation == UpdateResult.UPDATE and len(names) > 1):
+                        context.abort(grpc.StatusCode.UNIMPLEMENTED, "Only the telemetry-model-driven container can be updated, or objects in it replaced")
+                    if len(names) > 1:
+                        _place(self._config, update.path.elem[1:], value)
+                    else:
+                        if operation == UpdateResult.REPLACE:
+                            self._config.clear()
+                        _merge(self._config, value)
+                    results.append(UpdateResult(path=update.path, op=operation))
+            self._refresh()
+        return self._reply(SetResponse(timestamp=time.time_ns(), response=results))
+
+    def Subscribe(self, request_iterator, context):
+        request = next(request_iterator)
+        self._enter("Subscribe", request, context)
+        subscription = request.subscribe.subscription[0]
+        sample = subscription.mode == SubscriptionMode.SAMPLE
+        if not sample and not self.on_change:
+            context.abort(grpc.StatusCode.UNIMPLEMENTED, "ON_CHANGE is not supported")
+        interval = (subscription.sample_interval if sample else subscription.heartbeat_interval) / 1e9 or 30
+
+        prefix = gnmi_path_generator(OPER_PATH)
+        state_path = lambda name: gnmi_path_generator('subscriptions/subscription[subscription-id="{}"]/subscription/state'.format(name))
+        notification = lambda states, deleted=(): self._reply(SubscribeResponse(update=Notification(
+            timestamp=time.time_ns(), prefix=prefix,
+            update=[Update(path=state_path(name), val=TypedValue(string_val=state)) for name, state in states.items()],
+            delete=[state_path(name) for name in deleted]
+        )))
+
+        with self._condition:
+            self.subscribed += 1
+        try:
+            yield from self._stream(context, sample, interval, notification)
+        finally:
+            with self._condition:
+                self.subscribed -= 1
+                self._condition.notify_all()
+
+    def _stream(self, context, sample, interval, notification):
+        last = self.states()
+        yield notification(last)
+        yield SubscribeResponse(sync_response=True)
+        beat = time.monotonic() + interval
+
+        while context.is_active():
+            with self._condition:
+                self._condition.wait(0.01)
+            states = self.states()
+            now = time.monotonic()
+            if now >= beat:
+                # Heartbeats (ON_CHANGE) and samples (SAMPLE) carry every state
+                yield notification(states, [name for name in last if name not in states])
+                beat = now + interval
+            elif not sample:
+                changed = {name: state for name, state in states.items() if last.get(name) != state}
+                deleted = [name for name in last if name not in states]
+                if changed or deleted:
+                    yield notification(changed, deleted)
+            last = states
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Loopback gNMI server emulating the telemetry configuration of an IOS-XR router")
+    parser.add_argument("--port", type=int, default=57777)
+    parser.add_argument("--tls", action="store_true")
+    parser.add_argument("--latency", type=float, default=0)
+    parser.add_argument("--dialout-delay", type=float, default=0)
+    parser.add_argument("--up", action="append", default=[], metavar="IP:PORT", help="Collector that is up")
+    args = parser.parse_args()
+
+    simulator = Simulator(latency=args.latency, dialout_delay=args.dialout_delay)
+    for collector in args.up:
+        ip, port = collector.rsplit(":", 1)
+        simulator.collector(ip, port)
+    port = simulator.start(args.port, args.tls)
+    print("Serving on 127.0.0.1:" + str(port) + (" with certificate " + simulator.certificate if args.tls else ""))
+    simulator._server.wait_for_termination()
@@ -0,0 +1,76 @@
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '../src'))
+import pytest
+from unittest.mock import MagicMock
+import cache
+
+RUNNING = {"notification": [{"update": [{"path": "telemetry-model-driven", "val": {
+    "destination-groups": {"destination-group": [{"destination-id": "First-Collector", "ipv4-destinations": {"ipv4-destination": [
+        {"ipv4-address": "4.5.6.7", "destination-port": 57777, "encoding": "self-describing-gpb", "protocol": {"protocol": "grpc", "no-tls": None}}
+    ]}}]},
+    "sensor-groups": {"sensor-group": [{"sensor-group-identifier": "Sensor-Group", "sensor-paths": {"sensor-path": [{"telemetry-sensor-path": "Path-1"}]}}]},
+    "subscriptions": {"subscription": [{"subscription-identifier": "Subscription-1",
+        "sensor-profiles": {"sensor-profile": [{"sensorgroupid": "Sensor-Group", "sample-interval": 30000}]},
+        "destination-profiles": {"destination-profile": [{"destination-id": "First-Collector"}]}}]}
+}}]}]}
+
+def test_cache_read_once():
+    '''
+        The router is only read again once the TTL has passed or the cache is invalidated
+    '''
+
+    now = [0]
+    mdt = MagicMock()
+    mdt.get_config.return_value = RUNNING
+    running_config = cache.RunningConfig(ttl=60, clock=lambda: now[0])
+
+    tree = running_config.read(mdt)
+    assert tree["subscriptions"] == {"Subscription-1": {"sensor-profiles": {"Sensor-Group": 30000}, "destination-profiles": {"First-Collector": None}}}
+    assert running_config.read(mdt) is tree
+    assert mdt.get_config.call_count == 1
+
+    now[0] = 60
+    running_config.read(mdt)
+    running_config.invalidate()
+    running_config.read(mdt)
+    assert mdt.get_config.call_count == 3
+    assert running_config.version == 3
+
+def test_cache_apply():
+    '''
+        Changes the monitor applies are merged into the cache without reading the router
+    '''
+
+    mdt = MagicMock()
+    mdt.get_config.return_value = RUNNING
+    mdt.apply.return_value = {"response": []}
+    running_config = cache.RunningConfig()
+    running_config.read(mdt)
+
+    running_config.apply(mdt,
+        {"sensor-groups": {"Sensor-Group": ["Path-2"]}, "subscriptions": {"Subscription-2": {"sensor-profiles": {"Sensor-Group": 10000}, "destination-profiles": ["First-Collector"]}}},
+        [("subscription", "Subscription-1"), ("destination", "First-Collector", "4.5.6.7", 57777)]
+    )
+
+    tree = running_config.read(mdt)
+    assert mdt.get_config.call_count == 1
+    assert tree["sensor-groups"] == {"Sensor-Group": {"Path-1": None, "Path-2": None}}
+    assert tree["subscriptions"] == {"Subscription-2": {"sensor-profiles": {"Sensor-Group": 10000}, "destination-profiles": {"First-Collector": None}}}
+    assert tree["destination-groups"] == {"First-Collector": {}}
+
+def test_cache_apply_failed():
+    '''
+        The cache is dropped when the router returns an error
+    '''
+
+    mdt = MagicMock()
+    mdt.get_config.return_value = RUNNING
+    mdt.apply.return_value = Exception("FAILED_PRECONDITION")
+    running_config = cache.RunningConfig()
+    running_config.read(mdt)
+
+    running_config.apply(mdt, None, [("subscription", "Subscription-1")])
+
+    assert running_config.subscriptions() == None
+    assert "Subscription-1" in running_config.read(mdt)["subscriptions"]
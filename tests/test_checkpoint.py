@@ -0,0 +1,49 @@
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '../src'))
+import pytest
+import json
+import checkpoint
+
+CONFIG = {
+    "router": {"ip": "127.0.0.1", "port": 57777},
+    "sensor-groups": [{"sensor-group-id": "Sensor-Group", "sensor-paths": ["Path-1"]}],
+    "collectors": [{"subscription": {"subscription-id": "Subscription-1", "interval": 30000}}],
+    "monitor": {"streaming": True}
+}
+
+def test_checkpoint_persisted(tmp_path):
+    '''
+        Entries survive a restart and the file is replaced atomically
+    '''
+
+    path = str(tmp_path / "checkpoint.json")
+    state = checkpoint.Checkpoint(path)
+    assert state.get("PE-1") == None
+
+    state.save("PE-1", {"config": "abc", "collector": 0, "objects": {}})
+    state.save("PE-2", {"config": "def", "collector": 1, "objects": {}})
+    state.remove("PE-2")
+
+    assert checkpoint.Checkpoint(path).get("PE-1") == {"config": "abc", "collector": 0, "objects": {}}
+    assert checkpoint.Checkpoint(path).get("PE-2") == None
+    assert os.listdir(tmp_path) == ["checkpoint.json"]
+
+def test_checkpoint_digest():
+    '''
+        The digest only changes with what the telemetry configuration is built from
+    '''
+
+    changed_settings = dict(CONFIG, monitor={})
+    changed_paths = dict(CONFIG, **{"sensor-groups": [{"sensor-group-id": "Sensor-Group", "sensor-paths": ["Path-2"]}]})
+
+    assert checkpoint.digest(CONFIG) == checkpoint.digest(changed_settings)
+    assert checkpoint.digest(CONFIG) != checkpoint.digest(changed_paths)
+
+def test_checkpoint_unwritable(tmp_path):
+    '''
+        A checkpoint is refused up front when its directory cannot be written
+    '''
+
+    with pytest.raises(PermissionError):
+        checkpoint.Checkpoint(str(tmp_path / "missing" / "checkpoint.json"))
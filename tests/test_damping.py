@@ -0,0 +1,87 @@
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '../src'))
+import pytest
+import damping
+
+class Clock:
+    '''
+        Manually advanced time
+    '''
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+NAMES = ["Primary", "Backup"]
+
+def test_damping_failover_immediate():
+    '''
+        Failing over away from a collector that went down does not wait
+    '''
+
+    dampening = damping.Damping(NAMES, clock=Clock())
+
+    assert dampening.select([True, None]) == 0
+    assert dampening.select([False, None]) == -1
+    assert dampening.select([False, True]) == 1
+
+def test_damping_failback_min_up():
+    '''
+        A recovered primary is only used again once it has stayed up for min-up and the hold-down has passed
+    '''
+
+    clock = Clock()
+    dampening = damping.Damping(NAMES, hold_down=30, min_up=60, clock=clock)
+
+    assert dampening.select([False, True]) == 1
+    clock.now = 10
+    assert dampening.select([True, True]) == 1
+    clock.now = 69
+    assert dampening.select([True, True]) == 1
+    clock.now = 70
+    assert dampening.select([True, True]) == 0
+
+def test_damping_flap_suppressed():
+    '''
+        A collector that keeps flapping is suppressed until its penalty decays below reuse
+    '''
+
+    clock = Clock()
+    dampening = damping.Damping(NAMES, hold_down=0, min_up=0, half_life=100, clock=clock)
+
+    for _ in range(3):
+        dampening.select([True, True])
+        clock.now += 1
+        dampening.select([False, True])
+        clock.now += 1
+    assert dampening.suppressed(0)
+
+    # Still preferred to nothing
+    assert dampening.select([True, False]) == 0
+    clock.now += 1
+    assert dampening.select([True, True]) == 0
+
+    clock.now += 1
+    dampening.select([False, True])
+    clock.now += 1
+    assert dampening.select([True, True]) == 1
+
+    clock.now += 300
+    assert dampening.penalties()[0] < damping.REUSE
+    assert not dampening.suppressed(0)
+    assert dampening.select([True, True]) == 0
+
+def test_damping_unknown_not_penalized():
+    '''
+        Removing and recreating a subscription is not counted as a flap
+    '''
+
+    dampening = damping.Damping(NAMES, clock=Clock())
+
+    dampening.select([True, True])
+    dampening.select([True, None])
+    dampening.select([True, False])
+    assert dampening.penalties() == [0, 0]
@@ -0,0 +1,142 @@
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '../src'))
+import pytest
+import threading
+import time
+import fleet
+
+@pytest.fixture
+def running_fleet():
+    '''
+        Runs a fleet dispatcher in the background for the duration of a test
+    '''
+
+    engine = fleet.Fleet(max_workers=2)
+    dispatcher = threading.Thread(target=engine.run, daemon=True)
+    dispatcher.start()
+    yield engine
+    engine.stop()
+    dispatcher.join(5)
+
+def test_fleet_isolation(running_fleet):
+    '''
+        A router stuck in its cycle does not delay the checks of the others
+    '''
+
+    release = threading.Event()
+    fast = []
+
+    def stuck():
+        release.wait(5)
+        return 60
+
+    def quick():
+        fast.append(time.monotonic())
+        return 0.05
+
+    running_fleet.add("stuck", stuck)
+    running_fleet.add("quick", quick)
+    time.sleep(0.5)
+    release.set()
+
+    assert len(fast) >= 5
+
+def test_fleet_wake(running_fleet):
+    '''
+        A woken router is checked immediately instead of waiting out its delay
+    '''
+
+    checked = threading.Event()
+    cycles = []
+
+    def step():
+        cycles.append(time.monotonic())
+        checked.set()
+        return 60
+
+    running_fleet.add("router", step)
+    assert checked.wait(5)
+    checked.clear()
+
+    running_fleet.wake("router")
+    assert checked.wait(5)
+    assert len(cycles) == 2
+
+def test_fleet_remove(running_fleet):
+    '''
+        A removed router is no longer checked
+    '''
+
+    cycles = []
+
+    def step():
+        cycles.append(time.monotonic())
+        return 0.01
+
+    running_fleet.add("router", step)
+    time.sleep(0.1)
+    running_fleet.remove("router")
+    time.sleep(0.05)
+    count = len(cycles)
+    time.sleep(0.1)
+
+    assert count > 0
+    assert len(cycles) == count
+
+def test_fleet_step_raises(caplog):
+    '''
+        A step that raises is logged and retried after the fallback delay instead of dropping the router
+    '''
+
+    engine = fleet.Fleet(max_workers=1, retry=0.05)
+    dispatcher = threading.Thread(target=engine.run, daemon=True)
+    dispatcher.start()
+
+    cycles = []
+    recovered = threading.Event()
+
+    def failing():
+        cycles.append(time.monotonic())
+        if len(cycles) == 1:
+            raise RuntimeError("step failed")
+        recovered.set()
+        return 60
+
+    engine.add("router", failing)
+    assert recovered.wait(5)
+    engine.stop()
+    dispatcher.join(5)
+
+    assert len(cycles) == 2
+    assert cycles[1] - cycles[0] >= 0.05
+    assert "Cycle of router failed" in caplog.text
+
+def test_fleet_stop_drops_queued():
+    '''
+        Steps waiting for a worker are not started once the fleet is stopped
+    '''
+
+    engine = fleet.Fleet(max_workers=1)
+    dispatcher = threading.Thread(target=engine.run, daemon=True)
+    dispatcher.start()
+
+    release = threading.Event()
+    started = threading.Event()
+    queued = []
+
+    def stuck():
+        started.set()
+        release.wait(5)
+        return 60
+
+    engine.add("stuck", stuck)
+    assert started.wait(5)
+    engine.add("queued", lambda: queued.append(True) or 60)
+    time.sleep(0.1)
+    engine.stop()
+    release.set()
+    dispatcher.join(5)
+
+    assert not dispatcher.is_alive()
+    assert queued == []
@@ -0,0 +1,110 @@
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '../src'))
+import pytest
+import asyncio
+import json
+import grpc
+from pygnmi.spec.gnmi_pb2_grpc import gNMIServicer, add_gNMIServicer_to_server
+from pygnmi.spec.gnmi_pb2 import GetResponse, SetResponse, Notification, Update, UpdateResult, TypedValue
+from pygnmi.path_generator import gnmi_path_generator, gnmi_path_degenerator
+import gnmi_async
+from gnmi_config import CFG_PATH, OPER_PATH
+
+def key(path):
+    '''
+        Identifies a protobuf path, including its origin
+    '''
+
+    return path.origin + ":" + gnmi_path_degenerator(path)
+
+class Router(gNMIServicer):
+    '''
+        Answers Get with fixed values per path and records every request
+    '''
+
+    def __init__(self, values):
+        self.values = values
+        self.requests = []
+
+    async def Get(self, request, context):
+        self.requests.append(request)
+        assert dict(context.invocation_metadata())["username"] == "cisco"
+        notifications = []
+        for path in request.path:
+            value = TypedValue(json_ietf_val=json.dumps(self.values[key(path)]).encode("utf-8"))
+            notifications.append(Notification(timestamp=1, update=[Update(path=path, val=value)]))
+        return GetResponse(notification=notifications)
+
+    async def Set(self, request, context):
+        self.requests.append(request)
+        results = [UpdateResult(path=path, op=UpdateResult.DELETE) for path in request.delete]
+        results += [UpdateResult(path=update.path, op=UpdateResult.UPDATE) for update in request.update]
+        return SetResponse(timestamp=1, response=results)
+
+async def serve(router):
+    '''
+        Starts an in-process gNMI server on a free port
+    '''
+
+    server = grpc.aio.server()
+    add_gNMIServicer_to_server(router, server)
+    port = server.add_insecure_port("127.0.0.1:0")
+    await server.start()
+    return server, port
+
+def test_async_read_subscription_states():
+    '''
+        Subscription states are read in one Get and parsed like MDT's
+    '''
+
+    config = {"subscription": [{"subscription-identifier": "Subscription-1"}, {"subscription-identifier": "Subscription-2"}]}
+    oper = {"subscription": [{"subscription-id": "Subscription-1", "subscription": {"state": "active"}}]}
+    router = Router({
+        key(gnmi_path_generator(CFG_PATH + "/subscriptions")): config,
+        key(gnmi_path_generator(OPER_PATH + "/subscriptions")): oper
+    })
+
+    async def run():
+        server, port = await serve(router)
+        try:
+            async with gnmi_async.AsyncMDT("127.0.0.1", port, "cisco", "cisco123") as mdt:
+                return await mdt.read_subscription_states()
+        finally:
+            await server.stop(None)
+
+    assert asyncio.run(run()) == {"Subscription-1": "active", "Subscription-2": "unknown"}
+    assert len(router.requests) == 1
+
+def test_async_concurrent_apply():
+    '''
+        Many Sets are outstanding at once on a single channel
+    '''
+
+    router = Router({})
+
+    async def run():
+        server, port = await serve(router)
+        try:
+            async with gnmi_async.AsyncMDT("127.0.0.1", port, "cisco", "cisco123") as mdt:
+                return await asyncio.gather(*[mdt.apply(delete=[("subscription", "Subscription-" + str(i))]) for i in range(100)] + [mdt.apply()])
+        finally:
+            await server.stop(None)
+
+    responses = asyncio.run(run())
+
+    assert len(router.requests) == 100
+    assert responses[-1] == None
+    path = gnmi_path_degenerator(gnmi_path_generator(CFG_PATH + '/subscriptions/subscription[subscription-identifier="Subscription-0"]'))
+    assert responses[0]["response"] == [{"path": path, "op": "DELETE"}]
+
+def test_async_connect_timeout():
+    '''
+        Connecting to a port nobody listens on fails like the blocking MDT
+    '''
+
+    async def run():
+        await gnmi_async.AsyncMDT("127.0.0.1", 1, "cisco", "cisco123").connect(timeout=0.5)
+
+    with pytest.raises(grpc.FutureTimeoutError):
+        asyncio.run(run())
@@ -0,0 +1,297 @@
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '../src'))
+import pytest
+from unittest.mock import MagicMock
+import grpc
+from grpc import FutureTimeoutError
+import gnmi_config
+
+def connected_mdt(mocker):
+    '''
+        Returns an MDT whose pygnmi client is mocked
+    '''
+
+    client_mock = mocker.patch('gnmi_config.gNMIclient')
+    return gnmi_config.MDT("127.0.0.1", 57777, "cisco", "cisco123"), client_mock.return_value
+
+#################### BULK SET ####################
+
+def test_apply_telemetry_single_set(mocker):
+    '''
+        All destination groups and sensor paths are sent in one Set
+    '''
+
+    mdt, client = connected_mdt(mocker)
+
+    mdt.apply({
+        "destination-groups": {
+            "First-Collector": [("4.5.6.7", 57777, "self-describing-gpb", "grpc", False, None)],
+            "Second-Collector": [("7.6.5.4", 57777, "self-describing-gpb", "grpc", True, "hostname.com")]
+        },
+        "sensor-groups": {"Sample-Sensor-Group-Name": ["Path-1", "Path-2"], "Sample-Sensor-Group-Name-2": ["Path-3"]}
+    })
+
+    client.set.assert_called_once()
+    path, tree = client.set.call_args.kwargs["update"][0]
+    assert path == gnmi_config.CFG_PATH
+    assert [dg["destination-id"] for dg in tree["destination-groups"]["destination-group"]] == ["First-Collector", "Second-Collector"]
+    assert tree["destination-groups"]["destination-group"][0]["ipv4-destinations"]["ipv4-destination"][0]["protocol"] == {"protocol": "grpc", "no-tls": None}
+    assert tree["destination-groups"]["destination-group"][1]["ipv4-destinations"]["ipv4-destination"][0]["protocol"] == {"protocol": "grpc", "tls-hostname": "hostname.com"}
+    assert tree["sensor-groups"]["sensor-group"][0]["sensor-paths"]["sensor-path"] == [{"telemetry-sensor-path": "Path-1"}, {"telemetry-sensor-path": "Path-2"}]
+
+def test_apply_single_set(mocker):
+    '''
+        Updates and deletes of different objects are sent in one Set
+    '''
+
+    mdt, client = connected_mdt(mocker)
+
+    mdt.apply(
+        {"subscriptions": {"Subscription-1": {"sensor-profiles": {"Sample-Sensor-Group-Name": 30000}, "destination-profiles": ["First-Collector"]}}},
+        [("subscription", "Subscription-2"), ("sensor-path", "Sample-Sensor-Group-Name", "Path-1")]
+    )
+
+    client.set.assert_called_once()
+    path, tree = client.set.call_args.kwargs["update"][0]
+    assert tree == {"subscriptions": {"subscription": [{
+        "subscription-identifier": "Subscription-1",
+        "sensor-profiles": {"sensor-profile": [{"sensorgroupid": "Sample-Sensor-Group-Name", "sample-interval": 30000}]},
+        "destination-profiles": {"destination-profile": [{"destination-id": "First-Collector"}]}
+    }]}}
+    assert client.set.call_args.kwargs["delete"] == [
+        gnmi_config.CFG_PATH + '/subscriptions/subscription[subscription-identifier="Subscription-2"]',
+        gnmi_config.CFG_PATH + '/sensor-groups/sensor-group[sensor-group-identifier="Sample-Sensor-Group-Name"]/sensor-paths/sensor-path[telemetry-sensor-path="Path-1"]'
+    ]
+
+def test_apply_replace(mocker):
+    '''
+        Replaced objects are sent at their own path in the same Set as the updates and deletes
+    '''
+
+    mdt, client = connected_mdt(mocker)
+
+    mdt.apply(
+        {"sensor-groups": {"Sample-Sensor-Group-Name": ["Path-2"]}},
+        [("subscription", "Subscription-2")],
+        {"subscriptions": {"Subscription-1": {"sensor-profiles": {"Sample-Sensor-Group-Name": 30000}, "destination-profiles": ["First-Collector"]}}}
+    )
+
+    client.set.assert_called_once()
+    assert client.set.call_args.kwargs["replace"] == [(
+        gnmi_config.CFG_PATH + '/subscriptions/subscription[subscription-identifier="Subscription-1"]',
+        {
+            "subscription-identifier": "Subscription-1",
+            "sensor-profiles": {"sensor-profile": [{"sensorgroupid": "Sample-Sensor-Group-Name", "sample-interval": 30000}]},
+            "destination-profiles": {"destination-profile": [{"destination-id": "First-Collector"}]}
+        }
+    )]
+    assert len(client.set.call_args.kwargs["update"]) == 1
+    assert len(client.set.call_args.kwargs["delete"]) == 1
+
+def test_create_subscription_profiles(mocker):
+    '''
+        Every sensor profile and destination profile of a subscription is sent in one Set
+    '''
+
+    mdt, client = connected_mdt(mocker)
+
+    mdt.create_subscription("Subscription-1", [("Sample-Sensor-Group-Name", 10000), ("Sample-Sensor-Group-Name-2", 60000)], ["First-Collector", "Second-Collector"])
+
+    client.set.assert_called_once()
+    path, tree = client.set.call_args.kwargs["update"][0]
+    assert tree == {"subscriptions": {"subscription": [{
+        "subscription-identifier": "Subscription-1",
+        "sensor-profiles": {"sensor-profile": [
+            {"sensorgroupid": "Sample-Sensor-Group-Name", "sample-interval": 10000},
+            {"sensorgroupid": "Sample-Sensor-Group-Name-2", "sample-interval": 60000}
+        ]},
+        "destination-profiles": {"destination-profile": [{"destination-id": "First-Collector"}, {"destination-id": "Second-Collector"}]}
+    }]}}
+
+def test_create_subscription_single(mocker):
+    '''
+        A single sensor group, destination group and interval are still accepted
+    '''
+
+    mdt, client = connected_mdt(mocker)
+
+    mdt.create_subscription("Subscription-1", "Sample-Sensor-Group-Name", "First-Collector", 30000)
+
+    path, tree = client.set.call_args.kwargs["update"][0]
+    assert tree["subscriptions"]["subscription"][0]["sensor-profiles"] == {"sensor-profile": [{"sensorgroupid": "Sample-Sensor-Group-Name", "sample-interval": 30000}]}
+    assert tree["subscriptions"]["subscription"][0]["destination-profiles"] == {"destination-profile": [{"destination-id": "First-Collector"}]}
+
+def test_apply_nothing(mocker):
+    '''
+        No Set is sent when there is nothing to change
+    '''
+
+    mdt, client = connected_mdt(mocker)
+
+    assert mdt.apply({}, []) == None
+    client.set.assert_not_called()
+
+###############################################
+
+#################### STATE READ ####################
+
+def test_read_subscription_states(mocker):
+    '''
+        Config and oper state of all subscriptions come from one Get
+    '''
+
+    mdt, client = connected_mdt(mocker)
+    client.get.return_value = {
+        "notification": [
+            {"prefix": None, "update": [{"path": "telemetry-model-driven/subscriptions", "val": {"subscription": [
+                {"subscription-identifier": "Subscription-1"},
+                {"subscription-identifier": "Subscription-2"},
+                {"subscription-identifier": "Subscription-3"}
+            ]}}]},
+            {"prefix": None, "update": [{"path": "telemetry-model-driven/subscriptions", "val": {"Cisco-IOS-XR-telemetry-model-driven-oper:subscription": [
+                {"subscription-id": "Subscription-1", "subscription": {"state": "not active"}},
+                {"subscription-id": "Subscription-2", "subscription": {"state": "active"}}
+            ]}}]}
+        ]
+    }
+
+    assert mdt.read_subscription_states() == {"Subscription-1": "not active", "Subscription-2": "active", "Subscription-3": "unknown"}
+    client.get.assert_called_once()
+    assert len(client.get.call_args.kwargs["path"]) == 2
+
+def test_read_subscription_states_per_entry(mocker):
+    '''
+        List entries returned as separate keyed updates are also understood
+    '''
+
+    mdt, client = connected_mdt(mocker)
+    client.get.return_value = {
+        "notification": [
+            {"prefix": None, "update": [
+                {"path": 'telemetry-model-driven/subscriptions/subscription[subscription-identifier="Subscription-1"]', "val": {"sensor-profiles": {}}},
+                {"path": 'telemetry-model-driven/subscriptions/subscription[subscription-id="Subscription-1"]', "val": {"subscription": {"state": "active"}}}
+            ]}
+        ]
+    }
+
+    assert mdt.read_subscription_states() == {"Subscription-1": "active"}
+
+def test_read_subscription_states_empty(mocker):
+    '''
+        No configured subscriptions gives an empty map
+    '''
+
+    mdt, client = connected_mdt(mocker)
+    client.get.return_value = {}
+
+    assert mdt.read_subscription_states() == {}
+
+###############################################
+
+#################### SESSION ####################
+
+def test_session_reuses_connection(mocker):
+    '''
+        A healthy channel is reused instead of reconnecting
+    '''
+
+    mdt_mock = mocker.patch('gnmi_config.MDT')
+    mdt_instance = MagicMock()
+    mdt_instance.is_connected.return_value = True
+    mdt_mock.return_value = mdt_instance
+
+    session = gnmi_config.Session("127.0.0.1", 57777, "cisco", "cisco123")
+
+    assert session.client() is mdt_instance
+    assert session.client() is mdt_instance
+    assert mdt_mock.call_count == 1
+    assert session.connects == 1
+
+def test_session_reconnects_broken_channel(mocker):
+    '''
+        A broken channel is closed and replaced by a new connection
+    '''
+
+    mdt_mock = mocker.patch('gnmi_config.MDT')
+    broken = MagicMock()
+    broken.is_connected.return_value = False
+    healthy = MagicMock()
+    mdt_mock.side_effect = [broken, healthy]
+
+    session = gnmi_config.Session("127.0.0.1", 57777, "cisco", "cisco123")
+
+    assert session.client() is broken
+    assert session.client() is healthy
+    broken.close.assert_called_once()
+    assert session.connects == 2
+
+def test_session_backoff(mocker):
+    '''
+        Failed connection attempts are retried with exponential backoff
+    '''
+
+    mdt_mock = mocker.patch('gnmi_config.MDT')
+    sleep_mock = mocker.patch('gnmi_config.time.sleep')
+    mdt_instance = MagicMock()
+    mdt_mock.side_effect = [FutureTimeoutError(), FutureTimeoutError(), mdt_instance]
+
+    session = gnmi_config.Session("127.0.0.1", 57777, "cisco", "cisco123", backoff=1)
+
+    assert session.client() is mdt_instance
+    assert [c.args[0] for c in sleep_mock.call_args_list] == [1, 2]
+
+def test_session_gives_up(mocker):
+    '''
+        The last connection failure is raised once all retries are used
+    '''
+
+    mdt_mock = mocker.patch('gnmi_config.MDT')
+    mocker.patch('gnmi_config.time.sleep')
+    mdt_mock.side_effect = FutureTimeoutError()
+
+    session = gnmi_config.Session("127.0.0.1", 57777, "cisco", "cisco123", retries=3)
+
+    with pytest.raises(FutureTimeoutError):
+        session.client()
+    assert mdt_mock.call_count == 3
+
+def test_session_reset_while_connecting(mocker):
+    '''
+        A connection that completes after the session was reset is closed instead of being used
+    '''
+
+    mdt_mock = mocker.patch('gnmi_config.MDT')
+    mdt_instance = MagicMock()
+    session = gnmi_config.Session("127.0.0.1", 57777, "cisco", "cisco123")
+
+    def connecting(*args, **kwargs):
+        session.reset()
+        return mdt_instance
+    mdt_mock.side_effect = connecting
+
+    with pytest.raises(ConnectionAbortedError):
+        session.client()
+    mdt_instance.close.assert_called_once()
+    assert session.connects == 0
+
+###############################################
+
+#################### METRICS ####################
+
+def test_rpc_metrics(mocker):
+    '''
+        MDT methods record their duration, and errors returned by pygnmi are counted by code
+    '''
+
+    client_mock = mocker.patch('gnmi_config.gNMIclient')
+    mdt = gnmi_config.MDT("127.0.0.1", 57777, "cisco", "cisco123", name="Metrics-Router")
+    error = grpc.RpcError()
+    error.code = lambda: grpc.StatusCode.FAILED_PRECONDITION
+    client_mock.return_value.set.return_value = error
+
+    mdt.apply(None, [("subscription", "Subscription-1")])
+    mdt.apply(None, [("subscription", "Subscription-1")])
+
+    assert gnmi_config.metrics.RPC_DURATION.count(router="Metrics-Router", method="apply") == 2
+    assert gnmi_config.metrics.RPC_ERRORS.value(router="Metrics-Router", method="apply", code="FAILED_PRECONDITION") == 2
@@ -0,0 +1,56 @@
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '../src'))
+import pytest
+import handover
+
+def test_handover_overlap():
+    '''
+        The collector failed back from is retained until the new one has been active for the overlap
+    '''
+
+    now = [0]
+    overlap = handover.MakeBeforeBreak(30, clock=lambda: now[0])
+
+    assert overlap.retain(1, [False, True]) == 1
+    now[0] = 10
+    assert overlap.retain(0, [True, True]) == 1
+    now[0] = 39
+    assert overlap.retain(0, [True, True]) == 1
+    now[0] = 40
+    assert overlap.retain(0, [True, True]) == 0
+    assert overlap.retain(0, [True, None]) == 0
+
+def test_handover_old_down():
+    '''
+        A collector that is no longer active is not retained
+    '''
+
+    overlap = handover.MakeBeforeBreak(30, clock=lambda: 0)
+
+    overlap.retain(1, [False, True])
+    assert overlap.retain(0, [True, True]) == 1
+    assert overlap.retain(0, [True, False]) == 0
+
+def test_handover_new_down():
+    '''
+        When the new collector goes down during the overlap the retained one simply stays active
+    '''
+
+    overlap = handover.MakeBeforeBreak(30, clock=lambda: 0)
+
+    overlap.retain(1, [False, True])
+    assert overlap.retain(0, [True, True]) == 1
+    assert overlap.retain(1, [False, True]) == 1
+    assert overlap.retained == None
+
+def test_handover_failover_immediate():
+    '''
+        Failing over to a lower priority collector never retains anything
+    '''
+
+    overlap = handover.MakeBeforeBreak(30, clock=lambda: 0)
+
+    assert overlap.retain(0, [True, None]) == 0
+    assert overlap.retain(-1, [False, None]) == -1
+    assert overlap.retain(1, [False, True]) == 1
@@ -0,0 +1,52 @@
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '../src'))
+import pytest
+import urllib.request
+import metrics
+
+def test_metrics_render():
+    '''
+        Families are rendered in the OpenMetrics text format
+    '''
+
+    requests = metrics.Counter("test_requests", "Requests \\ by code", ("code",))
+    latency = metrics.Histogram("test_latency_seconds", "Latency", ("method",), buckets=(0.1, 1))
+    requests.inc(code="OK")
+    requests.inc(2, code='"quoted"')
+    latency.observe(0.05, method="get")
+    latency.observe(0.5, method="get")
+    latency.observe(5, method="get")
+
+    try:
+        text = metrics.render()
+        assert text.endswith("# EOF\n")
+        assert "# TYPE test_requests counter\n# HELP test_requests Requests \\\\ by code\n" in text
+        assert 'test_requests_total{code="OK"} 1\n' in text
+        assert 'test_requests_total{code="\\"quoted\\""} 2\n' in text
+        assert 'test_latency_seconds_bucket{method="get",le="0.1"} 1\n' in text
+        assert 'test_latency_seconds_bucket{method="get",le="1.0"} 2\n' in text
+        assert 'test_latency_seconds_bucket{method="get",le="+Inf"} 3\n' in text
+        assert 'test_latency_seconds_sum{method="get"} 5.55\n' in text
+        assert 'test_latency_seconds_count{method="get"} 3\n' in text
+
+        with pytest.raises(ValueError):
+            requests.inc(method="get")
+    finally:
+        metrics.REGISTRY.remove(requests)
+        metrics.REGISTRY.remove(latency)
+
+def test_metrics_endpoint():
+    '''
+        /metrics is served over HTTP
+    '''
+
+    metrics.ACTIVE_COLLECTOR.set(1, router="Endpoint-Router")
+    server = metrics.serve(0)
+    try:
+        with urllib.request.urlopen("http://127.0.0.1:" + str(server.server_address[1]) + "/metrics") as response:
+            assert response.headers["Content-Type"] == metrics.CONTENT_TYPE
+            assert 'xr_monitor_active_collector{router="Endpoint-Router"} 1\n' in response.read().decode("utf-8")
+    finally:
+        server.shutdown()
+        metrics.ACTIVE_COLLECTOR.remove(router="Endpoint-Router")
@@ -4,7 +4,7 @@ sys.path.append(os.path.join(os.path.dirname(__file__), '../src'))
 import pytest
 import yaml
 import json
-from unittest.mock import Mock, MagicMock, call
+from unittest.mock import Mock, MagicMock
 import monitor
 
 from cerberus.validator import DocumentError
@@ -77,1168 +77,1348 @@ def test_three_collector_config():
 
     assert monitor.validate_config(config, schema) == True
 
+@pytest.mark.dependency()
+def test_fleet_config():
+    '''
+        Config validation with a list of routers sharing the collectors
+    '''
+
+    config_path = "test_configs/fleet.yaml"
+    with open(os.path.join(os.path.dirname(__file__), config_path), "r") as config_file:
+        config = yaml.load(config_file, Loader=yaml.Loader)
+    
+    schema_path = "../config/schema.json"
+    with open(os.path.join(os.path.dirname(__file__), schema_path)) as schema_file:
+        schema = json.load(schema_file)
+
+    assert monitor.validate_config(config, schema) == True
+
+    configs = monitor.routers(config)
+    assert [monitor.router_name(single) for single in configs] == ["PE-1", "PE-2"]
+    assert [single["router"]["ip"] for single in configs] == ["10.0.0.1", "10.0.0.2"]
+    assert all(single["collectors"] == config["collectors"] and "routers" not in single for single in configs)
+
+@pytest.mark.dependency()
+def test_sensor_intervals_config():
+    '''
+        Config validation with sensor group intervals and a collector streaming a subset of the sensor groups
+    '''
+
+    config_path = "test_configs/sensor_intervals.yaml"
+    with open(os.path.join(os.path.dirname(__file__), config_path), "r") as config_file:
+        config = yaml.load(config_file, Loader=yaml.Loader)
+    
+    schema_path = "../config/schema.json"
+    with open(os.path.join(os.path.dirname(__file__), schema_path)) as schema_file:
+        schema = json.load(schema_file)
+
+    assert monitor.validate_config(config, schema) == True
+
+    config["collectors"][1]["subscription"]["sensor-groups"].append({"sensor-group-id": "Unknown"})
+    with pytest.raises(RuntimeError):
+        monitor.validate_config(config, schema)
+
+@pytest.mark.dependency()
+def test_router_and_fleet_config():
+    '''
+        Config validation with both a single router and a list of routers
+    '''
+
+    config_path = "test_configs/router_and_fleet.yaml"
+    with open(os.path.join(os.path.dirname(__file__), config_path), "r") as config_file:
+        config = yaml.load(config_file, Loader=yaml.Loader)
+    
+    schema_path = "../config/schema.json"
+    with open(os.path.join(os.path.dirname(__file__), schema_path)) as schema_file:
+        schema = json.load(schema_file)
+
+    with pytest.raises(RuntimeError):
+        monitor.validate_config(config, schema)
+
+@pytest.mark.dependency()
+def test_monitor_settings_floor_config():
+    '''
+        Config validation rejects check intervals and deadlines of zero
+    '''
+
+    config_path = "test_configs/two_collector.yaml"
+    with open(os.path.join(os.path.dirname(__file__), config_path), "r") as config_file:
+        config = yaml.load(config_file, Loader=yaml.Loader)
+    
+    schema_path = "../config/schema.json"
+    with open(os.path.join(os.path.dirname(__file__), schema_path)) as schema_file:
+        schema = json.load(schema_file)
+
+    for settings in ({"schedule": {"interval": 0}}, {"deadline": {"rpc": 0}}, {"deadline": {"cycle": 0}}, {"probe": {"interval": 10}}):
+        config["monitor"] = settings
+        with pytest.raises(RuntimeError):
+            monitor.validate_config(config, schema)
+
+    config["monitor"] = {"schedule": {"interval": 0.1}, "deadline": {"rpc": 0.1, "cycle": 0.1}}
+    assert monitor.validate_config(config, schema) == True
+
 ###############################################
 
 #################### SETUP ####################
 
+def running_config(config, subscriptions):
+    '''
+        Builds the gNMI Notification of a router running everything in config.yaml plus the given subscriptions
+    '''
+
+    tree = {
+        "destination-groups": {"destination-group": []},
+        "sensor-groups": {"sensor-group": []},
+        "subscriptions": {"subscription": []}
+    }
+
+    for collector in config["collectors"]:
+        dg = collector["destination-group"]
+        protocol = {"protocol": dg["protocol"]}
+        if not dg["tls"]:
+            protocol["no-tls"] = [None]
+        elif "tls-hostname" in dg:
+            protocol["tls-hostname"] = dg["tls-hostname"]
+        tree["destination-groups"]["destination-group"].append({
+            "destination-id": dg["destination-id"],
+            "ipv4-destinations": {"ipv4-destination": [{"ipv4-address": dg["ip"], "destination-port": dg["port"], "encoding": dg["encoding"], "protocol": protocol}]}
+        })
+
+    for sensor_group in config["sensor-groups"]:
+        tree["sensor-groups"]["sensor-group"].append({
+            "sensor-group-identifier": sensor_group["sensor-group-id"],
+            "sensor-paths": {"sensor-path": [{"telemetry-sensor-path": path} for path in sensor_group["sensor-paths"]]}
+        })
+
+    for collector in config["collectors"]:
+        if collector["subscription"]["subscription-id"] in subscriptions:
+            tree["subscriptions"]["subscription"].append({
+                "subscription-identifier": collector["subscription"]["subscription-id"],
+                "sensor-profiles": {"sensor-profile": [{"sensorgroupid": sensor_group["sensor-group-id"], "sample-interval": collector["subscription"]["interval"]} for sensor_group in config["sensor-groups"]]},
+                "destination-profiles": {"destination-profile": [{"destination-id": collector["destination-group"]["destination-id"]}]}
+            })
+
+    return {"notification": [{"prefix": None, "update": [{"path": "telemetry-model-driven", "val": tree}]}]}
+
 @pytest.mark.dependency(depends=["test_two_collector_config"])
-def test_setup_two(mocker):
+def test_setup_two():
     '''
-        Setup with two collectors
+        Setup with two collectors on an unconfigured router
     '''
 
-    mdt_mock = mocker.patch('monitor.MDT')
-
     mdt_instance = MagicMock()
-    mdt_instance.__enter__.return_value = mdt_instance
-    mdt_instance.__exit__.return_value = None
-    mdt_mock.return_value = mdt_instance
-    
+    mdt_instance.get_config = Mock(return_value={})
 
     config_path = "test_configs/two_collector.yaml"
     with open(os.path.join(os.path.dirname(__file__), config_path), "r") as config_file:
         config = yaml.load(config_file, Loader=yaml.Loader)
 
-    monitor.setup(config)
+    monitor.setup(config, mdt_instance)
 
-    calls = [   
-                call.create_destination('First-Collector', '4.5.6.7', 57777, 'self-describing-gpb', 'grpc', False, None),
-                call.create_destination('Second-Collector', '7.6.5.4', 57777, 'self-describing-gpb', 'grpc', True, 'hostname.com'),
-                call.create_sensor_path('Sample-Sensor-Group-Name', 'Cisco-IOS-XR-pfi-im-cmd-oper:interfaces/interface-xr/interface'),
-                call.create_sensor_path('Sample-Sensor-Group-Name', 'Cisco-IOS-XR-infra-statsd-oper:infra-statistics/interfaces/interface/latest/data-rate')
-            ]
+    update = {
+        'destination-groups': {
+            'First-Collector': [('4.5.6.7', 57777, 'self-describing-gpb', 'grpc', False, None)],
+            'Second-Collector': [('7.6.5.4', 57777, 'self-describing-gpb', 'grpc', True, 'hostname.com')]
+        },
+        'sensor-groups': {
+            'Sample-Sensor-Group-Name': ['Cisco-IOS-XR-pfi-im-cmd-oper:interfaces/interface-xr/interface', 'Cisco-IOS-XR-infra-statsd-oper:infra-statistics/interfaces/interface/latest/data-rate'],
+            'Sample-Sensor-Group-Name-2': ['Cisco-IOS-XR-nto-misc-oper:memory-summary/nodes/node/summary']
+        }
+    }
 
-    mdt_instance.assert_has_calls(calls, True)
+    mdt_instance.apply.assert_called_once_with(update, [])
+    mdt_instance.get_config.assert_called_once()
 
 @pytest.mark.dependency(depends=["test_three_collector_config"])
-def test_setup_three(mocker):
+def test_setup_three():
     '''
-        Setup with three collectors
+        Setup with three collectors on an unconfigured router
     '''
 
-    mdt_mock = mocker.patch('monitor.MDT')
-
     mdt_instance = MagicMock()
-    mdt_instance.__enter__.return_value = mdt_instance
-    mdt_instance.__exit__.return_value = None
-    mdt_mock.return_value = mdt_instance
-    
+    mdt_instance.get_config = Mock(return_value={})
 
     config_path = "test_configs/three_collector.yaml"
     with open(os.path.join(os.path.dirname(__file__), config_path), "r") as config_file:
         config = yaml.load(config_file, Loader=yaml.Loader)
 
-    monitor.setup(config)
+    monitor.setup(config, mdt_instance)
 
-    calls = [   
-                call.create_destination('First-Collector', '4.5.6.7', 57777, 'self-describing-gpb', 'grpc', False, None),
-                call.create_destination('Second-Collector', '7.6.5.4', 57777, 'self-describing-gpb', 'grpc', True, 'hostname.com'),
-                call.create_destination('Third-Collector', '1.2.3.4', 57777, 'self-describing-gpb', 'grpc', True, 'hostname2.com'),
-                call.create_sensor_path('Sample-Sensor-Group-Name', 'Cisco-IOS-XR-pfi-im-cmd-oper:interfaces/interface-xr/interface'),
-                call.create_sensor_path('Sample-Sensor-Group-Name', 'Cisco-IOS-XR-infra-statsd-oper:infra-statistics/interfaces/interface/latest/data-rate')
-            ]
+    update = mdt_instance.apply.call_args.args[0]
+    assert update['destination-groups'] == {
+        'First-Collector': [('4.5.6.7', 57777, 'self-describing-gpb', 'grpc', False, None)],
+        'Second-Collector': [('7.6.5.4', 57777, 'self-describing-gpb', 'grpc', True, 'hostname.com')],
+        'Third-Collector': [('1.2.3.4', 57777, 'self-describing-gpb', 'grpc', True, 'hostname2.com')]
+    }
+    assert list(update['sensor-groups']) == ['Sample-Sensor-Group-Name', 'Sample-Sensor-Group-Name-2']
+    assert 'subscriptions' not in update
+    mdt_instance.apply.assert_called_once()
 
-    mdt_instance.assert_has_calls(calls, True)
+@pytest.mark.dependency(depends=["test_two_collector_config"])
+def test_setup_unchanged():
+    '''
+        Setup on a router already running the configuration sends nothing
+    '''
 
-###############################################
+    config_path = "test_configs/two_collector.yaml"
+    with open(os.path.join(os.path.dirname(__file__), config_path), "r") as config_file:
+        config = yaml.load(config_file, Loader=yaml.Loader)
 
-#################### CLEAN ####################
+    mdt_instance = MagicMock()
+    mdt_instance.get_config = Mock(return_value=running_config(config, ["Subscription-1"]))
+
+    monitor.setup(config, mdt_instance)
+
+    mdt_instance.apply.assert_not_called()
 
 @pytest.mark.dependency(depends=["test_two_collector_config"])
-def test_clean_two_one_sub(mocker):
+def test_setup_drift():
     '''
-        Clean two collectors where second subscription is not configured
+        Setup only repairs the objects that differ from config.yaml
     '''
 
-    mdt_mock = mocker.patch('monitor.MDT')
+    config_path = "test_configs/two_collector.yaml"
+    with open(os.path.join(os.path.dirname(__file__), config_path), "r") as config_file:
+        config = yaml.load(config_file, Loader=yaml.Loader)
+
+    running = running_config(config, [])
+    tree = running["notification"][0]["update"][0]["val"]
+    tree["destination-groups"]["destination-group"][1]["ipv4-destinations"]["ipv4-destination"][0]["protocol"]["tls-hostname"] = "old.com"
+    tree["sensor-groups"]["sensor-group"][0]["sensor-paths"]["sensor-path"].append({"telemetry-sensor-path": "Old-Path"})
+    tree["sensor-groups"]["sensor-group"][1]["sensor-paths"]["sensor-path"] = []
 
     mdt_instance = MagicMock()
-    mdt_instance.__enter__.return_value = mdt_instance
-    mdt_instance.__exit__.return_value = None
-    mdt_instance.read_subscription = Mock(side_effect=["Some gNMI Response", None])
-    mdt_mock.return_value = mdt_instance
-    
+    mdt_instance.get_config = Mock(return_value=running)
+
+    monitor.setup(config, mdt_instance)
+
+    update = {
+        'destination-groups': {'Second-Collector': [('7.6.5.4', 57777, 'self-describing-gpb', 'grpc', True, 'hostname.com')]},
+        'sensor-groups': {'Sample-Sensor-Group-Name-2': ['Cisco-IOS-XR-nto-misc-oper:memory-summary/nodes/node/summary']}
+    }
+    delete = [('sensor-path', 'Sample-Sensor-Group-Name', 'Old-Path')]
+
+    mdt_instance.apply.assert_called_once_with(update, delete)
+
+###############################################
+
+#################### CLEAN ####################
+
+@pytest.mark.dependency(depends=["test_two_collector_config"])
+def test_clean_two_one_sub():
+    '''
+        Clean two collectors where second subscription is not configured
+    '''
 
     config_path = "test_configs/two_collector.yaml"
     with open(os.path.join(os.path.dirname(__file__), config_path), "r") as config_file:
         config = yaml.load(config_file, Loader=yaml.Loader)
 
-    monitor.clean(config)
+    mdt_instance = MagicMock()
+    mdt_instance.get_config = Mock(return_value=running_config(config, ['Subscription-1']))
+
+    monitor.clean(config, mdt_instance)
 
-    calls = [   
-                call.delete_sensor_group('Sample-Sensor-Group-Name'),
-                call.delete_sensor_group('Sample-Sensor-Group-Name-2'),
-                call.delete_subscription('Subscription-1'),
-                call.delete_destination_group('First-Collector'),
-                call.delete_destination_group('Second-Collector')
-            ]
+    delete = [('subscription', 'Subscription-1'), ('sensor-group', 'Sample-Sensor-Group-Name'), ('sensor-group', 'Sample-Sensor-Group-Name-2'), ('destination-group', 'First-Collector'), ('destination-group', 'Second-Collector')]
 
-    mdt_instance.assert_has_calls(calls, True)
-    assert call.delete_subscription('Subscription-2') not in mdt_instance.mock_calls
+    mdt_instance.apply.assert_called_once_with(None, delete)
+    assert ('subscription', 'Subscription-2') not in mdt_instance.apply.call_args.args[1]
 
 @pytest.mark.dependency(depends=["test_two_collector_config"])
-def test_clean_two_two_sub(mocker):
+def test_clean_two_two_sub():
     '''
         Clean two collectors where both subscriptions are configured
     '''
 
-    mdt_mock = mocker.patch('monitor.MDT')
-
-    mdt_instance = MagicMock()
-    mdt_instance.__enter__.return_value = mdt_instance
-    mdt_instance.__exit__.return_value = None
-    mdt_instance.read_subscription = Mock(side_effect=["Some gNMI Response", "Another gNMI Response"])
-    mdt_mock.return_value = mdt_instance
-    
-
     config_path = "test_configs/two_collector.yaml"
     with open(os.path.join(os.path.dirname(__file__), config_path), "r") as config_file:
         config = yaml.load(config_file, Loader=yaml.Loader)
 
-    monitor.clean(config)
+    mdt_instance = MagicMock()
+    mdt_instance.get_config = Mock(return_value=running_config(config, ['Subscription-1', 'Subscription-2']))
+
+    monitor.clean(config, mdt_instance)
 
-    calls = [   
-                call.delete_sensor_group('Sample-Sensor-Group-Name'),
-                call.delete_sensor_group('Sample-Sensor-Group-Name-2'),
-                call.delete_subscription('Subscription-1'),
-                call.delete_destination_group('First-Collector'),
-                call.delete_subscription('Subscription-2'),
-                call.delete_destination_group('Second-Collector')
-            ]
+    delete = [('subscription', 'Subscription-1'), ('subscription', 'Subscription-2'), ('sensor-group', 'Sample-Sensor-Group-Name'), ('sensor-group', 'Sample-Sensor-Group-Name-2'), ('destination-group', 'First-Collector'), ('destination-group', 'Second-Collector')]
 
-    mdt_instance.assert_has_calls(calls, True)
+    mdt_instance.apply.assert_called_once_with(None, delete)
 
 @pytest.mark.dependency(depends=["test_three_collector_config"])
-def test_clean_three_one_sub(mocker):
+def test_clean_three_one_sub():
     '''
         Clean three collectors where only the first subscription is configured
     '''
 
-    mdt_mock = mocker.patch('monitor.MDT')
-
-    mdt_instance = MagicMock()
-    mdt_instance.__enter__.return_value = mdt_instance
-    mdt_instance.__exit__.return_value = None
-    mdt_instance.read_subscription = Mock(side_effect=["Some gNMI Response", None, None])
-    mdt_mock.return_value = mdt_instance
-    
-
     config_path = "test_configs/three_collector.yaml"
     with open(os.path.join(os.path.dirname(__file__), config_path), "r") as config_file:
         config = yaml.load(config_file, Loader=yaml.Loader)
 
-    monitor.clean(config)
+    mdt_instance = MagicMock()
+    mdt_instance.get_config = Mock(return_value=running_config(config, ['Subscription-1']))
+
+    monitor.clean(config, mdt_instance)
 
-    calls = [   
-                call.delete_sensor_group('Sample-Sensor-Group-Name'),
-                call.delete_sensor_group('Sample-Sensor-Group-Name-2'),
-                call.delete_subscription('Subscription-1'),
-                call.delete_destination_group('First-Collector'),
-                call.delete_destination_group('Second-Collector'),
-                call.delete_destination_group('Third-Collector')
-            ]
+    delete = [('subscription', 'Subscription-1'), ('sensor-group', 'Sample-Sensor-Group-Name'), ('sensor-group', 'Sample-Sensor-Group-Name-2'), ('destination-group', 'First-Collector'), ('destination-group', 'Second-Collector'), ('destination-group', 'Third-Collector')]
 
-    mdt_instance.assert_has_calls(calls, True)
-    assert call.delete_subscription('Subscription-2') not in mdt_instance.mock_calls
-    assert call.delete_subscription('Subscription-3') not in mdt_instance.mock_calls
+    mdt_instance.apply.assert_called_once_with(None, delete)
+    assert ('subscription', 'Subscription-2') not in mdt_instance.apply.call_args.args[1]
+    assert ('subscription', 'Subscription-3') not in mdt_instance.apply.call_args.args[1]
 
 @pytest.mark.dependency(depends=["test_three_collector_config"])
-def test_clean_three_two_sub(mocker):
+def test_clean_three_two_sub():
     '''
         Clean three collectors where only the first two subscriptions are configured
     '''
 
-    mdt_mock = mocker.patch('monitor.MDT')
+    config_path = "test_configs/three_collector.yaml"
+    with open(os.path.join(os.path.dirname(__file__), config_path), "r") as config_file:
+        config = yaml.load(config_file, Loader=yaml.Loader)
 
     mdt_instance = MagicMock()
-    mdt_instance.__enter__.return_value = mdt_instance
-    mdt_instance.__exit__.return_value = None
-    mdt_instance.read_subscription = Mock(side_effect=["Some gNMI Response", "Another gNMI Response", None])
-    mdt_mock.return_value = mdt_instance
-    
+    mdt_instance.get_config = Mock(return_value=running_config(config, ['Subscription-1', 'Subscription-2']))
+
+    monitor.clean(config, mdt_instance)
+
+    delete = [('subscription', 'Subscription-1'), ('subscription', 'Subscription-2'), ('sensor-group', 'Sample-Sensor-Group-Name'), ('sensor-group', 'Sample-Sensor-Group-Name-2'), ('destination-group', 'First-Collector'), ('destination-group', 'Second-Collector'), ('destination-group', 'Third-Collector')]
+
+    mdt_instance.apply.assert_called_once_with(None, delete)
+    assert ('subscription', 'Subscription-3') not in mdt_instance.apply.call_args.args[1]
+
+@pytest.mark.dependency(depends=["test_three_collector_config"])
+def test_clean_three_three_sub():
+    '''
+        Clean three collectors where all three subscriptions are configured
+    '''
 
     config_path = "test_configs/three_collector.yaml"
     with open(os.path.join(os.path.dirname(__file__), config_path), "r") as config_file:
         config = yaml.load(config_file, Loader=yaml.Loader)
 
-    monitor.clean(config)
+    mdt_instance = MagicMock()
+    mdt_instance.get_config = Mock(return_value=running_config(config, ['Subscription-1', 'Subscription-2', 'Subscription-3']))
 
-    calls = [   
-                call.delete_sensor_group('Sample-Sensor-Group-Name'),
-                call.delete_sensor_group('Sample-Sensor-Group-Name-2'),
-                call.delete_subscription('Subscription-1'),
-                call.delete_destination_group('First-Collector'),
-                call.delete_subscription('Subscription-2'),
-                call.delete_destination_group('Second-Collector'),
-                call.delete_destination_group('Third-Collector')
-            ]
+    monitor.clean(config, mdt_instance)
 
-    mdt_instance.assert_has_calls(calls, True)
-    assert call.delete_subscription('Subscription-3') not in mdt_instance.mock_calls
+    delete = [('subscription', 'Subscription-1'), ('subscription', 'Subscription-2'), ('subscription', 'Subscription-3'), ('sensor-group', 'Sample-Sensor-Group-Name'), ('sensor-group', 'Sample-Sensor-Group-Name-2'), ('destination-group', 'First-Collector'), ('destination-group', 'Second-Collector'), ('destination-group', 'Third-Collector')]
 
-@pytest.mark.dependency(depends=["test_three_collector_config"])
-def test_clean_three_three_sub(mocker):
+    mdt_instance.apply.assert_called_once_with(None, delete)
+
+@pytest.mark.dependency(depends=["test_two_collector_config"])
+def test_clean_foreign_objects():
     '''
-        Clean three collectors where all three subscriptions are configured
+        Clean leaves telemetry configuration that is not in config.yaml alone
     '''
 
-    mdt_mock = mocker.patch('monitor.MDT')
+    config_path = "test_configs/two_collector.yaml"
+    with open(os.path.join(os.path.dirname(__file__), config_path), "r") as config_file:
+        config = yaml.load(config_file, Loader=yaml.Loader)
+
+    running = running_config(config, [])
+    running["notification"][0]["update"][0]["val"]["sensor-groups"]["sensor-group"].append({"sensor-group-identifier": "Someone-Elses-Group"})
 
     mdt_instance = MagicMock()
-    mdt_instance.__enter__.return_value = mdt_instance
-    mdt_instance.__exit__.return_value = None
-    mdt_instance.read_subscription = Mock(side_effect=["Some gNMI Response", "Another gNMI Response", "A third gNMI Response"])
-    mdt_mock.return_value = mdt_instance
-    
+    mdt_instance.get_config = Mock(return_value=running)
 
-    config_path = "test_configs/three_collector.yaml"
+    monitor.clean(config, mdt_instance)
+
+    assert ('sensor-group', 'Someone-Elses-Group') not in mdt_instance.apply.call_args.args[1]
+
+@pytest.mark.dependency(depends=["test_two_collector_config"])
+def test_clean_detach():
+    '''
+        Detaching leaves the active collector's subscription, destination group and sensor groups streaming
+    '''
+
+    config_path = "test_configs/two_collector.yaml"
     with open(os.path.join(os.path.dirname(__file__), config_path), "r") as config_file:
         config = yaml.load(config_file, Loader=yaml.Loader)
 
-    monitor.clean(config)
+    mdt_instance = MagicMock()
+    mdt_instance.get_config = Mock(return_value=running_config(config, ['Subscription-1', 'Subscription-2']))
 
-    calls = [   
-                call.delete_sensor_group('Sample-Sensor-Group-Name'),
-                call.delete_sensor_group('Sample-Sensor-Group-Name-2'),
-                call.delete_subscription('Subscription-1'),
-                call.delete_destination_group('First-Collector'),
-                call.delete_subscription('Subscription-2'),
-                call.delete_destination_group('Second-Collector'),
-                call.delete_subscription('Subscription-3'),
-                call.delete_destination_group('Third-Collector')
-            ]
+    monitor.clean(config, mdt_instance, keep=0)
 
-    mdt_instance.assert_has_calls(calls, True)
+    mdt_instance.apply.assert_called_once_with(None, [('subscription', 'Subscription-2'), ('destination-group', 'Second-Collector')])
 
 ###############################################
 
 #################### CHECK ####################
 
-# Different possible situations for a two collector system (9 important ones)
+# Possible situations for the subscriptions of a system, all read with a single Get
 # Format: test_check_<NUMBER OF COLLECTORS>_<SITUATION #>
 #
-# 1. Create Subscription-1 and return with 0
-# Subscription-1 : Doesn't Exist | ACTIVE
-# Subscription-2 : Doesn't Exist | ACTIVE/INACTIVE
+# 1. Create Subscription-1 and Subscription-2 and return with -1
+# Subscription-1 : Doesn't Exist
+# Subscription-2 : Doesn't Exist
 # ---------------------------------------
 # 2. Return with 0
 # Subscription-1 : Exists | ACTIVE
-# Subscription-2 : Doesn't Exist | ACTIVE/INACTIVE
+# Subscription-2 : Doesn't Exist
 # ---------------------------------------
 # 3. Delete Subscription-2 and return with 0
 # Subscription-1 : Exists | ACTIVE
-# Subscription-2 : Exists | ACTIVE/INACTIVE
+# Subscription-2 : Exists | INACTIVE
 # ---------------------------------------
-# 4. Create Subscription-1 and Subscription-2 and return with 1
-# Subscription-1 : Doesn't Exist | INACTIVE
-# Subscription-2 : Doesn't Exist | ACTIVE
+# 4. Delete Subscription-2 and return with 0
+# Subscription-1 : Exists | ACTIVE
+# Subscription-2 : Exists | ACTIVE
 # ---------------------------------------
-# 5. Create Subscription-2 and return with 1
-# Subscription-1 : Exists | INACTIVE
-# Subscription-2 : Doesn't Exist | ACTIVE
+# 5. Create Subscription-1 and return with 1
+# Subscription-1 : Doesn't Exist
+# Subscription-2 : Exists | ACTIVE
 # ---------------------------------------
 # 6. Return with 1
 # Subscription-1 : Exists | INACTIVE
 # Subscription-2 : Exists | ACTIVE
 # ---------------------------------------
-# 7. Create Subscription-1 and Subscription-2 and return with -1
-# Subscription-1 : Doesn't Exist | INACTIVE
-# Subscription-2 : Doesn't Exist | INACTIVE
+# 7. Create Subscription-2 and return with -1
+# Subscription-1 : Exists | INACTIVE
+# Subscription-2 : Doesn't Exist
 # ---------------------------------------
-# 8. Create Subscritpion-2 and return with -1
+# 8. Return with -1
 # Subscription-1 : Exists | INACTIVE
-# Subscription-2 : Doesn't Exist | INACTIVE
+# Subscription-2 : Exists | INACTIVE
 # ---------------------------------------
 # 9. Return with -1
 # Subscription-1 : Exists | INACTIVE
 # Subscription-2 : Exists | INACTIVE
+# Subscription-3 : Exists | INACTIVE
 # ---------------------------------------
-
-# Different possible situations for a three collector system (16 important ones) 
-# Format: test_check_<NUMBER OF COLLECTORS>_<SITUATION #>
-# 
-# ---------------------------------------
-# 10. Return with -1
-# Subscription-1: Exists | INACTIVE
-# Subscription-2: Exists | INACTIVE
-# Subscription-3: Exists | INACTIVE
-# ---------------------------------------
-# 11. Create Subscription-3 and return -1
-# Subscription-1: Exists | INACTIVE
-# Subscription-2: Exists | INACTIVE
-# Subscription-3: Doesn't Exist | INACTIVE
+# 10. Create Subscription-3 and return with -1
+# Subscription-1 : Exists | INACTIVE
+# Subscription-2 : Exists | INACTIVE
+# Subscription-3 : Doesn't Exist
 # ---------------------------------------
-# 12. Create Subscription-2 and Subscription-3 and return -1
-# Subscription-1: Exists | INACTIVE
-# Subscription-2: Doesn't Exist | INACTIVE
-# Subscription-3: Doesn't Exist | INACTIVE
+# 11. Create Subscription-2 and Subscription-3 and return with -1
+# Subscription-1 : Exists | INACTIVE
+# Subscription-2 : Doesn't Exist
+# Subscription-3 : Doesn't Exist
 # ---------------------------------------
-# 13. Create Subscription-1, Subscription-2, and Subscription-3 and return -1
-# Subscription-1: Doesn't Exist | INACTIVE
-# Subscription-2: Doesn't Exist | INACTIVE
-# Subscription-3: Doesn't Exist | INACTIVE
+# 12. Create Subscription-1, Subscription-2, and Subscription-3 and return with -1
+# Subscription-1 : Doesn't Exist
+# Subscription-2 : Doesn't Exist
+# Subscription-3 : Doesn't Exist
 # ---------------------------------------
-# 14. Return 2
-# Subscription-1: Exists | INACTIVE
-# Subscription-2: Exists | INACTIVE
-# Subscription-3: Exists | ACTIVE
+# 13. Return with 2
+# Subscription-1 : Exists | INACTIVE
+# Subscription-2 : Exists | INACTIVE
+# Subscription-3 : Exists | ACTIVE
 # ---------------------------------------
-# 15. Create Subscription-3 and return 2
-# Subscription-1: Exists | INACTIVE
-# Subscription-2: Exists | INACTIVE
-# Subscription-3: Doesn't Exist | ACTIVE
+# 14. Create Subscription-1 and Subscription-2 and return with 2
+# Subscription-1 : Doesn't Exist
+# Subscription-2 : Doesn't Exist
+# Subscription-3 : Exists | ACTIVE
 # ---------------------------------------
-# 16. Create Subscription-2 and Subscription-3 and return 2
-# Subscription-1: Exists | INACTIVE
-# Subscription-2: Doesn't Exist | INACTIVE
-# Subscription-3: Doesn't Exist | ACTIVE
+# 15. Create Subscription-1 and return with 2
+# Subscription-1 : Doesn't Exist
+# Subscription-2 : Exists | INACTIVE
+# Subscription-3 : Exists | ACTIVE
 # ---------------------------------------
-# 17. Create Subscription-1, Subscription-2, and Subscription-3 and return 2
-# Subscription-1: Doesn't Exist | INACTIVE
-# Subscription-2: Doesn't Exist | INACTIVE
-# Subscription-3: Doesn't Exist | ACTIVE
+# 16. Delete Subscription-3 and return with 1
+# Subscription-1 : Exists | INACTIVE
+# Subscription-2 : Exists | ACTIVE
+# Subscription-3 : Exists | INACTIVE
 # ---------------------------------------
-# 18. Delete Subscription-3 and return 1
-# Subscription-1: Exists | INACTIVE
-# Subscription-2: Exists | ACTIVE
-# Subscription-3: Exists | ACTIVE/INACTIVE
+# 17. Delete Subscription-3 and return with 1
+# Subscription-1 : Exists | INACTIVE
+# Subscription-2 : Exists | ACTIVE
+# Subscription-3 : Exists | ACTIVE
 # ---------------------------------------
-# 19. Return 1
-# Subscription-1: Exists | INACTIVE
-# Subscription-2: Exists | ACTIVE
-# Subscription-3: Doesn't Exist | ACTIVE/INACTIVE
+# 18. Return with 1
+# Subscription-1 : Exists | INACTIVE
+# Subscription-2 : Exists | ACTIVE
+# Subscription-3 : Doesn't Exist
 # ---------------------------------------
-# 20. Create Subscription-2 and return 1
-# Subscription-1: Exists | INACTIVE
-# Subscription-2: Doesn't Exist | ACTIVE
-# Subscription-3: Doesn't Exist | ACTIVE/INACTIVE
+# 19. Create Subscription-1 and return with 1
+# Subscription-1 : Doesn't Exist
+# Subscription-2 : Exists | ACTIVE
+# Subscription-3 : Doesn't Exist
 # ---------------------------------------
-# 21. Create Subscription-1 and Subscription-2 and return 1
-# Subscription-1: Doesn't Exist | INACTIVE
-# Subscription-2: Doesn't Exist | ACTIVE
-# Subscription-3: Doesn't Exist | ACTIVE/INACTIVE
+# 20. Delete Subscription-2 and Subscription-3 and return with 0
+# Subscription-1 : Exists | ACTIVE
+# Subscription-2 : Exists | INACTIVE
+# Subscription-3 : Exists | INACTIVE
 # ---------------------------------------
-# 22. Delete Subscription-2 and Subscription-3 and return 0
-# Subscription-1: Exists | ACTIVE
-# Subscription-2: Exists | ACTIVE/INACTIVE
-# Subscription-3: Exists | ACTIVE/INACTIVE
+# 21. Delete Subscription-2 and return with 0
+# Subscription-1 : Exists | ACTIVE
+# Subscription-2 : Exists | INACTIVE
+# Subscription-3 : Doesn't Exist
 # ---------------------------------------
-# 23. Delete Subscription-2 and return 0
-# Subscription-1: Exists | ACTIVE
-# Subscription-2: Exists | ACTIVE/INACTIVE
-# Subscription-3: Doesn't Exist | ACTIVE/INACTIVE
+# 22. Return with 0
+# Subscription-1 : Exists | ACTIVE
+# Subscription-2 : Doesn't Exist
+# Subscription-3 : Doesn't Exist
 # ---------------------------------------
-# 24. Return 0
-# Subscription-1: Exists | ACTIVE
-# Subscription-2: Doesn't Exist | ACTIVE/INACTIVE
-# Subscription-3: Doesn't Exist | ACTIVE/INACTIVE
+# 23. Delete Subscription-2 and Subscription-3 and return with 0
+# Subscription-1 : Exists | ACTIVE
+# Subscription-2 : Exists | ACTIVE
+# Subscription-3 : Exists | ACTIVE
 # ---------------------------------------
-# 25. Create Subscription-1 and return 0
-# Subscription-1: Doesn't Exist | ACTIVE
-# Subscription-2: Doesn't Exist | ACTIVE/INACTIVE
-# Subscription-3: Doesn't Exist | ACTIVE/INACTIVE
 
 @pytest.mark.dependency(depends=["test_two_collector_config"])
-def test_check_two_1(mocker):
+def test_check_two_1():
     '''
-        1. Create Subscription-1 and return with 0
-        Subscription-1 : Doesn't Exist | ACTIVE
-        Subscription-2 : Doesn't Exist | ACTIVE/INACTIVE
+        1. Create Subscription-1 and Subscription-2 and return with -1
+        Subscription-1 : Doesn't Exist
+        Subscription-2 : Doesn't Exist
     '''
 
-    mdt_mock = mocker.patch('monitor.MDT')
-
     mdt_instance = MagicMock()
-    mdt_instance.__enter__.return_value = mdt_instance
-    mdt_instance.__exit__.return_value = None
-    mdt_instance.read_subscription = Mock(side_effect=[None, None])
-    mdt_instance.check_connection = Mock(side_effect=[True, '?'])
-    mdt_mock.return_value = mdt_instance
+    mdt_instance.read_subscription_states = Mock(return_value={})
     
     config_path = "test_configs/two_collector.yaml"
     with open(os.path.join(os.path.dirname(__file__), config_path), "r") as config_file:
         config = yaml.load(config_file, Loader=yaml.Loader)
 
-    assert monitor.check(config) == 0
+    assert monitor.check(config, mdt_instance) == -1
 
-    calls = [   
-                call.create_subscription('Subscription-1', 'Sample-Sensor-Group-Name', 'First-Collector', 30000),
-                call.create_subscription('Subscription-1', 'Sample-Sensor-Group-Name-2', 'First-Collector', 30000)
-            ]
+    mdt_instance.read_subscription_states.assert_called_once()
 
-    mdt_instance.assert_has_calls(calls, True)
-    mdt_instance.delete_subscription.assert_not_called()
+    update = {'subscriptions': {
+        'Subscription-1': {'sensor-profiles': {'Sample-Sensor-Group-Name': 30000, 'Sample-Sensor-Group-Name-2': 30000}, 'destination-profiles': ['First-Collector']},
+        'Subscription-2': {'sensor-profiles': {'Sample-Sensor-Group-Name': 30000, 'Sample-Sensor-Group-Name-2': 30000}, 'destination-profiles': ['Second-Collector']}
+    }}
+    delete = []
+    mdt_instance.apply.assert_called_once_with(update, delete)
 
 @pytest.mark.dependency(depends=["test_two_collector_config"])
-def test_check_two_2(mocker):
+def test_check_two_2():
     '''
         2. Return with 0
         Subscription-1 : Exists | ACTIVE
-        Subscription-2 : Doesn't Exist | ACTIVE/INACTIVE
+        Subscription-2 : Doesn't Exist
     '''
 
-    mdt_mock = mocker.patch('monitor.MDT')
-
     mdt_instance = MagicMock()
-    mdt_instance.__enter__.return_value = mdt_instance
-    mdt_instance.__exit__.return_value = None
-    mdt_instance.read_subscription = Mock(side_effect=["Some gNMI Response", None])
-    mdt_instance.check_connection = Mock(side_effect=[True, '?'])
-    mdt_mock.return_value = mdt_instance
+    mdt_instance.read_subscription_states = Mock(return_value={'Subscription-1': 'active'})
     
     config_path = "test_configs/two_collector.yaml"
     with open(os.path.join(os.path.dirname(__file__), config_path), "r") as config_file:
         config = yaml.load(config_file, Loader=yaml.Loader)
 
-    assert monitor.check(config) == 0
+    assert monitor.check(config, mdt_instance) == 0
 
-    mdt_instance.create_subscription.assert_not_called()
-    mdt_instance.delete_subscription.assert_not_called()
+    mdt_instance.read_subscription_states.assert_called_once()
+    mdt_instance.apply.assert_not_called()
 
 @pytest.mark.dependency(depends=["test_two_collector_config"])
-def test_check_two_3(mocker):
+def test_check_two_3():
     '''
         3. Delete Subscription-2 and return with 0
         Subscription-1 : Exists | ACTIVE
-        Subscription-2 : Exists | ACTIVE/INACTIVE
+        Subscription-2 : Exists | INACTIVE
     '''
 
-    mdt_mock = mocker.patch('monitor.MDT')
-
     mdt_instance = MagicMock()
-    mdt_instance.__enter__.return_value = mdt_instance
-    mdt_instance.__exit__.return_value = None
-    mdt_instance.read_subscription = Mock(side_effect=["Some gNMI Response", "Another gNMI Response"])
-    mdt_instance.check_connection = Mock(side_effect=[True, '?'])
-    mdt_mock.return_value = mdt_instance
+    mdt_instance.read_subscription_states = Mock(return_value={'Subscription-1': 'active', 'Subscription-2': 'not active'})
     
     config_path = "test_configs/two_collector.yaml"
     with open(os.path.join(os.path.dirname(__file__), config_path), "r") as config_file:
         config = yaml.load(config_file, Loader=yaml.Loader)
 
-    assert monitor.check(config) == 0
+    assert monitor.check(config, mdt_instance) == 0
 
-    calls = [   
-            call.delete_subscription('Subscription-2')
-        ]
+    mdt_instance.read_subscription_states.assert_called_once()
 
-    mdt_instance.assert_has_calls(calls, True)
-    mdt_instance.create_subscription.assert_not_called()
-    assert call.delete_subscription('Subscription-1') not in mdt_instance.mock_calls
+    update = {}
+    delete = [('subscription', 'Subscription-2')]
+    mdt_instance.apply.assert_called_once_with(update, delete)
 
 @pytest.mark.dependency(depends=["test_two_collector_config"])
-def test_check_two_4(mocker):
+def test_check_two_4():
     '''
-        4. Create Subscription-1 and Subscription-2 and return with 1
-        Subscription-1 : Doesn't Exist | INACTIVE
-        Subscription-2 : Doesn't Exist | ACTIVE
+        4. Delete Subscription-2 and return with 0
+        Subscription-1 : Exists | ACTIVE
+        Subscription-2 : Exists | ACTIVE
     '''
 
-    mdt_mock = mocker.patch('monitor.MDT')
-
     mdt_instance = MagicMock()
-    mdt_instance.__enter__.return_value = mdt_instance
-    mdt_instance.__exit__.return_value = None
-    mdt_instance.read_subscription = Mock(side_effect=[None, None])
-    mdt_instance.check_connection = Mock(side_effect=[False, True])
-    mdt_mock.return_value = mdt_instance
+    mdt_instance.read_subscription_states = Mock(return_value={'Subscription-1': 'active', 'Subscription-2': 'active'})
     
     config_path = "test_configs/two_collector.yaml"
     with open(os.path.join(os.path.dirname(__file__), config_path), "r") as config_file:
         config = yaml.load(config_file, Loader=yaml.Loader)
 
-    assert monitor.check(config) == 1
+    assert monitor.check(config, mdt_instance) == 0
 
-    calls = [   
-                call.create_subscription('Subscription-1', 'Sample-Sensor-Group-Name', 'First-Collector', 30000),
-                call.create_subscription('Subscription-1', 'Sample-Sensor-Group-Name-2', 'First-Collector', 30000),
-                call.create_subscription('Subscription-2', 'Sample-Sensor-Group-Name', 'Second-Collector', 30000),
-                call.create_subscription('Subscription-2', 'Sample-Sensor-Group-Name-2', 'Second-Collector', 30000)
-            ]
+    mdt_instance.read_subscription_states.assert_called_once()
 
-    mdt_instance.assert_has_calls(calls, True)
-    mdt_instance.delete_subscription.assert_not_called()
+    update = {}
+    delete = [('subscription', 'Subscription-2')]
+    mdt_instance.apply.assert_called_once_with(update, delete)
 
 @pytest.mark.dependency(depends=["test_two_collector_config"])
-def test_check_two_5(mocker):
+def test_check_two_5():
     '''
-        5. Create Subscription-2 and return with 1
-        Subscription-1 : Exists | INACTIVE
-        Subscription-2 : Doesn't Exist | ACTIVE
+        5. Create Subscription-1 and return with 1
+        Subscription-1 : Doesn't Exist
+        Subscription-2 : Exists | ACTIVE
     '''
 
-    mdt_mock = mocker.patch('monitor.MDT')
-
     mdt_instance = MagicMock()
-    mdt_instance.__enter__.return_value = mdt_instance
-    mdt_instance.__exit__.return_value = None
-    mdt_instance.read_subscription = Mock(side_effect=["Some gNMI Response", None])
-    mdt_instance.check_connection = Mock(side_effect=[False, True])
-    mdt_mock.return_value = mdt_instance
+    mdt_instance.read_subscription_states = Mock(return_value={'Subscription-2': 'active'})
     
     config_path = "test_configs/two_collector.yaml"
     with open(os.path.join(os.path.dirname(__file__), config_path), "r") as config_file:
         config = yaml.load(config_file, Loader=yaml.Loader)
 
-    assert monitor.check(config) == 1
+    assert monitor.check(config, mdt_instance) == 1
 
-    calls = [   
-                call.create_subscription('Subscription-2', 'Sample-Sensor-Group-Name', 'Second-Collector', 30000),
-                call.create_subscription('Subscription-2', 'Sample-Sensor-Group-Name-2', 'Second-Collector', 30000)
-            ]
+    mdt_instance.read_subscription_states.assert_called_once()
 
-    mdt_instance.assert_has_calls(calls, True)
-    mdt_instance.delete_subscription.assert_not_called()
-    assert call.create_subscription('Subscription-1', 'Sample-Sensor-Group-Name', 'First-Collector', 30000) not in mdt_instance.mock_calls
-    assert call.create_subscription('Subscription-1', 'Sample-Sensor-Group-Name-2', 'First-Collector', 30000) not in mdt_instance.mock_calls
+    update = {'subscriptions': {
+        'Subscription-1': {'sensor-profiles': {'Sample-Sensor-Group-Name': 30000, 'Sample-Sensor-Group-Name-2': 30000}, 'destination-profiles': ['First-Collector']}
+    }}
+    delete = []
+    mdt_instance.apply.assert_called_once_with(update, delete)
 
 @pytest.mark.dependency(depends=["test_two_collector_config"])
-def test_check_two_6(mocker):
+def test_check_two_6():
     '''
         6. Return with 1
         Subscription-1 : Exists | INACTIVE
         Subscription-2 : Exists | ACTIVE
     '''
 
-    mdt_mock = mocker.patch('monitor.MDT')
-
     mdt_instance = MagicMock()
-    mdt_instance.__enter__.return_value = mdt_instance
-    mdt_instance.__exit__.return_value = None
-    mdt_instance.read_subscription = Mock(side_effect=["Some gNMI Response", "Another gNMI Response"])
-    mdt_instance.check_connection = Mock(side_effect=[False, True])
-    mdt_mock.return_value = mdt_instance
+    mdt_instance.read_subscription_states = Mock(return_value={'Subscription-1': 'not active', 'Subscription-2': 'active'})
     
     config_path = "test_configs/two_collector.yaml"
     with open(os.path.join(os.path.dirname(__file__), config_path), "r") as config_file:
         config = yaml.load(config_file, Loader=yaml.Loader)
 
-    assert monitor.check(config) == 1
+    assert monitor.check(config, mdt_instance) == 1
 
-    mdt_instance.delete_subscription.assert_not_called()
-    mdt_instance.create_subscription.assert_not_called()
+    mdt_instance.read_subscription_states.assert_called_once()
+    mdt_instance.apply.assert_not_called()
 
 @pytest.mark.dependency(depends=["test_two_collector_config"])
-def test_check_two_7(mocker):
+def test_check_two_7():
     '''
-        7. Create Subscription-1 and Subscription-2 and return with -1
-        Subscription-1 : Doesn't Exist | INACTIVE
-        Subscription-2 : Doesn't Exist | INACTIVE
+        7. Create Subscription-2 and return with -1
+        Subscription-1 : Exists | INACTIVE
+        Subscription-2 : Doesn't Exist
     '''
 
-    mdt_mock = mocker.patch('monitor.MDT')
-
     mdt_instance = MagicMock()
-    mdt_instance.__enter__.return_value = mdt_instance
-    mdt_instance.__exit__.return_value = None
-    mdt_instance.read_subscription = Mock(side_effect=[None, None])
-    mdt_instance.check_connection = Mock(side_effect=[False, False])
-    mdt_mock.return_value = mdt_instance
+    mdt_instance.read_subscription_states = Mock(return_value={'Subscription-1': 'not active'})
     
     config_path = "test_configs/two_collector.yaml"
     with open(os.path.join(os.path.dirname(__file__), config_path), "r") as config_file:
         config = yaml.load(config_file, Loader=yaml.Loader)
 
-    assert monitor.check(config) == -1
+    assert monitor.check(config, mdt_instance) == -1
 
-    calls = [   
-                call.create_subscription('Subscription-1', 'Sample-Sensor-Group-Name', 'First-Collector', 30000),
-                call.create_subscription('Subscription-1', 'Sample-Sensor-Group-Name-2', 'First-Collector', 30000),
-                call.create_subscription('Subscription-2', 'Sample-Sensor-Group-Name', 'Second-Collector', 30000),
-                call.create_subscription('Subscription-2', 'Sample-Sensor-Group-Name-2', 'Second-Collector', 30000)
-            ]
+    mdt_instance.read_subscription_states.assert_called_once()
 
-    mdt_instance.assert_has_calls(calls, True)
-    mdt_instance.delete_subscription.assert_not_called()
+    update = {'subscriptions': {
+        'Subscription-2': {'sensor-profiles': {'Sample-Sensor-Group-Name': 30000, 'Sample-Sensor-Group-Name-2': 30000}, 'destination-profiles': ['Second-Collector']}
+    }}
+    delete = []
+    mdt_instance.apply.assert_called_once_with(update, delete)
 
 @pytest.mark.dependency(depends=["test_two_collector_config"])
-def test_check_two_8(mocker):
+def test_check_two_8():
     '''
-        8. Create Subscritpion-2 and return with -1
+        8. Return with -1
         Subscription-1 : Exists | INACTIVE
-        Subscription-2 : Doesn't Exist | INACTIVE
+        Subscription-2 : Exists | INACTIVE
     '''
 
-    mdt_mock = mocker.patch('monitor.MDT')
-
     mdt_instance = MagicMock()
-    mdt_instance.__enter__.return_value = mdt_instance
-    mdt_instance.__exit__.return_value = None
-    mdt_instance.read_subscription = Mock(side_effect=["Some gNMI Response", None])
-    mdt_instance.check_connection = Mock(side_effect=[False, False])
-    mdt_mock.return_value = mdt_instance
+    mdt_instance.read_subscription_states = Mock(return_value={'Subscription-1': 'not active', 'Subscription-2': 'not active'})
     
     config_path = "test_configs/two_collector.yaml"
     with open(os.path.join(os.path.dirname(__file__), config_path), "r") as config_file:
         config = yaml.load(config_file, Loader=yaml.Loader)
 
-    assert monitor.check(config) == -1
-
-    calls = [   
-                call.create_subscription('Subscription-2', 'Sample-Sensor-Group-Name', 'Second-Collector', 30000),
-                call.create_subscription('Subscription-2', 'Sample-Sensor-Group-Name-2', 'Second-Collector', 30000)
-            ]
+    assert monitor.check(config, mdt_instance) == -1
 
-    mdt_instance.assert_has_calls(calls, True)
-    mdt_instance.delete_subscription.assert_not_called()
-    assert call.create_subscription('Subscription-1', 'Sample-Sensor-Group-Name', 'First-Collector', 30000) not in mdt_instance.mock_calls
-    assert call.create_subscription('Subscription-1', 'Sample-Sensor-Group-Name-2', 'First-Collector', 30000) not in mdt_instance.mock_calls
+    mdt_instance.read_subscription_states.assert_called_once()
+    mdt_instance.apply.assert_not_called()
 
-@pytest.mark.dependency(depends=["test_two_collector_config"])
-def test_check_two_9(mocker):
+@pytest.mark.dependency(depends=["test_three_collector_config"])
+def test_check_three_9():
     '''
-        9. return with -1
+        9. Return with -1
         Subscription-1 : Exists | INACTIVE
         Subscription-2 : Exists | INACTIVE
+        Subscription-3 : Exists | INACTIVE
     '''
 
-    mdt_mock = mocker.patch('monitor.MDT')
-
     mdt_instance = MagicMock()
-    mdt_instance.__enter__.return_value = mdt_instance
-    mdt_instance.__exit__.return_value = None
-    mdt_instance.read_subscription = Mock(side_effect=["Some gNMI Response", "Another gNMI Response"])
-    mdt_instance.check_connection = Mock(side_effect=[False, False])
-    mdt_mock.return_value = mdt_instance
+    mdt_instance.read_subscription_states = Mock(return_value={'Subscription-1': 'not active', 'Subscription-2': 'not active', 'Subscription-3': 'not active'})
     
-    config_path = "test_configs/two_collector.yaml"
+    config_path = "test_configs/three_collector.yaml"
     with open(os.path.join(os.path.dirname(__file__), config_path), "r") as config_file:
         config = yaml.load(config_file, Loader=yaml.Loader)
 
-    assert monitor.check(config) == -1
+    assert monitor.check(config, mdt_instance) == -1
 
-    mdt_instance.create_subscription.assert_not_called()
-    mdt_instance.delete_subscription.assert_not_called()
+    mdt_instance.read_subscription_states.assert_called_once()
+    mdt_instance.apply.assert_not_called()
 
 @pytest.mark.dependency(depends=["test_three_collector_config"])
-def test_check_three_10(mocker):
+def test_check_three_10():
     '''
-        10. Return with -1
-        Subscription-1: Exists | INACTIVE
-        Subscription-2: Exists | INACTIVE
-        Subscription-3: Exists | INACTIVE
+        10. Create Subscription-3 and return with -1
+        Subscription-1 : Exists | INACTIVE
+        Subscription-2 : Exists | INACTIVE
+        Subscription-3 : Doesn't Exist
     '''
 
-    mdt_mock = mocker.patch('monitor.MDT')
-
     mdt_instance = MagicMock()
-    mdt_instance.__enter__.return_value = mdt_instance
-    mdt_instance.__exit__.return_value = None
-    mdt_instance.read_subscription = Mock(side_effect=["Some gNMI Response", "Another gNMI Response", "A third gNMI Response"])
-    mdt_instance.check_connection = Mock(side_effect=[False, False, False])
-    mdt_mock.return_value = mdt_instance
+    mdt_instance.read_subscription_states = Mock(return_value={'Subscription-1': 'not active', 'Subscription-2': 'not active'})
     
     config_path = "test_configs/three_collector.yaml"
     with open(os.path.join(os.path.dirname(__file__), config_path), "r") as config_file:
         config = yaml.load(config_file, Loader=yaml.Loader)
 
-    assert monitor.check(config) == -1
+    assert monitor.check(config, mdt_instance) == -1
 
-    mdt_instance.create_subscription.assert_not_called()
-    mdt_instance.delete_subscription.assert_not_called()
+    mdt_instance.read_subscription_states.assert_called_once()
+
+    update = {'subscriptions': {
+        'Subscription-3': {'sensor-profiles': {'Sample-Sensor-Group-Name': 30000, 'Sample-Sensor-Group-Name-2': 30000}, 'destination-profiles': ['Third-Collector']}
+    }}
+    delete = []
+    mdt_instance.apply.assert_called_once_with(update, delete)
 
 @pytest.mark.dependency(depends=["test_three_collector_config"])
-def test_check_three_11(mocker):
+def test_check_three_11():
     '''
-        11. Create Subscription-3 and return -1
-        Subscription-1: Exists | INACTIVE
-        Subscription-2: Exists | INACTIVE
-        Subscription-3: Doesn't Exist | INACTIVE
+        11. Create Subscription-2 and Subscription-3 and return with -1
+        Subscription-1 : Exists | INACTIVE
+        Subscription-2 : Doesn't Exist
+        Subscription-3 : Doesn't Exist
     '''
 
-    mdt_mock = mocker.patch('monitor.MDT')
-
     mdt_instance = MagicMock()
-    mdt_instance.__enter__.return_value = mdt_instance
-    mdt_instance.__exit__.return_value = None
-    mdt_instance.read_subscription = Mock(side_effect=["Some gNMI Response", "Another gNMI Response", None])
-    mdt_instance.check_connection = Mock(side_effect=[False, False, False])
-    mdt_mock.return_value = mdt_instance
+    mdt_instance.read_subscription_states = Mock(return_value={'Subscription-1': 'not active'})
     
     config_path = "test_configs/three_collector.yaml"
     with open(os.path.join(os.path.dirname(__file__), config_path), "r") as config_file:
         config = yaml.load(config_file, Loader=yaml.Loader)
 
-    assert monitor.check(config) == -1
+    assert monitor.check(config, mdt_instance) == -1
 
-    calls = [   
-                call.create_subscription('Subscription-3', 'Sample-Sensor-Group-Name', 'Third-Collector', 30000),
-                call.create_subscription('Subscription-3', 'Sample-Sensor-Group-Name-2', 'Third-Collector', 30000)
-            ]
+    mdt_instance.read_subscription_states.assert_called_once()
 
-    mdt_instance.assert_has_calls(calls, True)
-    mdt_instance.delete_subscription.assert_not_called()
-    assert call.create_subscription('Subscription-1', 'Sample-Sensor-Group-Name', 'First-Collector', 30000) not in mdt_instance.mock_calls
-    assert call.create_subscription('Subscription-1', 'Sample-Sensor-Group-Name-2', 'First-Collector', 30000) not in mdt_instance.mock_calls
-    assert call.create_subscription('Subscription-2', 'Sample-Sensor-Group-Name', 'Second-Collector', 30000) not in mdt_instance.mock_calls
-    assert call.create_subscription('Subscription-2', 'Sample-Sensor-Group-Name-2', 'Second-Collector', 30000) not in mdt_instance.mock_calls
+    update = {'subscriptions': {
+        'Subscription-2': {'sensor-profiles': {'Sample-Sensor-Group-Name': 30000, 'Sample-Sensor-Group-Name-2': 30000}, 'destination-profiles': ['Second-Collector']},
+        'Subscription-3': {'sensor-profiles': {'Sample-Sensor-Group-Name': 30000, 'Sample-Sensor-Group-Name-2': 30000}, 'destination-profiles': ['Third-Collector']}
+    }}
+    delete = []
+    mdt_instance.apply.assert_called_once_with(update, delete)
 
 @pytest.mark.dependency(depends=["test_three_collector_config"])
-def test_check_three_12(mocker):
+def test_check_three_12():
     '''
-        12. Create Subscription-2 and Subscription-3 and return -1
-        Subscription-1: Exists | INACTIVE
-        Subscription-2: Doesn't Exist | INACTIVE
-        Subscription-3: Doesn't Exist | INACTIVE
+        12. Create Subscription-1, Subscription-2, and Subscription-3 and return with -1
+        Subscription-1 : Doesn't Exist
+        Subscription-2 : Doesn't Exist
+        Subscription-3 : Doesn't Exist
     '''
 
-    mdt_mock = mocker.patch('monitor.MDT')
-
     mdt_instance = MagicMock()
-    mdt_instance.__enter__.return_value = mdt_instance
-    mdt_instance.__exit__.return_value = None
-    mdt_instance.read_subscription = Mock(side_effect=["Some gNMI Response", None, None])
-    mdt_instance.check_connection = Mock(side_effect=[False, False, False])
-    mdt_mock.return_value = mdt_instance
+    mdt_instance.read_subscription_states = Mock(return_value={})
     
     config_path = "test_configs/three_collector.yaml"
     with open(os.path.join(os.path.dirname(__file__), config_path), "r") as config_file:
         config = yaml.load(config_file, Loader=yaml.Loader)
 
-    assert monitor.check(config) == -1
+    assert monitor.check(config, mdt_instance) == -1
 
-    calls = [   
-                call.create_subscription('Subscription-3', 'Sample-Sensor-Group-Name', 'Third-Collector', 30000),
-                call.create_subscription('Subscription-3', 'Sample-Sensor-Group-Name-2', 'Third-Collector', 30000),
-                call.create_subscription('Subscription-2', 'Sample-Sensor-Group-Name', 'Second-Collector', 30000),
-                call.create_subscription('Subscription-2', 'Sample-Sensor-Group-Name-2', 'Second-Collector', 30000)
-            ]
+    mdt_instance.read_subscription_states.assert_called_once()
 
-    mdt_instance.assert_has_calls(calls, True)
-    mdt_instance.delete_subscription.assert_not_called()
-    assert call.create_subscription('Subscription-1', 'Sample-Sensor-Group-Name', 'First-Collector', 30000) not in mdt_instance.mock_calls
-    assert call.create_subscription('Subscription-1', 'Sample-Sensor-Group-Name-2', 'First-Collector', 30000) not in mdt_instance.mock_calls
+    update = {'subscriptions': {
+        'Subscription-1': {'sensor-profiles': {'Sample-Sensor-Group-Name': 30000, 'Sample-Sensor-Group-Name-2': 30000}, 'destination-profiles': ['First-Collector']},
+        'Subscription-2': {'sensor-profiles': {'Sample-Sensor-Group-Name': 30000, 'Sample-Sensor-Group-Name-2': 30000}, 'destination-profiles': ['Second-Collector']},
+        'Subscription-3': {'sensor-profiles': {'Sample-Sensor-Group-Name': 30000, 'Sample-Sensor-Group-Name-2': 30000}, 'destination-profiles': ['Third-Collector']}
+    }}
+    delete = []
+    mdt_instance.apply.assert_called_once_with(update, delete)
 
 @pytest.mark.dependency(depends=["test_three_collector_config"])
-def test_check_three_13(mocker):
+def test_check_three_13():
     '''
-        13. Create Subscription-1, Subscription-2, and Subscription-3 and return -1
-        Subscription-1: Doesn't Exist | INACTIVE
-        Subscription-2: Doesn't Exist | INACTIVE
-        Subscription-3: Doesn't Exist | INACTIVE
+        13. Return with 2
+        Subscription-1 : Exists | INACTIVE
+        Subscription-2 : Exists | INACTIVE
+        Subscription-3 : Exists | ACTIVE
     '''
 
-    mdt_mock = mocker.patch('monitor.MDT')
-
     mdt_instance = MagicMock()
-    mdt_instance.__enter__.return_value = mdt_instance
-    mdt_instance.__exit__.return_value = None
-    mdt_instance.read_subscription = Mock(side_effect=[None, None, None])
-    mdt_instance.check_connection = Mock(side_effect=[False, False, False])
-    mdt_mock.return_value = mdt_instance
+    mdt_instance.read_subscription_states = Mock(return_value={'Subscription-1': 'not active', 'Subscription-2': 'not active', 'Subscription-3': 'active'})
     
     config_path = "test_configs/three_collector.yaml"
     with open(os.path.join(os.path.dirname(__file__), config_path), "r") as config_file:
         config = yaml.load(config_file, Loader=yaml.Loader)
 
-    assert monitor.check(config) == -1
-
-    calls = [   
-                call.create_subscription('Subscription-3', 'Sample-Sensor-Group-Name', 'Third-Collector', 30000),
-                call.create_subscription('Subscription-3', 'Sample-Sensor-Group-Name-2', 'Third-Collector', 30000),
-                call.create_subscription('Subscription-2', 'Sample-Sensor-Group-Name', 'Second-Collector', 30000),
-                call.create_subscription('Subscription-2', 'Sample-Sensor-Group-Name-2', 'Second-Collector', 30000),
-                call.create_subscription('Subscription-1', 'Sample-Sensor-Group-Name', 'First-Collector', 30000),
-                call.create_subscription('Subscription-1', 'Sample-Sensor-Group-Name-2', 'First-Collector', 30000)
-            ]
+    assert monitor.check(config, mdt_instance) == 2
 
-    mdt_instance.assert_has_calls(calls, True)
-    mdt_instance.delete_subscription.assert_not_called()
+    mdt_instance.read_subscription_states.assert_called_once()
+    mdt_instance.apply.assert_not_called()
 
 @pytest.mark.dependency(depends=["test_three_collector_config"])
-def test_check_three_14(mocker):
+def test_check_three_14():
     '''
-        14. Return 2
-        Subscription-1: Exists | INACTIVE
-        Subscription-2: Exists | INACTIVE
-        Subscription-3: Exists | ACTIVE
+        14. Create Subscription-1 and Subscription-2 and return with 2
+        Subscription-1 : Doesn't Exist
+        Subscription-2 : Doesn't Exist
+        Subscription-3 : Exists | ACTIVE
     '''
 
-    mdt_mock = mocker.patch('monitor.MDT')
-
     mdt_instance = MagicMock()
-    mdt_instance.__enter__.return_value = mdt_instance
-    mdt_instance.__exit__.return_value = None
-    mdt_instance.read_subscription = Mock(side_effect=["A gNMI Response", "Another gNMI Response", "A third gNMI Response"])
-    mdt_instance.check_connection = Mock(side_effect=[False, False, True])
-    mdt_mock.return_value = mdt_instance
+    mdt_instance.read_subscription_states = Mock(return_value={'Subscription-3': 'active'})
     
     config_path = "test_configs/three_collector.yaml"
     with open(os.path.join(os.path.dirname(__file__), config_path), "r") as config_file:
         config = yaml.load(config_file, Loader=yaml.Loader)
 
-    assert monitor.check(config) == 2
+    assert monitor.check(config, mdt_instance) == 2
 
-    mdt_instance.delete_subscription.assert_not_called()
-    mdt_instance.create_subscription.assert_not_called()
+    mdt_instance.read_subscription_states.assert_called_once()
+
+    update = {'subscriptions': {
+        'Subscription-1': {'sensor-profiles': {'Sample-Sensor-Group-Name': 30000, 'Sample-Sensor-Group-Name-2': 30000}, 'destination-profiles': ['First-Collector']},
+        'Subscription-2': {'sensor-profiles': {'Sample-Sensor-Group-Name': 30000, 'Sample-Sensor-Group-Name-2': 30000}, 'destination-profiles': ['Second-Collector']}
+    }}
+    delete = []
+    mdt_instance.apply.assert_called_once_with(update, delete)
 
 @pytest.mark.dependency(depends=["test_three_collector_config"])
-def test_check_three_15(mocker):
+def test_check_three_15():
     '''
-        15. Create Subscription-3 and return 2
-        Subscription-1: Exists | INACTIVE
-        Subscription-2: Exists | INACTIVE
-        Subscription-3: Doesn't Exist | ACTIVE
+        15. Create Subscription-1 and return with 2
+        Subscription-1 : Doesn't Exist
+        Subscription-2 : Exists | INACTIVE
+        Subscription-3 : Exists | ACTIVE
     '''
 
-    mdt_mock = mocker.patch('monitor.MDT')
-
     mdt_instance = MagicMock()
-    mdt_instance.__enter__.return_value = mdt_instance
-    mdt_instance.__exit__.return_value = None
-    mdt_instance.read_subscription = Mock(side_effect=["A gNMI Response", "Another gNMI Response", None])
-    mdt_instance.check_connection = Mock(side_effect=[False, False, True])
-    mdt_mock.return_value = mdt_instance
+    mdt_instance.read_subscription_states = Mock(return_value={'Subscription-2': 'not active', 'Subscription-3': 'active'})
     
     config_path = "test_configs/three_collector.yaml"
     with open(os.path.join(os.path.dirname(__file__), config_path), "r") as config_file:
         config = yaml.load(config_file, Loader=yaml.Loader)
 
-    assert monitor.check(config) == 2
+    assert monitor.check(config, mdt_instance) == 2
 
-    calls = [   
-                call.create_subscription('Subscription-3', 'Sample-Sensor-Group-Name', 'Third-Collector', 30000),
-                call.create_subscription('Subscription-3', 'Sample-Sensor-Group-Name-2', 'Third-Collector', 30000)
-            ]
+    mdt_instance.read_subscription_states.assert_called_once()
 
-    mdt_instance.assert_has_calls(calls, True)
-    mdt_instance.delete_subscription.assert_not_called()
-    assert call.create_subscription('Subscription-2', 'Sample-Sensor-Group-Name', 'Second-Collector', 30000) not in mdt_instance.mock_calls
-    assert call.create_subscription('Subscription-2', 'Sample-Sensor-Group-Name-2', 'Second-Collector', 30000) not in mdt_instance.mock_calls
-    assert call.create_subscription('Subscription-1', 'Sample-Sensor-Group-Name', 'First-Collector', 30000) not in mdt_instance.mock_calls
-    assert call.create_subscription('Subscription-1', 'Sample-Sensor-Group-Name-2', 'First-Collector', 30000) not in mdt_instance.mock_calls
+    update = {'subscriptions': {
+        'Subscription-1': {'sensor-profiles': {'Sample-Sensor-Group-Name': 30000, 'Sample-Sensor-Group-Name-2': 30000}, 'destination-profiles': ['First-Collector']}
+    }}
+    delete = []
+    mdt_instance.apply.assert_called_once_with(update, delete)
 
 @pytest.mark.dependency(depends=["test_three_collector_config"])
-def test_check_three_16(mocker):
+def test_check_three_16():
     '''
-        16. Create Subscription-2 and Subscription-3 and return 2
-        Subscription-1: Exists | INACTIVE
-        Subscription-2: Doesn't Exist | INACTIVE
-        Subscription-3: Doesn't Exist | ACTIVE
+        16. Delete Subscription-3 and return with 1
+        Subscription-1 : Exists | INACTIVE
+        Subscription-2 : Exists | ACTIVE
+        Subscription-3 : Exists | INACTIVE
     '''
 
-    mdt_mock = mocker.patch('monitor.MDT')
-
     mdt_instance = MagicMock()
-    mdt_instance.__enter__.return_value = mdt_instance
-    mdt_instance.__exit__.return_value = None
-    mdt_instance.read_subscription = Mock(side_effect=["A gNMI Response", None, None])
-    mdt_instance.check_connection = Mock(side_effect=[False, False, True])
-    mdt_mock.return_value = mdt_instance
+    mdt_instance.read_subscription_states = Mock(return_value={'Subscription-1': 'not active', 'Subscription-2': 'active', 'Subscription-3': 'not active'})
     
     config_path = "test_configs/three_collector.yaml"
     with open(os.path.join(os.path.dirname(__file__), config_path), "r") as config_file:
         config = yaml.load(config_file, Loader=yaml.Loader)
 
-    assert monitor.check(config) == 2
+    assert monitor.check(config, mdt_instance) == 1
 
-    calls = [   
-                call.create_subscription('Subscription-3', 'Sample-Sensor-Group-Name', 'Third-Collector', 30000),
-                call.create_subscription('Subscription-3', 'Sample-Sensor-Group-Name-2', 'Third-Collector', 30000),
-                call.create_subscription('Subscription-2', 'Sample-Sensor-Group-Name', 'Second-Collector', 30000),
-                call.create_subscription('Subscription-2', 'Sample-Sensor-Group-Name-2', 'Second-Collector', 30000)
-            ]
+    mdt_instance.read_subscription_states.assert_called_once()
 
-    mdt_instance.assert_has_calls(calls, True)
-    mdt_instance.delete_subscription.assert_not_called()
-    assert call.create_subscription('Subscription-1', 'Sample-Sensor-Group-Name', 'First-Collector', 30000) not in mdt_instance.mock_calls
-    assert call.create_subscription('Subscription-1', 'Sample-Sensor-Group-Name-2', 'First-Collector', 30000) not in mdt_instance.mock_calls
+    update = {}
+    delete = [('subscription', 'Subscription-3')]
+    mdt_instance.apply.assert_called_once_with(update, delete)
 
 @pytest.mark.dependency(depends=["test_three_collector_config"])
-def test_check_three_17(mocker):
+def test_check_three_17():
     '''
-        17. Create Subscription-1, Subscription-2, and Subscription-3 and return 2
-        Subscription-1: Doesn't Exist | INACTIVE
-        Subscription-2: Doesn't Exist | INACTIVE
-        Subscription-3: Doesn't Exist | ACTIVE
+        17. Delete Subscription-3 and return with 1
+        Subscription-1 : Exists | INACTIVE
+        Subscription-2 : Exists | ACTIVE
+        Subscription-3 : Exists | ACTIVE
     '''
 
-    mdt_mock = mocker.patch('monitor.MDT')
-
     mdt_instance = MagicMock()
-    mdt_instance.__enter__.return_value = mdt_instance
-    mdt_instance.__exit__.return_value = None
-    mdt_instance.read_subscription = Mock(side_effect=[None, None, None])
-    mdt_instance.check_connection = Mock(side_effect=[False, False, True])
-    mdt_mock.return_value = mdt_instance
+    mdt_instance.read_subscription_states = Mock(return_value={'Subscription-1': 'not active', 'Subscription-2': 'active', 'Subscription-3': 'active'})
     
     config_path = "test_configs/three_collector.yaml"
     with open(os.path.join(os.path.dirname(__file__), config_path), "r") as config_file:
         config = yaml.load(config_file, Loader=yaml.Loader)
 
-    assert monitor.check(config) == 2
+    assert monitor.check(config, mdt_instance) == 1
 
-    calls = [   
-                call.create_subscription('Subscription-3', 'Sample-Sensor-Group-Name', 'Third-Collector', 30000),
-                call.create_subscription('Subscription-3', 'Sample-Sensor-Group-Name-2', 'Third-Collector', 30000),
-                call.create_subscription('Subscription-2', 'Sample-Sensor-Group-Name', 'Second-Collector', 30000),
-                call.create_subscription('Subscription-2', 'Sample-Sensor-Group-Name-2', 'Second-Collector', 30000),
-                call.create_subscription('Subscription-1', 'Sample-Sensor-Group-Name', 'First-Collector', 30000),
-                call.create_subscription('Subscription-1', 'Sample-Sensor-Group-Name-2', 'First-Collector', 30000)
-            ]
+    mdt_instance.read_subscription_states.assert_called_once()
 
-    mdt_instance.assert_has_calls(calls, True)
-    mdt_instance.delete_subscription.assert_not_called()
+    update = {}
+    delete = [('subscription', 'Subscription-3')]
+    mdt_instance.apply.assert_called_once_with(update, delete)
 
 @pytest.mark.dependency(depends=["test_three_collector_config"])
-def test_check_three_18(mocker):
+def test_check_three_18():
     '''
-        18. Delete Subscription-3 and return 1
-        Subscription-1: Exists | INACTIVE
-        Subscription-2: Exists | ACTIVE
-        Subscription-3: Exists | ACTIVE/INACTIVE
+        18. Return with 1
+        Subscription-1 : Exists | INACTIVE
+        Subscription-2 : Exists | ACTIVE
+        Subscription-3 : Doesn't Exist
     '''
 
-    mdt_mock = mocker.patch('monitor.MDT')
-
     mdt_instance = MagicMock()
-    mdt_instance.__enter__.return_value = mdt_instance
-    mdt_instance.__exit__.return_value = None
-    mdt_instance.read_subscription = Mock(side_effect=["A gNMI Response", "Another gNMI Response", "A third gNMI Response"])
-    mdt_instance.check_connection = Mock(side_effect=[False, True, '?'])
-    mdt_mock.return_value = mdt_instance
+    mdt_instance.read_subscription_states = Mock(return_value={'Subscription-1': 'not active', 'Subscription-2': 'active'})
     
     config_path = "test_configs/three_collector.yaml"
     with open(os.path.join(os.path.dirname(__file__), config_path), "r") as config_file:
         config = yaml.load(config_file, Loader=yaml.Loader)
 
-    assert monitor.check(config) == 1
+    assert monitor.check(config, mdt_instance) == 1
 
-    calls = [
-                call.delete_subscription('Subscription-3')
-            ]
-
-    mdt_instance.assert_has_calls(calls, True)
-    mdt_instance.create_subscription.assert_not_called()
-    assert call.delete_subscription('Subscription-1') not in mdt_instance.mock_calls
-    assert call.delete_subscription('Subscription-2') not in mdt_instance.mock_calls
+    mdt_instance.read_subscription_states.assert_called_once()
+    mdt_instance.apply.assert_not_called()
 
 @pytest.mark.dependency(depends=["test_three_collector_config"])
-def test_check_three_19(mocker):
+def test_check_three_19():
     '''
-        19. Return 1
-        Subscription-1: Exists | INACTIVE
-        Subscription-2: Exists | ACTIVE
-        Subscription-3: Doesn't Exist | ACTIVE/INACTIVE
+        19. Create Subscription-1 and return with 1
+        Subscription-1 : Doesn't Exist
+        Subscription-2 : Exists | ACTIVE
+        Subscription-3 : Doesn't Exist
     '''
 
-    mdt_mock = mocker.patch('monitor.MDT')
-
     mdt_instance = MagicMock()
-    mdt_instance.__enter__.return_value = mdt_instance
-    mdt_instance.__exit__.return_value = None
-    mdt_instance.read_subscription = Mock(side_effect=["A gNMI Response", "Another gNMI Response", None])
-    mdt_instance.check_connection = Mock(side_effect=[False, True, '?'])
-    mdt_mock.return_value = mdt_instance
+    mdt_instance.read_subscription_states = Mock(return_value={'Subscription-2': 'active'})
     
     config_path = "test_configs/three_collector.yaml"
     with open(os.path.join(os.path.dirname(__file__), config_path), "r") as config_file:
         config = yaml.load(config_file, Loader=yaml.Loader)
 
-    assert monitor.check(config) == 1
+    assert monitor.check(config, mdt_instance) == 1
 
-    mdt_instance.delete_subscription.assert_not_called()
-    mdt_instance.create_subscription.assert_not_called()
+    mdt_instance.read_subscription_states.assert_called_once()
+
+    update = {'subscriptions': {
+        'Subscription-1': {'sensor-profiles': {'Sample-Sensor-Group-Name': 30000, 'Sample-Sensor-Group-Name-2': 30000}, 'destination-profiles': ['First-Collector']}
+    }}
+    delete = []
+    mdt_instance.apply.assert_called_once_with(update, delete)
 
 @pytest.mark.dependency(depends=["test_three_collector_config"])
-def test_check_three_20(mocker):
+def test_check_three_20():
     '''
-        20. Create Subscription-2 and return 1
-        Subscription-1: Exists | INACTIVE
-        Subscription-2: Doesn't Exist | ACTIVE
-        Subscription-3: Doesn't Exist | ACTIVE/INACTIVE
+        20. Delete Subscription-2 and Subscription-3 and return with 0
+        Subscription-1 : Exists | ACTIVE
+        Subscription-2 : Exists | INACTIVE
+        Subscription-3 : Exists | INACTIVE
     '''
 
-    mdt_mock = mocker.patch('monitor.MDT')
-
     mdt_instance = MagicMock()
-    mdt_instance.__enter__.return_value = mdt_instance
-    mdt_instance.__exit__.return_value = None
-    mdt_instance.read_subscription = Mock(side_effect=["A gNMI Response", None, None])
-    mdt_instance.check_connection = Mock(side_effect=[False, True, '?'])
-    mdt_mock.return_value = mdt_instance
+    mdt_instance.read_subscription_states = Mock(return_value={'Subscription-1': 'active', 'Subscription-2': 'not active', 'Subscription-3': 'not active'})
     
     config_path = "test_configs/three_collector.yaml"
     with open(os.path.join(os.path.dirname(__file__), config_path), "r") as config_file:
         config = yaml.load(config_file, Loader=yaml.Loader)
 
-    assert monitor.check(config) == 1
+    assert monitor.check(config, mdt_instance) == 0
 
-    calls = [   
-                call.create_subscription('Subscription-2', 'Sample-Sensor-Group-Name', 'Second-Collector', 30000),
-                call.create_subscription('Subscription-2', 'Sample-Sensor-Group-Name-2', 'Second-Collector', 30000)
-            ]
+    mdt_instance.read_subscription_states.assert_called_once()
 
-    mdt_instance.assert_has_calls(calls, True)
-    mdt_instance.delete_subscription.assert_not_called()
-    assert call.create_subscription('Subscription-1', 'Sample-Sensor-Group-Name', 'First-Collector', 30000) not in mdt_instance.mock_calls
-    assert call.create_subscription('Subscription-1', 'Sample-Sensor-Group-Name-2', 'First-Collector', 30000) not in mdt_instance.mock_calls
-    assert call.create_subscription('Subscription-3', 'Sample-Sensor-Group-Name', 'Third-Collector', 30000) not in mdt_instance.mock_calls
-    assert call.create_subscription('Subscription-3', 'Sample-Sensor-Group-Name-2', 'Third-Collector', 30000) not in mdt_instance.mock_calls
+    update = {}
+    delete = [('subscription', 'Subscription-2'), ('subscription', 'Subscription-3')]
+    mdt_instance.apply.assert_called_once_with(update, delete)
 
 @pytest.mark.dependency(depends=["test_three_collector_config"])
-def test_check_three_21(mocker):
+def test_check_three_21():
     '''
-        21. Create Subscription-1 and Subscription-2 and return 1
-        Subscription-1: Doesn't Exist | INACTIVE
-        Subscription-2: Doesn't Exist | ACTIVE
-        Subscription-3: Doesn't Exist | ACTIVE/INACTIVE
+        21. Delete Subscription-2 and return with 0
+        Subscription-1 : Exists | ACTIVE
+        Subscription-2 : Exists | INACTIVE
+        Subscription-3 : Doesn't Exist
     '''
 
-    mdt_mock = mocker.patch('monitor.MDT')
-
     mdt_instance = MagicMock()
-    mdt_instance.__enter__.return_value = mdt_instance
-    mdt_instance.__exit__.return_value = None
-    mdt_instance.read_subscription = Mock(side_effect=[None, None, None])
-    mdt_instance.check_connection = Mock(side_effect=[False, True, '?'])
-    mdt_mock.return_value = mdt_instance
+    mdt_instance.read_subscription_states = Mock(return_value={'Subscription-1': 'active', 'Subscription-2': 'not active'})
     
     config_path = "test_configs/three_collector.yaml"
     with open(os.path.join(os.path.dirname(__file__), config_path), "r") as config_file:
         config = yaml.load(config_file, Loader=yaml.Loader)
 
-    assert monitor.check(config) == 1
+    assert monitor.check(config, mdt_instance) == 0
 
-    calls = [   
-                call.create_subscription('Subscription-1', 'Sample-Sensor-Group-Name', 'First-Collector', 30000),
-                call.create_subscription('Subscription-1', 'Sample-Sensor-Group-Name-2', 'First-Collector', 30000),
-                call.create_subscription('Subscription-2', 'Sample-Sensor-Group-Name', 'Second-Collector', 30000),
-                call.create_subscription('Subscription-2', 'Sample-Sensor-Group-Name-2', 'Second-Collector', 30000)
-            ]
+    mdt_instance.read_subscription_states.assert_called_once()
 
-    mdt_instance.assert_has_calls(calls, True)
-    mdt_instance.delete_subscription.assert_not_called()
-    assert call.create_subscription('Subscription-3', 'Sample-Sensor-Group-Name', 'Third-Collector', 30000) not in mdt_instance.mock_calls
-    assert call.create_subscription('Subscription-3', 'Sample-Sensor-Group-Name-2', 'Third-Collector', 30000) not in mdt_instance.mock_calls
+    update = {}
+    delete = [('subscription', 'Subscription-2')]
+    mdt_instance.apply.assert_called_once_with(update, delete)
 
 @pytest.mark.dependency(depends=["test_three_collector_config"])
-def test_check_three_22(mocker):
+def test_check_three_22():
     '''
-        22. Delete Subscription-2 and Subscription-3 and return 0
-        Subscription-1: Exists | ACTIVE
-        Subscription-2: Exists | ACTIVE/INACTIVE
-        Subscription-3: Exists | ACTIVE/INACTIVE
+        22. Return with 0
+        Subscription-1 : Exists | ACTIVE
+        Subscription-2 : Doesn't Exist
+        Subscription-3 : Doesn't Exist
     '''
 
-    mdt_mock = mocker.patch('monitor.MDT')
-
     mdt_instance = MagicMock()
-    mdt_instance.__enter__.return_value = mdt_instance
-    mdt_instance.__exit__.return_value = None
-    mdt_instance.read_subscription = Mock(side_effect=["A gNMI Response", "Another gNMI Response", "A third gNMI Response"])
-    mdt_instance.check_connection = Mock(side_effect=[True, '?', '?'])
-    mdt_mock.return_value = mdt_instance
+    mdt_instance.read_subscription_states = Mock(return_value={'Subscription-1': 'active'})
     
     config_path = "test_configs/three_collector.yaml"
     with open(os.path.join(os.path.dirname(__file__), config_path), "r") as config_file:
         config = yaml.load(config_file, Loader=yaml.Loader)
 
-    assert monitor.check(config) == 0
+    assert monitor.check(config, mdt_instance) == 0
 
-    calls = [
-                call.delete_subscription('Subscription-2'),
-                call.delete_subscription('Subscription-3')
-            ]
-
-    mdt_instance.assert_has_calls(calls, True)
-    mdt_instance.create_subscription.assert_not_called()
-    assert call.delete_subscription('Subscription-1') not in mdt_instance.mock_calls
+    mdt_instance.read_subscription_states.assert_called_once()
+    mdt_instance.apply.assert_not_called()
 
 @pytest.mark.dependency(depends=["test_three_collector_config"])
-def test_check_three_23(mocker):
+def test_check_three_23():
     '''
-        23. Delete Subscription-2 and return 0
-        Subscription-1: Exists | ACTIVE
-        Subscription-2: Exists | ACTIVE/INACTIVE
-        Subscription-3: Doesn't Exist | ACTIVE/INACTIVE
+        23. Delete Subscription-2 and Subscription-3 and return with 0
+        Subscription-1 : Exists | ACTIVE
+        Subscription-2 : Exists | ACTIVE
+        Subscription-3 : Exists | ACTIVE
     '''
 
-    mdt_mock = mocker.patch('monitor.MDT')
-
     mdt_instance = MagicMock()
-    mdt_instance.__enter__.return_value = mdt_instance
-    mdt_instance.__exit__.return_value = None
-    mdt_instance.read_subscription = Mock(side_effect=["A gNMI Response", "Another gNMI Response", None])
-    mdt_instance.check_connection = Mock(side_effect=[True, '?', '?'])
-    mdt_mock.return_value = mdt_instance
+    mdt_instance.read_subscription_states = Mock(return_value={'Subscription-1': 'active', 'Subscription-2': 'active', 'Subscription-3': 'active'})
     
     config_path = "test_configs/three_collector.yaml"
     with open(os.path.join(os.path.dirname(__file__), config_path), "r") as config_file:
         config = yaml.load(config_file, Loader=yaml.Loader)
 
-    assert monitor.check(config) == 0
+    assert monitor.check(config, mdt_instance) == 0
 
-    calls = [
-                call.delete_subscription('Subscription-2')
-            ]
+    mdt_instance.read_subscription_states.assert_called_once()
 
-    mdt_instance.assert_has_calls(calls, True)
-    mdt_instance.create_subscription.assert_not_called()
-    assert call.delete_subscription('Subscription-1') not in mdt_instance.mock_calls
-    assert call.delete_subscription('Subscription-3') not in mdt_instance.mock_calls
+    update = {}
+    delete = [('subscription', 'Subscription-2'), ('subscription', 'Subscription-3')]
+    mdt_instance.apply.assert_called_once_with(update, delete)
 
-@pytest.mark.dependency(depends=["test_three_collector_config"])
-def test_check_three_24(mocker):
+###############################################
+
+############### STREAMED STATES ###############
+
+@pytest.mark.dependency(depends=["test_two_collector_config"])
+def test_check_streamed_states():
     '''
-        24. Return 0
-        Subscription-1: Exists | ACTIVE
-        Subscription-2: Doesn't Exist | ACTIVE/INACTIVE
-        Subscription-3: Doesn't Exist | ACTIVE/INACTIVE
+        Streamed subscription states replace the oper Get
     '''
 
-    mdt_mock = mocker.patch('monitor.MDT')
+    mdt_instance = MagicMock()
+
+    config_path = "test_configs/two_collector.yaml"
+    with open(os.path.join(os.path.dirname(__file__), config_path), "r") as config_file:
+        config = yaml.load(config_file, Loader=yaml.Loader)
+
+    assert monitor.check(config, mdt_instance, {"Subscription-1": "not active", "Subscription-2": "active"}) == 1
+
+    mdt_instance.read_subscription_states.assert_not_called()
+    mdt_instance.apply.assert_not_called()
+
+@pytest.mark.dependency(depends=["test_two_collector_config"])
+def test_check_streamed_states_missing():
+    '''
+        Subscriptions missing from the stream are not configured and get created
+    '''
 
     mdt_instance = MagicMock()
-    mdt_instance.__enter__.return_value = mdt_instance
-    mdt_instance.__exit__.return_value = None
-    mdt_instance.read_subscription = Mock(side_effect=["A gNMI Response", None, None])
-    mdt_instance.check_connection = Mock(side_effect=[True, '?', '?'])
-    mdt_mock.return_value = mdt_instance
-    
-    config_path = "test_configs/three_collector.yaml"
+
+    config_path = "test_configs/two_collector.yaml"
     with open(os.path.join(os.path.dirname(__file__), config_path), "r") as config_file:
         config = yaml.load(config_file, Loader=yaml.Loader)
 
-    assert monitor.check(config) == 0
+    assert monitor.check(config, mdt_instance, {"Subscription-1": "not active"}) == -1
 
-    mdt_instance.create_subscription.assert_not_called()
-    mdt_instance.delete_subscription.assert_not_called()
+    update = {'subscriptions': {
+        'Subscription-2': {'sensor-profiles': {'Sample-Sensor-Group-Name': 30000, 'Sample-Sensor-Group-Name-2': 30000}, 'destination-profiles': ['Second-Collector']}
+    }}
+    mdt_instance.apply.assert_called_once_with(update, [])
+    mdt_instance.read_subscription_states.assert_not_called()
 
-@pytest.mark.dependency(depends=["test_three_collector_config"])
-def test_check_three_25(mocker):
+###############################################
+
+################ ROUTER MONITOR ###############
+
+@pytest.mark.dependency(depends=["test_fleet_config"])
+def test_router_monitor_unreachable(mocker):
     '''
-        25. Create Subscription-1 and return 0
-        Subscription-1: Doesn't Exist | ACTIVE
-        Subscription-2: Doesn't Exist | ACTIVE/INACTIVE
-        Subscription-3: Doesn't Exist | ACTIVE/INACTIVE
+        A router that cannot be reached is retried with exponential backoff and never set up
     '''
 
-    mdt_mock = mocker.patch('monitor.MDT')
+    config_path = "test_configs/fleet.yaml"
+    with open(os.path.join(os.path.dirname(__file__), config_path), "r") as config_file:
+        config = yaml.load(config_file, Loader=yaml.Loader)
+
+    config["monitor"] = {"schedule": {"jitter": 0}}
+
+    router_monitor = monitor.RouterMonitor(monitor.routers(config)[1], Mock())
+    mocker.patch.object(router_monitor.session, "client", side_effect=monitor.FutureTimeoutError())
+    reset = mocker.patch.object(router_monitor.session, "reset")
+
+    assert router_monitor.session._path_cert == "/config/pe-2.pem"
+    assert [router_monitor.step() for _ in range(3)] == [10, 20, 40]
+    assert router_monitor.ready == False
+    assert reset.call_count == 3
+
+@pytest.mark.dependency(depends=["test_fleet_config"])
+def test_router_monitor_step(mocker):
+    '''
+        The first step sets the router up, then checks are paced by the schedule, faster while a backup is active
+    '''
+
+    config_path = "test_configs/fleet.yaml"
+    with open(os.path.join(os.path.dirname(__file__), config_path), "r") as config_file:
+        config = yaml.load(config_file, Loader=yaml.Loader)
+    config["monitor"] = {"schedule": {"interval": 20, "degraded-interval": 1, "jitter": 0}}
 
     mdt_instance = MagicMock()
-    mdt_instance.__enter__.return_value = mdt_instance
-    mdt_instance.__exit__.return_value = None
-    mdt_instance.read_subscription = Mock(side_effect=[None, None, None])
-    mdt_instance.check_connection = Mock(side_effect=[True, '?', '?'])
-    mdt_mock.return_value = mdt_instance
-    
-    config_path = "test_configs/three_collector.yaml"
+    mdt_instance.read_subscription_states.side_effect = [{"Subscription-1": "active"}, {"Subscription-1": "active"}, {"Subscription-1": "not active", "Subscription-2": "active"}]
+    setup = mocker.patch("monitor.setup")
+
+    router_monitor = monitor.RouterMonitor(monitor.routers(config)[0], Mock())
+    mocker.patch.object(router_monitor.session, "client", return_value=mdt_instance)
+
+    assert router_monitor.step() == 20
+    assert router_monitor.step() == 20
+    assert router_monitor.step() == 1
+    setup.assert_called_once()
+    assert setup.call_args.args[:2] == (router_monitor.config, mdt_instance)
+    assert router_monitor.collector == 1
+
+def test_router_monitor_checkpoint_unwritable(mocker):
+    '''
+        A checkpoint that cannot be saved is logged without failing the check or resetting the session
+    '''
+
+    config_path = "test_configs/fleet.yaml"
     with open(os.path.join(os.path.dirname(__file__), config_path), "r") as config_file:
         config = yaml.load(config_file, Loader=yaml.Loader)
+    config["monitor"] = {"schedule": {"interval": 20, "degraded-interval": 1, "jitter": 0}}
 
-    assert monitor.check(config) == 0
+    mdt_instance = MagicMock()
+    mdt_instance.read_subscription_states.return_value = {"Subscription-1": "active"}
+    mocker.patch("monitor.setup")
+    state = MagicMock()
+    state.get.return_value = None
+    state.save.side_effect = PermissionError("Read-only file system")
+
+    router_monitor = monitor.RouterMonitor(monitor.routers(config)[0], Mock(), state)
+    mocker.patch.object(router_monitor.session, "client", return_value=mdt_instance)
+    reset = mocker.patch.object(router_monitor.session, "reset")
+
+    assert router_monitor.step() == 20
+    assert router_monitor.step() == 20
+    assert router_monitor.collector == 0
+    assert state.save.call_count == 2
+    reset.assert_not_called()
+
+@pytest.mark.dependency(depends=["test_two_collector_config"])
+def test_check_replaces_changed_subscription():
+    '''
+        A subscription that gains and loses sensor profiles is replaced as a whole in the same Set
+    '''
+
+    config_path = "test_configs/two_collector.yaml"
+    with open(os.path.join(os.path.dirname(__file__), config_path), "r") as config_file:
+        config = yaml.load(config_file, Loader=yaml.Loader)
+
+    running = running_config(config, ['Subscription-1'])
+    running["notification"][0]["update"][0]["val"]["subscriptions"]["subscription"][0]["sensor-profiles"]["sensor-profile"][1]["sensorgroupid"] = "Old-Group"
+
+    mdt_instance = MagicMock()
+    mdt_instance.get_config = Mock(return_value=running)
+    mdt_instance.apply.return_value = {"response": []}
+    cached = monitor.cache.RunningConfig()
+
+    assert monitor.check(config, mdt_instance, {"Subscription-1": "active"}, running_config=cached) == 0
+
+    replace = {'subscriptions': {
+        'Subscription-1': {'sensor-profiles': {'Sample-Sensor-Group-Name': 30000, 'Sample-Sensor-Group-Name-2': 30000}, 'destination-profiles': ['First-Collector']}
+    }}
+    mdt_instance.apply.assert_called_once_with({}, [], replace)
+    assert cached.subscriptions() == {"Subscription-1"}
+    assert cached.read(mdt_instance)["subscriptions"]["Subscription-1"]["sensor-profiles"] == {'Sample-Sensor-Group-Name': 30000, 'Sample-Sensor-Group-Name-2': 30000}
+
+@pytest.mark.dependency(depends=["test_two_collector_config"])
+def test_check_warm_standby_failed_set():
+    '''
+        A warm standby whose arming Set failed reads the router again and retries instead of assuming it armed
+    '''
+
+    config_path = "test_configs/two_collector.yaml"
+    with open(os.path.join(os.path.dirname(__file__), config_path), "r") as config_file:
+        config = yaml.load(config_file, Loader=yaml.Loader)
+
+    standby = monitor.handover.WarmStandby()
+    standby.armed = {"Subscription-1": {"First-Collector": None}}
+
+    mdt_instance = MagicMock()
+    mdt_instance.apply.return_value = Exception("DEADLINE_EXCEEDED")
+    states = {"Subscription-1": "not active", "Subscription-2": "not active"}
+    assert monitor.check(config, mdt_instance, states, standby=standby) == -1
+    assert standby.armed == None
+
+    running = running_config(config, ['Subscription-1', 'Subscription-2'])
+    running["notification"][0]["update"][0]["val"]["subscriptions"]["subscription"][1].pop("destination-profiles")
+    mdt_instance.get_config = Mock(return_value=running)
+    mdt_instance.apply.reset_mock()
+    mdt_instance.apply.return_value = {"response": []}
+    monitor.check(config, mdt_instance, states, standby=standby)
+
+    update, delete = mdt_instance.apply.call_args.args
+    assert update["subscriptions"]["Subscription-2"]["destination-profiles"] == ["Second-Collector"]
+    assert standby.armed["Subscription-2"] == {"Second-Collector": None}
+
+################### PROBING ###################
+
+@pytest.mark.dependency(depends=["test_two_collector_config"])
+def test_check_probe_unreachable():
+    '''
+        An active collector the prober cannot reach is failed over before the router notices
+    '''
+
+    mdt_instance = MagicMock()
+
+    config_path = "test_configs/two_collector.yaml"
+    with open(os.path.join(os.path.dirname(__file__), config_path), "r") as config_file:
+        config = yaml.load(config_file, Loader=yaml.Loader)
+
+    reachable = {"First-Collector": False, "Second-Collector": True}
+    assert monitor.check(config, mdt_instance, {"Subscription-1": "active"}, reachable) == -1
+
+    update = {'subscriptions': {
+        'Subscription-2': {'sensor-profiles': {'Sample-Sensor-Group-Name': 30000, 'Sample-Sensor-Group-Name-2': 30000}, 'destination-profiles': ['Second-Collector']}
+    }}
+    mdt_instance.apply.assert_called_once_with(update, [])
+
+@pytest.mark.dependency(depends=["test_two_collector_config"])
+def test_check_probe_not_promoted():
+    '''
+        A reachable collector is only used once the router reports its subscription active
+    '''
+
+    mdt_instance = MagicMock()
+
+    config_path = "test_configs/two_collector.yaml"
+    with open(os.path.join(os.path.dirname(__file__), config_path), "r") as config_file:
+        config = yaml.load(config_file, Loader=yaml.Loader)
+
+    reachable = {"First-Collector": True, "Second-Collector": True}
+    assert monitor.check(config, mdt_instance, {"Subscription-1": "not active", "Subscription-2": "active"}, reachable) == 1
+    mdt_instance.apply.assert_not_called()
+
+@pytest.mark.dependency(depends=["test_two_collector_config"])
+def test_check_probe_timed_out():
+    '''
+        A probe that timed out leaves the router's view of the collector alone
+    '''
+
+    mdt_instance = MagicMock()
+
+    config_path = "test_configs/two_collector.yaml"
+    with open(os.path.join(os.path.dirname(__file__), config_path), "r") as config_file:
+        config = yaml.load(config_file, Loader=yaml.Loader)
+
+    reachable = {"First-Collector": None, "Second-Collector": True}
+    assert monitor.check(config, mdt_instance, {"Subscription-1": "active"}, reachable) == 0
+    mdt_instance.apply.assert_not_called()
+
+@pytest.mark.dependency(depends=["test_sensor_intervals_config"])
+def test_check_sensor_intervals():
+    '''
+        Subscriptions carry the interval of each sensor group, and only the sensor groups their collector streams
+    '''
+
+    mdt_instance = MagicMock()
+
+    config_path = "test_configs/sensor_intervals.yaml"
+    with open(os.path.join(os.path.dirname(__file__), config_path), "r") as config_file:
+        config = yaml.load(config_file, Loader=yaml.Loader)
+
+    assert monitor.check(config, mdt_instance, {}) == -1
+
+    update = {'subscriptions': {
+        'Subscription-1': {'sensor-profiles': {'Interfaces': 10000, 'Memory': 300000}, 'destination-profiles': ['First-Collector']},
+        'Subscription-2': {'sensor-profiles': {'Interfaces': 60000}, 'destination-profiles': ['Second-Collector']}
+    }}
+    mdt_instance.apply.assert_called_once_with(update, [])
+
+@pytest.mark.dependency(depends=["test_two_collector_config"])
+def test_check_damping_holds_backup():
+    '''
+        With damping, a recovered primary does not make check() delete the backup subscription until it is stable
+    '''
+
+    mdt_instance = MagicMock()
+
+    config_path = "test_configs/two_collector.yaml"
+    with open(os.path.join(os.path.dirname(__file__), config_path), "r") as config_file:
+        config = yaml.load(config_file, Loader=yaml.Loader)
+
+    now = [0]
+    dampening = monitor.damping.Damping(["First-Collector", "Second-Collector"], hold_down=0, min_up=60, clock=lambda: now[0])
+
+    assert monitor.check(config, mdt_instance, {"Subscription-1": "not active", "Subscription-2": "active"}, None, dampening) == 1
+    assert monitor.check(config, mdt_instance, {"Subscription-1": "active", "Subscription-2": "active"}, None, dampening) == 1
+    mdt_instance.apply.assert_not_called()
+
+    now[0] = 60
+    assert monitor.check(config, mdt_instance, {"Subscription-1": "active", "Subscription-2": "active"}, None, dampening) == 0
+    mdt_instance.apply.assert_called_once_with({}, [("subscription", "Subscription-2")])
+
+@pytest.mark.dependency(depends=["test_two_collector_config"])
+def test_check_make_before_break():
+    '''
+        Failing back keeps the backup subscription until the primary has streamed for the overlap
+    '''
+
+    mdt_instance = MagicMock()
+
+    config_path = "test_configs/two_collector.yaml"
+    with open(os.path.join(os.path.dirname(__file__), config_path), "r") as config_file:
+        config = yaml.load(config_file, Loader=yaml.Loader)
+
+    now = [0]
+    overlap = monitor.handover.MakeBeforeBreak(30, clock=lambda: now[0])
+
+    assert monitor.check(config, mdt_instance, {"Subscription-1": "not active", "Subscription-2": "active"}, overlap=overlap) == 1
+    assert monitor.check(config, mdt_instance, {"Subscription-1": "active", "Subscription-2": "active"}, overlap=overlap) == 0
+    mdt_instance.apply.assert_not_called()
+
+    now[0] = 30
+    assert monitor.check(config, mdt_instance, {"Subscription-1": "active", "Subscription-2": "active"}, overlap=overlap) == 0
+    mdt_instance.apply.assert_called_once_with({}, [("subscription", "Subscription-2")])
+
+@pytest.mark.dependency(depends=["test_fleet_config"])
+def test_router_monitor_metrics(mocker):
+    '''
+        Steps record the active collector and count changes of it as failovers
+    '''
+
+    config_path = "test_configs/fleet.yaml"
+    with open(os.path.join(os.path.dirname(__file__), config_path), "r") as config_file:
+        config = yaml.load(config_file, Loader=yaml.Loader)
+    config["routers"][0]["name"] = "Metrics-PE"
+
+    mdt_instance = MagicMock()
+    mdt_instance.read_subscription_states.side_effect = [{"Subscription-1": "active"}, {"Subscription-1": "not active", "Subscription-2": "active"}]
+    mocker.patch("monitor.setup")
 
-    calls = [
-                call.create_subscription('Subscription-1', 'Sample-Sensor-Group-Name', 'First-Collector', 30000),
-                call.create_subscription('Subscription-1', 'Sample-Sensor-Group-Name-2', 'First-Collector', 30000)
-            ]
+    router_monitor = monitor.RouterMonitor(monitor.routers(config)[0], Mock())
+    mocker.patch.object(router_monitor.session, "client", return_value=mdt_instance)
 
-    mdt_instance.assert_has_calls(calls, True)
-    mdt_instance.delete_subscription.assert_not_called()
-    assert call.create_subscription('Subscription-2', 'Sample-Sensor-Group-Name', 'Second-Collector', 30000) not in mdt_instance.mock_calls
-    assert call.create_subscription('Subscription-2', 'Sample-Sensor-Group-Name-2', 'Second-Collector', 30000) not in mdt_instance.mock_calls
-    assert call.create_subscription('Subscription-3', 'Sample-Sensor-Group-Name', 'Third-Collector', 30000) not in mdt_instance.mock_calls
-    assert call.create_subscription('Subscription-3', 'Sample-Sensor-Group-Name-2', 'Third-Collector', 30000) not in mdt_instance.mock_calls
+    router_monitor.step()
+    assert monitor.metrics.ACTIVE_COLLECTOR.value(router="Metrics-PE") == 0
+    assert monitor.metrics.FAILOVERS.value(router="Metrics-PE") == 0
 
-###############################################
\ No newline at end of file
+    router_monitor.step()
+    assert monitor.metrics.ACTIVE_COLLECTOR.value(router="Metrics-PE") == 1
+    assert monitor.metrics.FAILOVERS.value(router="Metrics-PE") == 1
+    assert monitor.metrics.CYCLE_DURATION.count(router="Metrics-PE") == 2
@@ -0,0 +1,73 @@
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '../src'))
+import pytest
+import socket
+import grpc
+from concurrent.futures import ThreadPoolExecutor
+import probe
+
+def destination(name, port, protocol="tcp", tls=False):
+    '''
+        Builds a destination group of a collector on localhost
+    '''
+
+    return {"ip": "127.0.0.1", "port": port, "destination-id": name, "encoding": "self-describing-gpb", "protocol": protocol, "tls": tls}
+
+@pytest.fixture
+def listener():
+    '''
+        A TCP port that accepts connections
+    '''
+
+    server = socket.socket()
+    server.bind(("127.0.0.1", 0))
+    server.listen()
+    yield server.getsockname()[1]
+    server.close()
+
+@pytest.fixture
+def closed_port():
+    '''
+        A TCP port nobody listens on
+    '''
+
+    server = socket.socket()
+    server.bind(("127.0.0.1", 0))
+    port = server.getsockname()[1]
+    server.close()
+    return port
+
+def health_server(status):
+    '''
+        Starts a gRPC server answering health checks with the given encoded HealthCheckResponse
+    '''
+
+    server = grpc.server(ThreadPoolExecutor(max_workers=1))
+    handler = grpc.unary_unary_rpc_method_handler(lambda request, context: status)
+    server.add_generic_rpc_handlers([grpc.method_handlers_generic_handler("grpc.health.v1.Health", {"Check": handler})])
+    port = server.add_insecure_port("127.0.0.1:0")
+    server.start()
+    return server, port
+
+def test_probe_tcp(listener, closed_port):
+    '''
+        Collectors are reachable when they accept a TCP connection
+    '''
+
+    assert probe.collectors([destination("Up", listener), destination("Down", closed_port)], timeout=1) == {"Up": True, "Down": False}
+
+def test_probe_health_check():
+    '''
+        With health checks, gRPC collectors must also report SERVING
+    '''
+
+    serving, serving_port = health_server(probe.SERVING)
+    not_serving, not_serving_port = health_server(b"\x08\x02")
+    try:
+        destinations = [destination("Serving", serving_port, "grpc"), destination("Not-Serving", not_serving_port, "grpc"), destination("TLS", not_serving_port, "grpc", tls=True)]
+        assert probe.collectors(destinations, timeout=1, health_check=True) == {"Serving": True, "Not-Serving": False, "TLS": True}
+        assert probe.collectors(destinations, timeout=1) == {"Serving": True, "Not-Serving": True, "TLS": True}
+    finally:
+        serving.stop(None)
+        not_serving.stop(None)
@@ -0,0 +1,39 @@
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '../src'))
+import pytest
+import schedule
+
+def test_schedule_pacing():
+    '''
+        Healthy routers are checked every interval, degraded ones every degraded interval
+    '''
+
+    pacing = schedule.Schedule(interval=10, degraded_interval=2, jitter=0)
+
+    assert pacing.next(0) == 10
+    assert pacing.next(1) == 2
+    assert pacing.next(-1) == 2
+
+def test_schedule_backoff():
+    '''
+        Unreachable routers back off exponentially up to the maximum, and the backoff resets once checked
+    '''
+
+    pacing = schedule.Schedule(interval=10, max_backoff=60, jitter=0)
+
+    assert [pacing.next(None) for _ in range(5)] == [10, 20, 40, 60, 60]
+    assert pacing.next(0) == 10
+    assert pacing.next(None) == 10
+
+def test_schedule_jitter():
+    '''
+        Delays vary within the jitter fraction, and first checks are spread over it
+    '''
+
+    pacing = schedule.Schedule(interval=10, jitter=0.2)
+
+    delays = [pacing.next(0) for _ in range(100)]
+    assert all(8 <= delay <= 12 for delay in delays)
+    assert len(set(delays)) > 1
+    assert all(0 <= pacing.first() <= 2 for _ in range(100))
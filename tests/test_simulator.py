@@ -0,0 +1,624 @@
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '../src'))
+import pytest
+import yaml
+import signal
+import threading
+import time
+from simulator import Simulator
+import benchmark
+from gnmi_config import MDT
+from stream import StateStream
+import monitor
+
+def load(config_path, port):
+    '''
+        Loads a test config.yaml pointed at the simulator
+    '''
+
+    with open(os.path.join(os.path.dirname(__file__), config_path), "r") as config_file:
+        config = yaml.load(config_file, Loader=yaml.Loader)
+    config["router"]["port"] = port
+    return config
+
+@pytest.fixture
+def simulator():
+    '''
+        A simulated router with both collectors of two_collector.yaml up
+    '''
+
+    router = Simulator()
+    router.collector("4.5.6.7", 57777)
+    router.collector("7.6.5.4", 57777)
+    yield router
+    router.stop()
+
+def test_simulator_failover(simulator):
+    '''
+        setup() and check() against the simulated router follow the highest priority collector
+    '''
+
+    config = load("test_configs/two_collector.yaml", simulator.start())
+
+    with MDT("127.0.0.1", config["router"]["port"], "cisco", "cisco123") as mdt:
+        monitor.setup(config, mdt)
+        assert monitor.check(config, mdt) == -1
+        assert simulator.states() == {"Subscription-1": "active", "Subscription-2": "active"}
+        assert monitor.check(config, mdt) == 0
+        assert simulator.states() == {"Subscription-1": "active"}
+
+        simulator.collector("4.5.6.7", 57777, up=False)
+        assert monitor.check(config, mdt) == -1
+        assert monitor.check(config, mdt) == 1
+        assert simulator.states() == {"Subscription-1": "not active", "Subscription-2": "active"}
+
+        monitor.clean(config, mdt)
+        assert simulator.config == {"destination-groups": {"destination-group": []}, "sensor-groups": {"sensor-group": []}, "subscriptions": {"subscription": []}}
+
+    assert simulator.calls["Set"] == 5
+
+def test_simulator_warm_standby(simulator):
+    '''
+        With a warm standby, setup() creates every subscription and failing over only adds a destination profile
+    '''
+
+    config = load("test_configs/two_collector.yaml", simulator.start())
+    standby = monitor.handover.WarmStandby()
+    subscription = lambda name: [entry for entry in simulator.config["subscriptions"]["subscription"] if entry["subscription-identifier"] == name][0]
+    destinations = lambda name: subscription(name).get("destination-profiles", {}).get("destination-profile", [])
+
+    with MDT("127.0.0.1", config["router"]["port"], "cisco", "cisco123") as mdt:
+        monitor.setup(config, mdt, standby)
+        assert simulator.states() == {"Subscription-1": "not active", "Subscription-2": "not active"}
+        assert destinations("Subscription-2") == []
+
+        assert monitor.check(config, mdt, standby=standby) == -1
+        assert monitor.check(config, mdt, standby=standby) == 0
+        assert simulator.states() == {"Subscription-1": "active", "Subscription-2": "not active"}
+        assert destinations("Subscription-2") == []
+        assert len(subscription("Subscription-2")["sensor-profiles"]["sensor-profile"]) == 2
+
+        simulator.collector("4.5.6.7", 57777, up=False)
+        simulator.calls.clear()
+        assert monitor.check(config, mdt, standby=standby) == -1
+        assert monitor.check(config, mdt, standby=standby) == 1
+        assert simulator.calls["Set"] == 1
+        assert destinations("Subscription-2") == [{"destination-id": "Second-Collector"}]
+        assert simulator.states() == {"Subscription-1": "not active", "Subscription-2": "active"}
+
+        simulator.collector("4.5.6.7", 57777, up=True)
+        assert monitor.check(config, mdt, standby=standby) == 0
+        assert simulator.states() == {"Subscription-1": "active", "Subscription-2": "not active"}
+
+def test_simulator_cache(simulator):
+    '''
+        With a cached configuration, cycles only read states, and changes made behind the monitor's back are picked up
+    '''
+
+    config = load("test_configs/two_collector.yaml", simulator.start())
+    running_config = monitor.cache.RunningConfig()
+
+    with MDT("127.0.0.1", config["router"]["port"], "cisco", "cisco123") as mdt:
+        monitor.setup(config, mdt, running_config=running_config)
+        simulator.calls.clear()
+        assert monitor.check(config, mdt, running_config=running_config) == -1
+        assert monitor.check(config, mdt, running_config=running_config) == 0
+        assert simulator.calls["Get"] == 2
+
+        mdt.apply(None, [("subscription", "Subscription-1")])
+        simulator.calls.clear()
+        assert monitor.check(config, mdt, running_config=running_config) == -1
+        assert simulator.calls["Get"] == 2
+        assert simulator.states() == {"Subscription-1": "active", "Subscription-2": "active"}
+
+def test_simulator_replace(simulator):
+    '''
+        A replaced subscription holds exactly the given profiles, in one Set with the other changes
+    '''
+
+    config = load("test_configs/two_collector.yaml", simulator.start())
+
+    with MDT("127.0.0.1", config["router"]["port"], "cisco", "cisco123") as mdt:
+        monitor.setup(config, mdt)
+        monitor.check(config, mdt)
+        simulator.calls.clear()
+
+        mdt.apply(None, [("subscription", "Subscription-2")], {"subscriptions": {
+            "Subscription-1": {"sensor-profiles": {"Sample-Sensor-Group-Name-2": 10000}, "destination-profiles": ["Second-Collector"]}
+        }})
+
+        running = monitor.reconcile.running(mdt.get_config())
+        assert running["subscriptions"] == {"Subscription-1": {"sensor-profiles": {"Sample-Sensor-Group-Name-2": 10000}, "destination-profiles": {"Second-Collector": None}}}
+        assert simulator.calls["Set"] == 1
+
+def test_simulator_checkpoint(simulator, tmp_path):
+    '''
+        A restarted monitor resumes from its checkpoint without tearing down or re-pushing telemetry, and removes what config.yaml dropped
+    '''
+
+    config = load("test_configs/two_collector.yaml", simulator.start())
+    state = monitor.checkpoint.Checkpoint(str(tmp_path / "checkpoint.json"))
+
+    router_monitor = monitor.RouterMonitor(config, lambda: None, state)
+    router_monitor.step()
+    router_monitor.step()
+    router_monitor.stop()
+    assert simulator.states() == {"Subscription-1": "active"}
+    assert state.get(router_monitor.name)["collector"] == 0
+
+    simulator.calls.clear()
+    router_monitor = monitor.RouterMonitor(config, lambda: None, monitor.checkpoint.Checkpoint(state.path))
+    router_monitor.step()
+    assert router_monitor.collector == 0
+    assert simulator.calls["Set"] == 0
+    router_monitor.stop()
+
+    config["collectors"] = config["collectors"][1:] + [dict(config["collectors"][0], subscription={"subscription-id": "Subscription-3", "interval": 30000})]
+    router_monitor = monitor.RouterMonitor(config, lambda: None, monitor.checkpoint.Checkpoint(state.path))
+    router_monitor.step()
+    assert "Subscription-1" not in simulator.states()
+    router_monitor.stop()
+
+def test_simulator_detach(simulator):
+    '''
+        Stopping in detach mode leaves the active subscription streaming
+    '''
+
+    config = load("test_configs/two_collector.yaml", simulator.start())
+    config["monitor"] = {"shutdown": {"mode": "detach"}}
+
+    router_monitor = monitor.RouterMonitor(config, lambda: None)
+    router_monitor.step()
+    simulator.collector("4.5.6.7", 57777, up=False)
+    router_monitor.step()
+    router_monitor.step()
+    assert router_monitor.collector == 1
+
+    simulator.calls.clear()
+    router_monitor.stop()
+    assert simulator.states() == {"Subscription-2": "active"}
+    assert [group["destination-id"] for group in simulator.config["destination-groups"]["destination-group"]] == ["Second-Collector"]
+    assert simulator.calls["Set"] == 1
+
+def test_simulator_deadlines(simulator):
+    '''
+        RPCs give up at their deadline or the budget of the cycle, a check that times out keeps the configuration and the pace
+    '''
+
+    config = load("test_configs/two_collector.yaml", simulator.start())
+    config["monitor"] = {"deadline": {"rpc": 0.5, "cycle": 5}, "schedule": {"interval": 10, "jitter": 0}}
+
+    with MDT("127.0.0.1", config["router"]["port"], "cisco", "cisco123", timeout=5, timeouts={"get_config": 0.2}) as mdt:
+        simulator.latency = 0.5
+        with pytest.raises(Exception) as err:
+            mdt.get_config()
+        assert monitor.metrics.code(err.value) == "DEADLINE_EXCEEDED"
+        assert mdt.read_subscription_states(timeout=1) == {}
+        with mdt.budget(0.8):
+            mdt.read_subscription_states()
+            with pytest.raises(Exception) as err:
+                mdt.read_subscription_states()
+        assert monitor.metrics.code(err.value) == "DEADLINE_EXCEEDED"
+        simulator.latency = 0
+
+    router_monitor = monitor.RouterMonitor(config, lambda: None)
+    router_monitor.step()
+    router_monitor.step()
+    assert router_monitor.collector == 0
+
+    simulator.latency = 1
+    assert router_monitor.step() == 10
+    assert router_monitor.collector == 0
+    simulator.latency = 0
+    assert simulator.states() == {"Subscription-1": "active"}
+    router_monitor.stop()
+
+def test_simulator_checkpoint_removed(simulator, tmp_path):
+    '''
+        A router removed from config.yaml is cleaned up and forgotten even with a checkpoint
+    '''
+
+    config = load("test_configs/two_collector.yaml", simulator.start())
+    state = monitor.checkpoint.Checkpoint(str(tmp_path / "checkpoint.json"))
+
+    router_monitor = monitor.RouterMonitor(config, lambda: None, state)
+    router_monitor.step()
+    router_monitor.step()
+    assert state.get(router_monitor.name) != None
+
+    router_monitor.stop(removed=True)
+    assert simulator.states() == {}
+    assert state.get(router_monitor.name) == None
+    assert monitor.checkpoint.Checkpoint(state.path).get(router_monitor.name) == None
+
+def test_simulator_tls(simulator):
+    '''
+        MDT connects with the router's self-signed ems.pem
+    '''
+
+    port = simulator.start(tls=True)
+
+    with MDT("127.0.0.1", port, "cisco", "cisco123", path_cert=simulator.certificate) as mdt:
+        assert mdt.read_subscription_states() == {}
+
+    os.remove(simulator.certificate)
+
+def test_simulator_stream(simulator):
+    '''
+        Subscription states are streamed as they change
+    '''
+
+    config = load("test_configs/two_collector.yaml", simulator.start())
+    changed = threading.Event()
+
+    with MDT("127.0.0.1", config["router"]["port"], "cisco", "cisco123") as mdt:
+        monitor.setup(config, mdt)
+        monitor.check(config, mdt)
+
+        state_stream = StateStream(["Subscription-1", "Subscription-2"], changed.set, heartbeat=1)
+        assert state_stream.start(mdt)
+        assert state_stream.states == {"Subscription-1": "active", "Subscription-2": "active"}
+
+        simulator.collector("4.5.6.7", 57777, up=False)
+        assert changed.wait(5)
+        assert state_stream.states["Subscription-1"] == "not active"
+        state_stream.close()
+
+def test_simulator_stream_reset(simulator):
+    '''
+        A stream whose channel is closed is dead at once, not after two missed heartbeats, and a failed check closes it
+    '''
+
+    config = load("test_configs/two_collector.yaml", simulator.start())
+    config["monitor"] = {"streaming": True, "heartbeat": 30}
+
+    with MDT("127.0.0.1", config["router"]["port"], "cisco", "cisco123") as mdt:
+        monitor.setup(config, mdt)
+        state_stream = StateStream(["Subscription-1", "Subscription-2"], lambda: None, heartbeat=30)
+        assert state_stream.start(mdt)
+        assert state_stream.alive
+        mdt.close()
+        deadline = time.monotonic() + 2
+        while state_stream.alive and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert not state_stream.alive
+        state_stream.close()
+
+    router_monitor = monitor.RouterMonitor(config, lambda: None)
+    router_monitor.step()
+    assert router_monitor.stream.alive
+    # Setup timing out is a failed check
+    simulator.latency = 1
+    router_monitor.ready = False
+    router_monitor.session.timeout = 0.2
+    router_monitor.step()
+    assert not router_monitor.stream.alive
+    simulator.latency = 0
+    router_monitor.step()
+    assert router_monitor.stream.alive
+    router_monitor.stop()
+
+def test_simulator_stream_refused(simulator):
+    '''
+        A router refusing ON_CHANGE falls back to SAMPLE at once instead of after two heartbeats, and a closed stream ends on the router
+    '''
+
+    config = load("test_configs/two_collector.yaml", simulator.start())
+    simulator.on_change = False
+
+    with MDT("127.0.0.1", config["router"]["port"], "cisco", "cisco123") as mdt:
+        monitor.setup(config, mdt)
+        state_stream = StateStream(["Subscription-1", "Subscription-2"], lambda: None, heartbeat=30)
+        start = time.monotonic()
+        assert state_stream.start(mdt)
+        assert time.monotonic() - start < 5
+        assert state_stream.mode == "sample"
+        assert simulator.subscribed == 1
+
+        # The channel stays open, only the Subscribe is ended
+        state_stream.close()
+        assert simulator.wait_for(lambda router: router.subscribed == 0, 5)
+        assert mdt.is_connected()
+
+def test_simulator_main(simulator, tmp_path):
+    '''
+        The real monitor loop fails over and cleans up on SIGTERM
+    '''
+
+    config = load("test_configs/two_collector.yaml", simulator.start())
+    config["monitor"] = {"schedule": {"interval": 0.1, "degraded-interval": 0.1}}
+    config_path = tmp_path / "config.yaml"
+    config_path.write_text(yaml.dump(config))
+
+    reached = []
+
+    def scenario():
+        try:
+            reached.append(simulator.wait_for(lambda router: router.states() == {"Subscription-1": "active"}))
+            simulator.collector("4.5.6.7", 57777, up=False)
+            reached.append(simulator.wait_for(lambda router: router.states() == {"Subscription-1": "not active", "Subscription-2": "active"}))
+        finally:
+            signal.pthread_kill(threading.main_thread().ident, signal.SIGTERM)
+
+    mask = signal.pthread_sigmask(signal.SIG_BLOCK, [])
+    thread = threading.Thread(target=scenario, daemon=True)
+    thread.start()
+    try:
+        monitor.main(str(config_path), "../config/schema.json")
+    finally:
+        signal.pthread_sigmask(signal.SIG_SETMASK, mask)
+    thread.join(1)
+
+    assert reached == [True, True]
+    assert simulator.states() == {}
+
+def test_simulator_signals(simulator, tmp_path):
+    '''
+        SIGUSR1 checks at once, SIGHUP reloads config.yaml, SIGTERM cancels a check stuck in an RPC
+    '''
+
+    config = load("test_configs/two_collector.yaml", simulator.start())
+    config["monitor"] = {"watch": False, "schedule": {"interval": 60, "degraded-interval": 60, "jitter": 0}, "shutdown": {"deadline": 0.5}}
+    config_path = tmp_path / "config.yaml"
+    config_path.write_text(yaml.dump(config))
+
+    main = threading.main_thread().ident
+    reached = []
+
+    def scenario():
+        try:
+            reached.append(simulator.wait_for(lambda router: router.states() == {"Subscription-1": "active", "Subscription-2": "active"}))
+            signal.pthread_kill(main, signal.SIGUSR1)
+            reached.append(simulator.wait_for(lambda router: router.states() == {"Subscription-1": "active"}, 5))
+
+            config["collectors"].reverse()
+            config_path.write_text(yaml.dump(config))
+            signal.pthread_kill(main, signal.SIGHUP)
+            reached.append(simulator.wait_for(lambda router: "Subscription-2" in router.states(), 5))
+
+            simulator.latency = 30
+            signal.pthread_kill(main, signal.SIGUSR1)
+            time.sleep(0.5)
+        finally:
+            reached.append(time.monotonic())
+            signal.pthread_kill(main, signal.SIGTERM)
+
+    mask = signal.pthread_sigmask(signal.SIG_BLOCK, [])
+    thread = threading.Thread(target=scenario, daemon=True)
+    thread.start()
+    try:
+        monitor.main(str(config_path), "../config/schema.json")
+    finally:
+        signal.pthread_sigmask(signal.SIG_SETMASK, mask)
+    thread.join(1)
+
+    assert reached[:3] == [True, True, True]
+    assert time.monotonic() - reached[3] < 5
+
+def test_simulator_readded(simulator, tmp_path):
+    '''
+        A router added back to config.yaml while its removal is still cleaning it up is set up again once the removal is done
+    '''
+
+    other = Simulator()
+    other.collector("4.5.6.7", 57777)
+    other.collector("7.6.5.4", 57777)
+    config = load("test_configs/two_collector.yaml", simulator.start())
+    router = dict(config.pop("router"), name="PE-1")
+    config["routers"] = [router, dict(router, name="PE-2", port=other.start())]
+    config["monitor"] = {"watch": False, "schedule": {"interval": 0.1, "degraded-interval": 0.1}, "shutdown": {"mode": "detach"}}
+    config_path = tmp_path / "config.yaml"
+    config_path.write_text(yaml.dump(config))
+
+    main = threading.main_thread().ident
+    reached = []
+
+    def scenario():
+        try:
+            reached.append(simulator.wait_for(lambda router: router.states() == {"Subscription-1": "active"}))
+            sets = simulator.calls["Set"]
+            # The removal holds its clean up long enough for the router to come back
+            simulator.latency = 1
+            config_path.write_text(yaml.dump(dict(config, routers=config["routers"][1:])))
+            signal.pthread_kill(main, signal.SIGHUP)
+            reached.append(simulator.wait_for(lambda router: router.calls["Set"] > sets))
+
+            config_path.write_text(yaml.dump(config))
+            signal.pthread_kill(main, signal.SIGHUP)
+            simulator.latency = 0
+            reached.append(simulator.wait_for(lambda router: router.calls["Set"] > sets + 1 and router.states() == {"Subscription-1": "active"}))
+        finally:
+            signal.pthread_kill(main, signal.SIGTERM)
+
+    mask = signal.pthread_sigmask(signal.SIG_BLOCK, [])
+    thread = threading.Thread(target=scenario, daemon=True)
+    thread.start()
+    try:
+        monitor.main(str(config_path), "../config/schema.json")
+    finally:
+        signal.pthread_sigmask(signal.SIG_SETMASK, mask)
+        other.stop()
+    thread.join(1)
+
+    assert reached == [True, True, True]
+
+def test_simulator_removed_metrics(simulator, tmp_path):
+    '''
+        The metrics of a router removed from config.yaml are no longer exported once it is cleaned up
+    '''
+
+    other = Simulator()
+    other.collector("4.5.6.7", 57777)
+    other.collector("7.6.5.4", 57777)
+    config = load("test_configs/two_collector.yaml", simulator.start())
+    router = dict(config.pop("router"), name="Removed-Router")
+    config["routers"] = [router, dict(router, name="Kept-Router", port=other.start())]
+    config["monitor"] = {"watch": False, "schedule": {"interval": 0.1, "degraded-interval": 0.1}}
+    config_path = tmp_path / "config.yaml"
+    config_path.write_text(yaml.dump(config))
+
+    main = threading.main_thread().ident
+    reached = []
+
+    def scenario():
+        try:
+            reached.append(simulator.wait_for(lambda router: monitor.metrics.ACTIVE_COLLECTOR.value(router="Removed-Router") == 0))
+            reached.append('router="Removed-Router"' in monitor.metrics.render())
+            config_path.write_text(yaml.dump(dict(config, routers=config["routers"][1:])))
+            signal.pthread_kill(main, signal.SIGHUP)
+            reached.append(simulator.wait_for(lambda router: router.states() == {} and 'router="Removed-Router"' not in monitor.metrics.render()))
+            reached.append('router="Kept-Router"' in monitor.metrics.render())
+        finally:
+            signal.pthread_kill(main, signal.SIGTERM)
+
+    mask = signal.pthread_sigmask(signal.SIG_BLOCK, [])
+    thread = threading.Thread(target=scenario, daemon=True)
+    thread.start()
+    try:
+        monitor.main(str(config_path), "../config/schema.json")
+    finally:
+        signal.pthread_sigmask(signal.SIG_SETMASK, mask)
+        other.stop()
+    thread.join(1)
+
+    assert reached == [True, True, True, True]
+
+def test_simulator_reload_connection(simulator):
+    '''
+        New connection settings for the same router reconnect without touching its telemetry configuration
+    '''
+
+    config = load("test_configs/two_collector.yaml", simulator.start())
+
+    router_monitor = monitor.RouterMonitor(config, lambda: None)
+    router_monitor.step()
+    router_monitor.step()
+    session = router_monitor.session
+
+    simulator.calls.clear()
+    router_monitor.reload(dict(config, router=dict(config["router"], certificate="other.pem")))
+    router_monitor.step()
+
+    assert router_monitor.session is not session
+    assert router_monitor.collector == 0
+    assert simulator.calls["Set"] == 0
+    assert simulator.states() == {"Subscription-1": "active"}
+    router_monitor.stop()
+
+def test_simulator_shutdown_deadline(simulator, tmp_path):
+    '''
+        A router too slow to clean up does not hold the monitor past its shutdown deadline
+    '''
+
+    config = load("test_configs/two_collector.yaml", simulator.start())
+    config["monitor"] = {"schedule": {"interval": 0.1, "degraded-interval": 0.1}, "shutdown": {"deadline": 0.5}}
+    config_path = tmp_path / "config.yaml"
+    config_path.write_text(yaml.dump(config))
+
+    reached = []
+
+    def scenario():
+        try:
+            reached.append(simulator.wait_for(lambda router: router.states() == {"Subscription-1": "active"}))
+            simulator.latency = 5
+        finally:
+            signal.pthread_kill(threading.main_thread().ident, signal.SIGTERM)
+
+    mask = signal.pthread_sigmask(signal.SIG_BLOCK, [])
+    thread = threading.Thread(target=scenario, daemon=True)
+    thread.start()
+    start = time.monotonic()
+    try:
+        monitor.main(str(config_path), "../config/schema.json")
+    finally:
+        signal.pthread_sigmask(signal.SIG_SETMASK, mask)
+    thread.join(1)
+
+    assert reached == [True]
+    assert time.monotonic() - start < 4
+    simulator.latency = 0
+    assert simulator.states() == {"Subscription-1": "active"}
+
+def test_simulator_shutdown_unreachable(simulator, tmp_path, monkeypatch):
+    '''
+        A router that is still being connected to when SIGTERM arrives does not hold the monitor past its shutdown deadline
+    '''
+
+    config = load("test_configs/two_collector.yaml", simulator.start())
+    simulator.stop()
+    config["monitor"] = {"schedule": {"interval": 0.1, "degraded-interval": 0.1}, "shutdown": {"deadline": 0.5}}
+    config_path = tmp_path / "config.yaml"
+    config_path.write_text(yaml.dump(config))
+
+    # SIGTERM is sent once the first check is connecting to the router
+    connecting = threading.Event()
+    connect = monitor.connect
+
+    def connecting_to(session):
+        connecting.set()
+        return connect(session)
+    monkeypatch.setattr(monitor, "connect", connecting_to)
+
+    def scenario():
+        connecting.wait(10)
+        signal.pthread_kill(threading.main_thread().ident, signal.SIGTERM)
+
+    mask = signal.pthread_sigmask(signal.SIG_BLOCK, [])
+    thread = threading.Thread(target=scenario, daemon=True)
+    thread.start()
+    start = time.monotonic()
+    try:
+        monitor.main(str(config_path), "../config/schema.json")
+    finally:
+        signal.pthread_sigmask(signal.SIG_SETMASK, mask)
+    thread.join(1)
+
+    assert connecting.is_set()
+    assert time.monotonic() - start < 3
+
+def test_simulator_reload(simulator, tmp_path):
+    '''
+        Changes to config.yaml are applied live, without recreating what did not change
+    '''
+
+    config = load("test_configs/two_collector.yaml", simulator.start())
+    config["monitor"] = {"schedule": {"interval": 0.1, "degraded-interval": 0.1}}
+    config_path = tmp_path / "config.yaml"
+    config_path.write_text(yaml.dump(config))
+
+    sensor_paths = lambda router: [entry["telemetry-sensor-path"] for group in router.config["sensor-groups"]["sensor-group"] for entry in group["sensor-paths"]["sensor-path"]]
+    reached = []
+
+    def scenario():
+        try:
+            reached.append(simulator.wait_for(lambda router: router.states() == {"Subscription-1": "active"}))
+            calls = dict(simulator.calls)
+            config["sensor-groups"][0]["sensor-paths"].append("Cisco-IOS-XR-shellutil-oper:system-time/uptime")
+            config_path.write_text(yaml.dump(config))
+            reached.append(simulator.wait_for(lambda router: "Cisco-IOS-XR-shellutil-oper:system-time/uptime" in sensor_paths(router)))
+            reached.append(simulator.calls["Set"] - calls["Set"] == 1)
+            reached.append(simulator.states() == {"Subscription-1": "active"})
+        finally:
+            signal.pthread_kill(threading.main_thread().ident, signal.SIGTERM)
+
+    mask = signal.pthread_sigmask(signal.SIG_BLOCK, [])
+    thread = threading.Thread(target=scenario, daemon=True)
+    thread.start()
+    try:
+        monitor.main(str(config_path), "../config/schema.json")
+    finally:
+        signal.pthread_sigmask(signal.SIG_SETMASK, mask)
+    thread.join(1)
+
+    assert reached == [True, True, True, True]
+
+def test_benchmark_scenarios():
+    '''
+        Every benchmark scenario converges on the simulator
+    '''
+
+    for scenario in benchmark.SCENARIOS:
+        results = benchmark.run(scenario, 3, timeout=10)
+        assert len(results) > 0
+        assert all(result["rpcs/cycle"] >= 1 for result in results)
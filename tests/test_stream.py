@@ -0,0 +1,79 @@
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '../src'))
+import pytest
+from unittest.mock import Mock, MagicMock
+import stream
+
+def notification(*states):
+    '''
+        Builds a parsed gNMI notification carrying subscription states
+    '''
+
+    return {
+        "update": {
+            "prefix": "Cisco-IOS-XR-telemetry-model-driven-oper:telemetry-model-driven",
+            "update": [
+                {"path": 'subscriptions/subscription[subscription-id="' + name + '"]/subscription/state', "val": state}
+                for name, state in states
+            ]
+        }
+    }
+
+def test_stream_snapshot():
+    '''
+        The initial snapshot populates the states without a callback
+    '''
+
+    on_change = Mock()
+    subscriber = MagicMock()
+    subscriber.get_update = Mock(side_effect=[notification(("Subscription-1", "active"), ("Other", "active"))] + [TimeoutError()])
+    router_config = MagicMock()
+    router_config.subscribe_connections.return_value = subscriber
+
+    state_stream = stream.StateStream(["Subscription-1", "Subscription-2"], on_change, heartbeat=1)
+
+    assert state_stream.start(router_config)
+    state_stream._thread.join(5)
+
+    assert state_stream.mode == "on_change"
+    assert state_stream.states == {"Subscription-1": "active"}
+    on_change.assert_not_called()
+
+def test_stream_change_triggers_callback():
+    '''
+        A transition of a followed subscription triggers the callback
+    '''
+
+    on_change = Mock()
+    subscriber = MagicMock()
+    subscriber.get_update = Mock(side_effect=[notification(("Subscription-1", "active")), notification(("Subscription-1", "not active")), TimeoutError()])
+    router_config = MagicMock()
+    router_config.subscribe_connections.return_value = subscriber
+
+    state_stream = stream.StateStream(["Subscription-1"], on_change, heartbeat=1)
+    state_stream.start(router_config)
+    state_stream._thread.join(5)
+
+    on_change.assert_called_once()
+    assert state_stream.states == {"Subscription-1": "not active"}
+    assert not state_stream.alive
+
+def test_stream_sample_fallback():
+    '''
+        SAMPLE is used when the router does not answer an ON_CHANGE subscription
+    '''
+
+    silent = MagicMock()
+    silent.get_update = Mock(side_effect=TimeoutError())
+    sampled = MagicMock()
+    sampled.get_update = Mock(side_effect=[notification(("Subscription-1", "active")), TimeoutError()])
+    router_config = MagicMock()
+    router_config.subscribe_connections = Mock(side_effect=[silent, sampled])
+
+    state_stream = stream.StateStream(["Subscription-1"], Mock(), heartbeat=1)
+
+    assert state_stream.start(router_config)
+    assert state_stream.mode == "sample"
+    silent.close.assert_called_once()
+    assert router_config.subscribe_connections.call_args.args[0] == "sample"
@@ -0,0 +1,127 @@
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '../src'))
+import pytest
+import io
+import json
+import grpc
+import tracing
+import gnmi_config
+
+class Recorder:
+    '''
+        Hook keeping every finished span
+    '''
+
+    def __init__(self):
+        self.spans = []
+
+    def on_start(self, span):
+        pass
+
+    def on_end(self, span):
+        self.spans.append(span)
+
+@pytest.fixture
+def recorder():
+    hook = Recorder()
+    tracing.add_hook(hook)
+    yield hook
+    tracing.remove_hook(hook)
+
+def test_tracing_disabled(mocker):
+    '''
+        Without hooks spans are a shared no-op and the pygnmi client is called directly
+    '''
+
+    client_mock = mocker.patch('gnmi_config.gNMIclient')
+    mdt = gnmi_config.MDT("127.0.0.1", 57777, "cisco", "cisco123")
+
+    assert not tracing.enabled()
+    with tracing.span("Anything") as span:
+        assert span is tracing.NOOP
+    assert mdt._client.set == client_mock.return_value.set
+
+def test_tracing_rpc_spans(mocker, recorder):
+    '''
+        The gNMI RPC span is nested in the MDT method span and carries the paths, sizes and outcome
+    '''
+
+    client_mock = mocker.patch('gnmi_config.gNMIclient')
+    mdt = gnmi_config.MDT("127.0.0.1", 57777, "cisco", "cisco123", name="Traced-Router")
+    client_mock.return_value.set.return_value = {"response": [{"path": "subscription", "op": "DELETE"}]}
+
+    mdt.apply(None, [("subscription", "Subscription-1")])
+
+    rpc, method = recorder.spans
+    assert method.name == "MDT.apply" and method.parent == None
+    assert rpc.name == "gNMI.Set" and rpc.parent is method and rpc.trace_id == method.trace_id
+    assert rpc.attributes["router"] == "Traced-Router"
+    assert len(rpc.attributes["paths"]) == 1
+    assert rpc.attributes["payload_bytes"] > 0 and rpc.attributes["response_bytes"] > 0
+    assert rpc.outcome == "ok" and method.outcome == "ok"
+    assert rpc.start <= rpc.end and method.start <= rpc.start and rpc.end <= method.end
+
+def test_tracing_rpc_error(mocker, recorder):
+    '''
+        Errors returned by pygnmi mark both spans as failed with the gRPC status code
+    '''
+
+    client_mock = mocker.patch('gnmi_config.gNMIclient')
+    mdt = gnmi_config.MDT("127.0.0.1", 57777, "cisco", "cisco123")
+    error = grpc.RpcError()
+    error.code = lambda: grpc.StatusCode.FAILED_PRECONDITION
+    client_mock.return_value.set.return_value = error
+
+    mdt.apply(None, [("subscription", "Subscription-1")])
+
+    assert [(span.outcome, span.error) for span in recorder.spans] == [("error", "FAILED_PRECONDITION")] * 2
+
+def test_tracing_json_exporter():
+    '''
+        Finished spans are written as one OTLP-style JSON line each
+    '''
+
+    stream = io.StringIO()
+    exporter = tracing.JsonExporter(stream)
+    tracing.add_hook(exporter)
+    try:
+        with tracing.span("Outer", router="PE-1"):
+            with pytest.raises(ValueError):
+                with tracing.span("Inner"):
+                    raise ValueError()
+    finally:
+        tracing.remove_hook(exporter)
+
+    inner, outer = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert inner["parentSpanId"] == outer["spanId"] and inner["traceId"] == outer["traceId"]
+    assert inner["status"] == {"code": "STATUS_CODE_ERROR", "message": "ValueError"}
+    assert outer["status"]["code"] == "STATUS_CODE_OK"
+    assert outer["attributes"] == {"router": "PE-1"}
+    assert outer["startTimeUnixNano"] <= inner["startTimeUnixNano"] <= inner["endTimeUnixNano"] <= outer["endTimeUnixNano"]
+
+def test_tracing_opentelemetry_exporter():
+    '''
+        Spans are re-emitted through the OpenTelemetry SDK with their parent
+    '''
+
+    pytest.importorskip("opentelemetry.sdk")
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+    from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+
+    memory = InMemorySpanExporter()
+    provider = TracerProvider()
+    provider.add_span_processor(SimpleSpanProcessor(memory))
+    exporter = tracing.OpenTelemetryExporter(provider.get_tracer("test"))
+    tracing.add_hook(exporter)
+    try:
+        with tracing.span("Outer", paths=["a", "b"], client=object()):
+            with tracing.span("Inner"):
+                pass
+    finally:
+        tracing.remove_hook(exporter)
+
+    inner, outer = memory.get_finished_spans()
+    assert inner.parent.span_id == outer.context.span_id
+    assert dict(outer.attributes) == {"paths": ("a", "b")}
@@ -0,0 +1,66 @@
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '../src'))
+import pytest
+import threading
+import watch
+
+@pytest.fixture(params=["inotify", "polling"])
+def watched(request, tmp_path, monkeypatch):
+    '''
+        A watched file, with inotify and with polling
+    '''
+
+    if request.param == "polling":
+        monkeypatch.setattr(watch, "_inotify", lambda directory: None)
+    path = tmp_path / "config.yaml"
+    path.write_text("router: 1\n")
+    changes = []
+    changed = threading.Event()
+
+    def callback():
+        changes.append(path.read_text())
+        changed.set()
+
+    watcher = watch.Watcher(str(path), callback, interval=0.2)
+    watcher.start()
+    yield watcher, path, changes, changed
+    watcher.stop()
+
+def test_watch_write(watched):
+    '''
+        A file written in place is noticed
+    '''
+
+    watcher, path, changes, changed = watched
+
+    path.write_text("router: 2\n")
+
+    assert changed.wait(5)
+    assert changes == ["router: 2\n"]
+
+def test_watch_rename(watched):
+    '''
+        A file replaced by a rename, as editors and Kubernetes do, is noticed
+    '''
+
+    watcher, path, changes, changed = watched
+
+    replacement = path.parent / "config.yaml.new"
+    replacement.write_text("router: 3\n")
+    os.replace(replacement, path)
+
+    assert changed.wait(5)
+    assert changes == ["router: 3\n"]
+
+def test_watch_unchanged(watched):
+    '''
+        Rewriting the same content or touching other files is not a change
+    '''
+
+    watcher, path, changes, changed = watched
+
+    path.write_text("router: 1\n")
+    (path.parent / "other.yaml").write_text("other\n")
+
+    assert not changed.wait(1)